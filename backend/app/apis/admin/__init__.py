@@ -5,13 +5,52 @@ import databutton as db
 from app.auth import AuthorizedUser
 from app.libs.models import UserProfile, Lead, LeadStatus
 from app.libs.auth_utils import require_admin
-from datetime import datetime
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
+from datetime import date, datetime
+from app.libs.logger import log_error, log_info
 from fastapi import Query
 from app.libs.database_pool import get_db_connection
+from app.libs.statements import fetch_pending_commission_balance
+from app.libs.reports import all_users_sql, users_with_stats_sql
+from app.libs.export import export_response
+from app.libs.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Keyset, KeysetPage, Page, estimate_total
+from app.libs.lead_search import LEAD_SEARCH_SQL, LEADS_KEYSET, lead_search_filters
+from app.libs.database_pool import get_pool_stats
+from app.libs.contract_store import contract_store
+from app.libs.log_sanitizer import get_sanitizer_stats
+from app.libs.logger import get_log_stats
+from app.libs.middleware import get_monitoring_stats
+from app.libs.rate_limiter import limiter
+from databutton_app.mw.auth_mw import get_auth_stats
+from uuid import UUID
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
+# Ordres de parcours des listes admin (pagination par curseur)
+USERS_KEYSET = Keyset(
+    table="user_profiles up",
+    id_column="up.user_id",
+    id_field="user_id",
+    id_type=UUID,
+    sort_columns={"created_at": "up.created_at"},
+)
+PAYMENTS_KEYSET = Keyset(
+    table="payments p",
+    id_column="p.id",
+    sort_columns={"requested_at": "p.requested_at"},
+    default_sort="requested_at",
+)
+
+def _user_filters(user_type: str, search: str):
+    """Conditions SQL et paramètres des filtres de la liste des utilisateurs"""
+    conditions, params = [], []
+    if user_type.strip() in ("particulier", "professionnel"):
+        params.append(user_type.strip())
+        conditions.append(f"up.user_type = ${len(params)}")
+    if search.strip():
+        params.append(f"%{search.strip()}%")
+        conditions.append(f"(up.full_name ILIKE ${len(params)} OR up.email ILIKE ${len(params)})")
+    return conditions, params
+
 class UpdateLeadStatusRequest(BaseModel):
     lead_id: int
     new_status: LeadStatus
@@ -85,6 +124,59 @@ class ProcessPaymentRequest(BaseModel):
 
 # ============= ENDPOINTS ADMIN POUR GÉRER LES LEADS =============
 
+# Alertes anniversaire (utilisateurs particuliers avec bons d'achat en attente).
+# Calculées à la lecture car elles dépendent de la date du jour ; le filtre sur
+# les bons d'achat en attente passe par l'index partiel de la migration 001.
+ANNIVERSARY_ALERTS_SQL = """
+    SELECT COUNT(*)
+    FROM user_profiles up
+    WHERE up.user_id IN (
+        SELECT c.user_id FROM commissions c
+        WHERE c.status = 'pending' AND c.type = 'bon_achat'
+    )
+    AND up.user_type = 'particulier'
+    AND (CURRENT_DATE - up.created_at::date) % 365 >= 350
+"""
+
+# Statistiques lues dans les compteurs tenus à jour par triggers : somme des
+# lignes de compteurs (16 depuis la migration 006, une seule avec la 001)
+ADMIN_STATS_SQL = f"""
+    SELECT
+        SUM(total_users)::bigint AS total_users,
+        SUM(total_leads)::bigint AS total_leads,
+        SUM(total_commissions_paid) AS total_commissions_paid,
+        SUM(pending_commission_requests)::bigint AS pending_commission_requests,
+        ({ANNIVERSARY_ALERTS_SQL}) AS anniversary_alerts
+    FROM admin_stats_counters
+    HAVING COUNT(*) > 0
+"""
+
+# Repli sans la migration : une seule requête, mêmes résultats
+ADMIN_STATS_FALLBACK_SQL = f"""
+    SELECT
+        (SELECT COUNT(*) FROM user_profiles) AS total_users,
+        (SELECT COUNT(*) FROM leads) AS total_leads,
+        (SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE status = 'paid') AS total_commissions_paid,
+        (SELECT COUNT(*) FROM payments WHERE status = 'requested') AS pending_commission_requests,
+        ({ANNIVERSARY_ALERTS_SQL}) AS anniversary_alerts
+"""
+
+# Passe à False au premier appel si la table des compteurs n'existe pas
+_stats_counters_available = True
+
+async def fetch_admin_stats(conn) -> asyncpg.Record:
+    """Statistiques du tableau de bord admin en un seul aller-retour"""
+    global _stats_counters_available
+    if _stats_counters_available:
+        try:
+            row = await conn.fetchrow(ADMIN_STATS_SQL)
+            if row is not None:
+                return row
+        except asyncpg.exceptions.UndefinedTableError:
+            _stats_counters_available = False
+            log_info("admin_stats_counters missing, admin stats computed from the tables")
+    return await conn.fetchrow(ADMIN_STATS_FALLBACK_SQL)
+
 @router.get("/stats", response_model=AdminStatsResponse)
 async def get_admin_stats(user: AuthorizedUser):
     """
@@ -93,41 +185,39 @@ async def get_admin_stats(user: AuthorizedUser):
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
-            # Statistiques générales
-            total_users = await conn.fetchval("SELECT COUNT(*) FROM user_profiles")
-            total_leads = await conn.fetchval("SELECT COUNT(*) FROM leads")
-            total_commissions_paid = await conn.fetchval(
-                "SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE status = 'paid'"
-            )
-            pending_requests = await conn.fetchval(
-                "SELECT COUNT(*) FROM payments WHERE status = 'requested'"
-            )
-            
-            # Compter les alertes anniversaire (utilisateurs particuliers avec bons d'achat en attente)
-            anniversary_alerts = await conn.fetchval(
-                """
-                SELECT COUNT(DISTINCT up.user_id)
-                FROM user_profiles up
-                JOIN commissions c ON up.user_id = c.user_id
-                WHERE up.user_type = 'particulier'
-                AND c.status = 'pending'
-                AND c.type = 'bon_achat'
-                AND (CURRENT_DATE - up.created_at::date) % 365 >= 350
-                """
-            )
+        async with get_db_connection(readonly=True) as conn:
+            stats = await fetch_admin_stats(conn)
             
             return AdminStatsResponse(
-                total_users=total_users or 0,
-                total_leads=total_leads or 0,
-                total_commissions_paid=float(total_commissions_paid or 0),
-                pending_commission_requests=pending_requests or 0,
-                anniversary_alerts=anniversary_alerts or 0
+                total_users=stats["total_users"] or 0,
+                total_leads=stats["total_leads"] or 0,
+                total_commissions_paid=float(stats["total_commissions_paid"] or 0),
+                pending_commission_requests=stats["pending_commission_requests"] or 0,
+                anniversary_alerts=stats["anniversary_alerts"] or 0
             )
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des statistiques: {str(e)}")
 
+@router.get("/metrics")
+async def get_admin_metrics(user: AuthorizedUser):
+    """
+    Compteurs internes de l'instance : authentification, surveillance des
+    endpoints sensibles, rate limiting, pool de connexions, journalisation,
+    sanitiseur de logs et cache des contrats.
+    Accès restreint aux administrateurs.
+    """
+    require_admin(user)
+    return {
+        "auth": get_auth_stats(),
+        "monitoring": get_monitoring_stats(),
+        "rate_limiter": limiter.get_stats(),
+        "database_pool": await get_pool_stats(),
+        "logger": get_log_stats(),
+        "log_sanitizer": get_sanitizer_stats(),
+        "contract_store": contract_store.get_stats(),
+    }
+
 # ============= ENDPOINTS GESTION UTILISATEURS =============
 
 @router.get("/user-details/{user_id}", response_model=UserDetailsResponse)
@@ -255,39 +345,35 @@ async def delete_user(request: DeleteUserRequest, user: AuthorizedUser):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la suppression: {str(e)}")
 
-@router.get("/users-with-stats", response_model=list[UserStatsResponse])
-async def get_users_with_stats(user: AuthorizedUser):
+@router.get("/users-with-stats", response_model=Page[UserStatsResponse])
+async def get_users_with_stats(
+    user: AuthorizedUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: str | None = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    page: int = Query(1, ge=1, description="Numéro de page (sans curseur)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    user_type: str = Query("", description="Filtrer par type (particulier, professionnel)"),
+    search: str = Query("", description="Recherche sur le nom ou l'email")
+):
     """
-    Récupère tous les utilisateurs avec leurs statistiques détaillées.
+    Récupère les utilisateurs avec leurs statistiques détaillées, par page.
     Accès restreint aux administrateurs.
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
-            query = """
-                SELECT 
-                    up.user_id::text,
-                    up.full_name,
-                    up.user_type,
-                    up.email,
-                    up.phone,
-                    up.city,
-                    up.created_at,
-                    COUNT(l.id) as total_leads,
-                    COALESCE(SUM(c.amount) FILTER (WHERE c.status = 'pending'), 0) as pending_commissions,
-                    COALESCE(SUM(c.amount) FILTER (WHERE c.status = 'paid'), 0) as paid_commissions,
-                    MAX(GREATEST(l.updated_at, c.updated_at, p.requested_at)) as last_activity
-                FROM user_profiles up
-                LEFT JOIN leads l ON up.user_id = l.user_id
-                LEFT JOIN commissions c ON up.user_id = c.user_id
-                LEFT JOIN payments p ON up.user_id = p.user_id
-                GROUP BY up.user_id, up.full_name, up.user_type, up.email, up.phone, up.city, up.created_at
-                ORDER BY up.created_at DESC
-            """
-            
-            rows = await conn.fetch(query)
+        conditions, params = _user_filters(user_type, search)
+        keyset_page = KeysetPage(
+            USERS_KEYSET, limit=limit, cursor=cursor, order=order, page=page,
+            filters={"user_type": user_type, "search": search}
+        )
+        users_sql, page_params = keyset_page.query("SELECT * FROM user_profiles up", conditions, params)
+        
+        async with get_db_connection(readonly=True) as conn:
+            # Agrégats calculés pour les seuls utilisateurs de la page
+            rows = await conn.fetch(users_with_stats_sql(users_sql, keyset_page.order_by), *page_params)
+            total = await estimate_total(conn, USERS_KEYSET, conditions, params)
             
-            return [UserStatsResponse(
+            return keyset_page.envelope(rows, total, lambda row: UserStatsResponse(
                 user_id=row['user_id'],
                 full_name=row['full_name'],
                 user_type=row['user_type'],
@@ -299,38 +385,118 @@ async def get_users_with_stats(user: AuthorizedUser):
                 pending_commissions=float(row['pending_commissions'] or 0),
                 paid_commissions=float(row['paid_commissions'] or 0),
                 last_activity=row['last_activity']
-            ) for row in rows]
+            ))
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des statistiques: {str(e)}")
 
 @router.get("/all-leads")
-async def get_all_leads_admin(user: AuthorizedUser):
+async def get_all_leads_admin(
+    user: AuthorizedUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: str | None = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    page: int = Query(1, ge=1, description="Numéro de page (sans curseur)"),
+    sort: str = Query("created_at", description="Tri (created_at, updated_at)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    status: str = Query("", description="Filtrer par statut"),
+    user_id: str = Query("", description="Filtrer par apporteur")
+):
     """
-    Récupère tous les leads de tous les apporteurs pour l'admin.
+    Récupère les leads de tous les apporteurs pour l'admin, par page.
     Accès restreint aux administrateurs.
     MISE À JOUR : Inclut maintenant prospect_city.
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
-            query = """
+        conditions, params = [], []
+        if status.strip():
+            params.append(status.strip())
+            conditions.append(f"l.status = ${len(params)}")
+        if user_id.strip():
+            try:
+                params.append(UUID(user_id.strip()))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Identifiant d'apporteur invalide")
+            conditions.append(f"l.user_id = ${len(params)}")
+        
+        keyset_page = KeysetPage(
+            LEADS_KEYSET, limit=limit, cursor=cursor, sort=sort, order=order, page=page,
+            filters={"status": status, "user_id": user_id}
+        )
+        query, page_params = keyset_page.query(
+            """
                 SELECT 
                     l.*,
                     up.full_name as apporteur_name,
                     up.user_type as apporteur_type
                 FROM leads l
                 JOIN user_profiles up ON l.user_id = up.user_id
-                ORDER BY l.created_at DESC
-            """
+            """,
+            conditions,
+            params
+        )
+        
+        async with get_db_connection(readonly=True) as conn:
+            rows = await conn.fetch(query, *page_params)
+            total = await estimate_total(conn, LEADS_KEYSET, conditions, params)
             
-            rows = await conn.fetch(query)
-            
-            return [{**dict(row)} for row in rows]
+            return keyset_page.envelope(rows, total)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des leads: {str(e)}")
 
+@router.get("/leads/search")
+async def search_leads_admin(
+    user: AuthorizedUser,
+    q: str = Query("", description="Texte recherché dans le nom, le téléphone ou l'email du prospect (3 caractères min.)"),
+    status: list[LeadStatus] = Query([], description="Statuts (plusieurs possibles)"),
+    user_id: str = Query("", description="Apporteur"),
+    city: str = Query("", description="Ville du prospect (insensible à la casse)"),
+    created_from: date | None = Query(None, description="Créés à partir de cette date (incluse)"),
+    created_to: date | None = Query(None, description="Créés jusqu'à cette date (incluse)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: str | None = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    sort: str = Query("created_at", description="Tri (created_at, updated_at)"),
+    order: str = Query("desc", pattern="^(asc|desc)$")
+):
+    """
+    Recherche filtrée et triée des leads côté serveur, par page.
+    Accès restreint aux administrateurs.
+    
+    Index requis (migration 003) :
+    - texte libre : index GIN trigramme (pg_trgm) sur LEAD_SEARCH_TEXT_SQL
+      (app.libs.lead_search), 3 caractères minimum ;
+    - statut, apporteur, ville : index composites (filtre, created_at, id),
+      qui servent à la fois le filtre et l'ordre de la pagination ;
+    - plage de dates seule : index (created_at, id) de la migration 002.
+    """
+    require_admin(user)
+    
+    try:
+        conditions, params, filters = lead_search_filters(
+            q, [s.value for s in status], user_id, city, created_from, created_to
+        )
+        keyset_page = KeysetPage(
+            LEADS_KEYSET, limit=limit, cursor=cursor, sort=sort, order=order, filters=filters
+        )
+        query, page_params = keyset_page.query(LEAD_SEARCH_SQL, conditions, params)
+        
+        async with get_db_connection(readonly=True) as conn:
+            rows = await conn.fetch(query, *page_params)
+            total = await estimate_total(conn, LEADS_KEYSET, conditions, params)
+            
+            return keyset_page.envelope(rows, total)
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Erreur lors de la recherche de leads: {e}")
+        raise HTTPException(status_code=500, detail="Erreur lors de la recherche de leads")
+
 @router.put("/update-lead-status")
 async def update_lead_status(request: UpdateLeadStatusRequest, user: AuthorizedUser):
     """
@@ -488,45 +654,163 @@ async def update_lead_status(request: UpdateLeadStatusRequest, user: AuthorizedU
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erreur lors de la mise à jour du lead: {e}")
+        log_error(f"Erreur lors de la mise à jour du lead: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la mise à jour: {str(e)}")
 
 @router.get("/all-users")
-async def get_all_users_admin(user: AuthorizedUser):
+async def get_all_users_admin(
+    user: AuthorizedUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: str | None = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    page: int = Query(1, ge=1, description="Numéro de page (sans curseur)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    user_type: str = Query("", description="Filtrer par type (particulier, professionnel)"),
+    search: str = Query("", description="Recherche sur le nom ou l'email")
+):
     """
-    Récupère tous les apporteurs pour l'admin.
+    Récupère les apporteurs pour l'admin, par page.
     Accès restreint aux administrateurs.
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
-            query = """
-                SELECT 
-                    up.*,
-                    COUNT(l.id) as total_leads,
-                    COALESCE(SUM(c.amount), 0) as total_commissions
-                FROM user_profiles up
-                LEFT JOIN leads l ON up.user_id = l.user_id
-                LEFT JOIN commissions c ON up.user_id = c.user_id AND c.status = 'pending'
-                GROUP BY up.user_id, up.full_name, up.user_type, up.gdpr_consent_date, up.created_at, up.updated_at
-                ORDER BY up.created_at DESC
-            """
-            
-            rows = await conn.fetch(query)
+        conditions, params = _user_filters(user_type, search)
+        keyset_page = KeysetPage(
+            USERS_KEYSET, limit=limit, cursor=cursor, order=order, page=page,
+            filters={"user_type": user_type, "search": search}
+        )
+        users_sql, page_params = keyset_page.query("SELECT * FROM user_profiles up", conditions, params)
+        
+        async with get_db_connection(readonly=True) as conn:
+            # Agrégats calculés pour les seuls utilisateurs de la page
+            rows = await conn.fetch(all_users_sql(users_sql, keyset_page.order_by), *page_params)
+            total = await estimate_total(conn, USERS_KEYSET, conditions, params)
             
-            return [{**dict(row)} for row in rows]
+            return keyset_page.envelope(rows, total)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des utilisateurs: {str(e)}")
 
+# ============= EXPORTS ADMIN (CSV / NDJSON EN FLUX) =============
+
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+@router.get("/export/leads")
+async def export_leads_admin(
+    user: AuthorizedUser,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv ou ndjson"),
+    status: list[LeadStatus] = Query([], description="Statuts (plusieurs possibles)")
+):
+    """
+    Exporte les leads de tous les apporteurs, en flux.
+    Accès restreint aux administrateurs.
+    """
+    require_admin(user)
+    conditions, params = [], []
+    if status:
+        params.append([s.value for s in status])
+        conditions.append(f"l.status = ANY(${len(params)})")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    return export_response(
+        f"""
+            SELECT 
+                l.*,
+                up.full_name as apporteur_name,
+                up.user_type as apporteur_type
+            FROM leads l
+            JOIN user_profiles up ON l.user_id = up.user_id
+            {where}
+            ORDER BY l.created_at, l.id
+        """,
+        params,
+        format,
+        "leads"
+    )
+
+@router.get("/export/payments")
+async def export_payments_admin(
+    user: AuthorizedUser,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv ou ndjson"),
+    status: str = Query("", description="Filtrer par statut (requested, paid, rejected)")
+):
+    """
+    Exporte les demandes de paiement, en flux.
+    Accès restreint aux administrateurs.
+    """
+    require_admin(user)
+    conditions, params = [], []
+    if status.strip():
+        params.append(status.strip())
+        conditions.append(f"p.status = ${len(params)}")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    return export_response(
+        f"""
+            SELECT 
+                p.id,
+                p.user_id::text as user_id,
+                up.full_name as apporteur_name,
+                p.amount_requested,
+                p.status,
+                p.requested_at,
+                p.processed_at
+            FROM payments p
+            JOIN user_profiles up ON p.user_id = up.user_id
+            {where}
+            ORDER BY p.requested_at, p.id
+        """,
+        params,
+        format,
+        "payments"
+    )
+
+@router.get("/export/contracts")
+async def export_contracts_admin(
+    user: AuthorizedUser,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv ou ndjson"),
+    signed_only: bool = Query(False, description="Uniquement les contrats signés")
+):
+    """
+    Exporte les contrats (sans le HTML), en flux.
+    Accès restreint aux administrateurs.
+    """
+    require_admin(user)
+    where = "WHERE c.is_signed" if signed_only else ""
+    
+    return export_response(
+        f"""
+            SELECT 
+                c.id,
+                c.user_id::text as user_id,
+                up.full_name as apporteur_name,
+                c.contract_type,
+                c.company_name,
+                c.siret_number,
+                c.is_signed,
+                c.signed_at,
+                c.created_at
+            FROM contracts c
+            LEFT JOIN user_profiles up ON c.user_id = up.user_id
+            {where}
+            ORDER BY c.created_at, c.id
+        """,
+        [],
+        format,
+        "contracts"
+    )
+
 # ============= ENDPOINTS MESSAGERIE ADMIN =============
 
-@router.get("/payment-requests", response_model=list[PaymentRequestResponse])
+@router.get("/payment-requests", response_model=Page[PaymentRequestResponse])
 async def get_payment_requests(
     user: AuthorizedUser,
-    page: int = Query(1, ge=1, description="Numéro de page"),
-    limit: int = Query(20, ge=1, le=100, description="Nombre d'éléments par page"),
-    status: str = Query("", description="Filtrer par statut (requested, paid, rejected)")
+    page: int = Query(1, ge=1, description="Numéro de page (sans curseur)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    status: str = Query("", description="Filtrer par statut (requested, paid, rejected)"),
+    cursor: str | None = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    order: str = Query("desc", pattern="^(asc|desc)$")
 ):
     """
     Récupère toutes les demandes de paiement avec pagination et filtrage.
@@ -534,28 +818,18 @@ async def get_payment_requests(
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
-            # Calculer l'offset
-            offset = (page - 1) * limit
-            
-            # Construire la condition de filtrage
-            filter_condition = ""
-            filter_params = []
-            if status.strip():
-                filter_condition = "WHERE p.status = $1"
-                filter_params = [status.strip()]
-            
-            # Compter le total
-            count_query = f"""
-                SELECT COUNT(*)
-                FROM payments p
-                JOIN user_profiles up ON p.user_id = up.user_id
-                {filter_condition}
+        # Construire la condition de filtrage
+        conditions, params = [], []
+        if status.strip():
+            params.append(status.strip())
+            conditions.append(f"p.status = ${len(params)}")
+        
+        keyset_page = KeysetPage(
+            PAYMENTS_KEYSET, limit=limit, cursor=cursor, order=order, page=page,
+            filters={"status": status}
+        )
+        query, page_params = keyset_page.query(
             """
-            total = await conn.fetchval(count_query, *filter_params)
-            
-            # Récupérer les données paginées
-            query = f"""
                 SELECT 
                     p.id,
                     p.user_id::text as user_id,
@@ -566,14 +840,16 @@ async def get_payment_requests(
                     p.processed_at
                 FROM payments p
                 JOIN user_profiles up ON p.user_id = up.user_id
-                {filter_condition}
-                ORDER BY p.requested_at DESC
-                LIMIT ${len(filter_params) + 1} OFFSET ${len(filter_params) + 2}
-            """
-            
-            rows = await conn.fetch(query, *filter_params, limit, offset)
+            """,
+            conditions,
+            params
+        )
+        
+        async with get_db_connection() as conn:
+            rows = await conn.fetch(query, *page_params)
+            total = await estimate_total(conn, PAYMENTS_KEYSET, conditions, params)
             
-            data = [PaymentRequestResponse(
+            return keyset_page.envelope(rows, total, lambda row: PaymentRequestResponse(
                 id=row['id'],
                 user_id=row['user_id'],
                 apporteur_name=row['apporteur_name'],
@@ -581,16 +857,10 @@ async def get_payment_requests(
                 status=row['status'],
                 requested_at=row['requested_at'],
                 processed_at=row['processed_at']
-            ) for row in rows]
-            
-            return {
-                "data": data,
-                "total": total,
-                "page": page,
-                "limit": limit,
-                "total_pages": (total + limit - 1) // limit
-            }
+            ))
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des demandes: {str(e)}")
 
@@ -656,7 +926,7 @@ async def get_anniversary_alerts(user: AuthorizedUser):
     """
     require_admin(user)
     try:
-        async with get_db_connection() as conn:
+        async with get_db_connection(readonly=True) as conn:
             query = """
                 SELECT 
                     up.user_id::text,
@@ -770,12 +1040,7 @@ async def request_payment_for_user(request: RequestPaymentForUserRequest, user:
                 raise HTTPException(status_code=404, detail="Utilisateur introuvable")
             
             # Récupérer le montant total des commissions en attente
-            total_commissions = await conn.fetchval(
-                """
-                SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE user_id = $1 AND status = 'pending'
-                """,
-                request.user_id
-            )
+            total_commissions = await fetch_pending_commission_balance(conn, request.user_id)
             
             if total_commissions == 0:
                 raise HTTPException(status_code=400, detail="Aucune commission en attente pour cet apporteur")
@@ -792,7 +1057,7 @@ async def request_payment_for_user(request: RequestPaymentForUserRequest, user:
             
             return RequestPaymentForUserResponse(
                 success=True,
-                amount_requested=float(total_commissions),
+                amount_requested=total_commissions,
                 message="Demande de paiement envoyée avec succès"
             )
             
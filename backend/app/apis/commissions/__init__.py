@@ -5,15 +5,14 @@ import databutton as db
 from app.auth import AuthorizedUser
 from uuid import UUID
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
-from app.libs.rate_limiter import rate_limit_payment
+from app.libs.logger import log_warning, log_error, log_db_error
+from app.libs.statements import fetch_pending_commission_balance
 
 router = APIRouter(prefix="/api/commissions", tags=["Commissions"])
 
 class CommissionBalance(BaseModel):
     due_balance: float
 
-@rate_limit_payment
 @router.get("/balance", response_model=CommissionBalance)
 async def get_commission_balance(user: AuthorizedUser, request: Request):
     """Get the pending commission balance for the authenticated user"""
@@ -24,29 +23,22 @@ async def get_commission_balance(user: AuthorizedUser, request: Request):
     try:
         user_uuid = UUID(user_id)
     except ValueError:
-        print(sanitize_log(f"Invalid UUID format for user_id"))
+        log_warning(f"Invalid UUID format for user_id")
         raise HTTPException(status_code=400, detail="Format d'identifiant utilisateur invalide") from None
     
     try:
         async with get_db_connection() as conn:
-            query = """
-                SELECT COALESCE(SUM(amount), 0) as total
-                FROM commissions
-                WHERE user_id = $1 AND status = 'pending'
-            """
-            
-            balance = await conn.fetchval(query, user_uuid)
+            balance = await fetch_pending_commission_balance(conn, user_uuid)
             
-            return CommissionBalance(due_balance=float(balance))
+            return CommissionBalance(due_balance=balance)
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_commission_balance: {e}"))
+        log_db_error(f"Database error in get_commission_balance: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_commission_balance"))
+        log_error(f"Unexpected error in get_commission_balance")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_payment
 @router.post("/request-payment")
 async def request_payment(user: AuthorizedUser, request: Request):
     """Request payment for pending commissions"""
@@ -57,14 +49,13 @@ async def request_payment(user: AuthorizedUser, request: Request):
     try:
         user_uuid = UUID(user_id)
     except ValueError:
-        print(sanitize_log(f"Invalid UUID format for user_id"))
+        log_warning(f"Invalid UUID format for user_id")
         raise HTTPException(status_code=400, detail="Format d'identifiant utilisateur invalide") from None
     
     try:
         async with get_db_connection() as conn:
             # Calculate total pending commissions
-            balance_query = "SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE user_id = $1 AND status = 'pending'"
-            pending_amount = await conn.fetchval(balance_query, user_uuid)
+            pending_amount = await fetch_pending_commission_balance(conn, user_uuid)
             
             if pending_amount == 0:
                 raise HTTPException(status_code=400, detail="No pending commissions to request payment for.")
@@ -75,16 +66,16 @@ async def request_payment(user: AuthorizedUser, request: Request):
                 VALUES ($1, $2, 'pending', NOW())
             """
             
-            await conn.execute(insert_query, user_uuid, float(pending_amount))
+            await conn.execute(insert_query, user_uuid, pending_amount)
             
             return Response(status_code=204)
 
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in request_payment: {e}"))
+        log_db_error(f"Database error in request_payment: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except HTTPException as e:
         # Re-raise HTTPException to preserve its status code and detail
         raise e
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in request_payment"))
+        log_error(f"Unexpected error in request_payment")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
@@ -3,17 +3,31 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 import asyncpg
+import json
 import uuid
 import databutton as db
 from app.auth import AuthorizedUser
 from app.libs.auth_utils import require_admin
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
-from app.libs.rate_limiter import rate_limit_contracts, rate_limit_admin
+from app.libs.logger import log_info, log_warning, log_error, log_db_error
 from app.libs.uuid_mapping import get_user_uuid
+from app.libs.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Keyset, KeysetPage, Page, estimate_total
+from app.libs.auth_utils import is_admin
+from app.libs.http_cache import if_none_match, not_modified_response, document_response
+from app.libs.contract_template import (
+    CONTRACT_TEMPLATE, SIGNATURE_FIELDS, SIGNATURE_PLACEHOLDERS, fill_slots, french_date
+)
+from app.libs.contract_store import SIGNATURE_DATETIME_FORMAT, TEMPLATE_HASH, contract_store
 
 router = APIRouter()
 
+# Ordre de parcours de la liste admin des contrats (pagination par curseur)
+CONTRACTS_KEYSET = Keyset(
+    table="contracts c",
+    id_column="c.id",
+    sort_columns={"created_at": "c.created_at"},
+)
+
 # Models
 class ContractGenerationRequest(BaseModel):
     company_name: str  # Nom de l'entreprise ou raison sociale
@@ -28,92 +42,51 @@ class ContractResponse(BaseModel):
     company_name: str
     siret_number: str
     contract_html: str
+    content_hash: Optional[str] = None  # SHA-256 du HTML, pour vérifier l'intégrité du document
     is_signed: bool
     signed_at: Optional[datetime] = None
     created_at: datetime
 
-# Template HTML du contrat
-CONTRAT_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Contrat d'Apporteur d'Affaires</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 20px; color: #333; }
-        .header { text-align: center; margin-bottom: 30px; border-bottom: 2px solid #2563eb; padding-bottom: 20px; }
-        .parties { margin-bottom: 30px; background: #f8fafc; padding: 20px; border-radius: 8px; }
-        .article { margin-bottom: 25px; }
-        .article-title { font-weight: bold; color: #1e40af; margin-bottom: 10px; }
-        .signature-section { margin-top: 40px; border-top: 1px solid #ddd; padding-top: 20px; }
-        .signature-info { background: #f0f9ff; padding: 15px; border-radius: 8px; margin-top: 10px; }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>CONTRAT D'APPORTEUR D'AFFAIRES</h1>
-    </div>
-    
-    <div class="parties">
-        <h2>ENTRE LES SOUSSIGNÉS :</h2>
-        <p><strong>Mandant :</strong><br>
-        Stéphane Aldrighettoni, Agent commercial MS-Voltalia<br>
-        134 rue amiral Nomy, 83000 Toulon</p>
-        
-        <p><strong>Et :</strong><br>
-        <strong>L'Apporteur d'affaires :</strong> {company_name}<br>
-        <strong>SIRET :</strong> {siret_number}</p>
-    </div>
-    
-    <div class="article">
-        <div class="article-title">Article 1 - Objet</div>
-        <p>Le présent contrat a pour objet de définir les conditions dans lesquelles l'Apporteur d'affaires présente des prospects au Mandant pour la conclusion de contrats d'installation de solutions solaires.</p>
-    </div>
-    
-    <div class="article">
-        <div class="article-title">Article 2 - Obligations de l'Apporteur</div>
-        <p>L'Apporteur s'engage à :</p>
-        <ul>
-            <li>Présenter des clients potentiels au Mandant</li>
-            <li>Garantir l'exactitude des informations transmises</li>
-            <li>Informer sur les solutions proposées si besoin</li>
-            <li>Annoncer les prix d'installation et engager l'agent commercial</li>
-            <li>Obtenir le consentement préalable des prospects conformément au RGPD</li>
-        </ul>
-    </div>
-    
-    <div class="article">
-        <div class="article-title">Article 3 - Rémunération</div>
-        <p>L'Apporteur percevra une commission de <strong>5% sur le montant HT</strong> de la solution vendue et installée.</p>
-        <p>Cette commission est due uniquement après :</p>
-        <ul>
-            <li>Signature du contrat final par le client</li>
-            <li>Mise en service effective de l'installation</li>
-        </ul>
-        <p>Le paiement sera effectué sous 30 jours après réception de la facture.</p>
-    </div>
-    
-    <div class="article">
-        <div class="article-title">Article 4 - Durée</div>
-        <p>Le présent contrat est conclu pour une durée indéterminée. Il peut être résilié par chacune des parties avec un préavis de 30 jours.</p>
-    </div>
-    
-    <div class="signature-section">
-        <p><strong>Fait à Montpellier le :</strong> {signature_date}</p>
-        <p><strong>Signature électronique validée</strong></p>
-        <div class="signature-info">
-            <p><strong>Informations de signature :</strong></p>
-            <p>• Date et heure : {signature_datetime}<br>
-            • Adresse IP : {signature_ip}<br>
-            • Statut : Contrat signé électroniquement</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
+class ContractSummary(BaseModel):
+    """Ligne de la liste admin : métadonnées seulement (HTML via /contracts/{id}/body)"""
+    id: int
+    user_id: Optional[str] = None
+    user_full_name: Optional[str] = None
+    contract_type: str
+    company_name: str
+    siret_number: str
+    is_signed: bool
+    signed_at: Optional[datetime] = None
+    created_at: datetime
+
+async def _insert_contract_html(conn, user_uuid: str, fields: dict):
+    """Insertion avec le HTML complet, pour une base sans la migration 005"""
+    # Les champs de signature gardent leurs marqueurs, dont les positions
+    # sont stockées pour la signature
+    contract_html, signature_slots = CONTRACT_TEMPLATE.render_with_slots(
+        {**fields, **SIGNATURE_PLACEHOLDERS},
+        SIGNATURE_FIELDS
+    )
+    try:
+        return await conn.fetchrow(
+            """
+            INSERT INTO contracts (user_id, company_name, siret_number, contract_html, signature_slots)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING *
+            """,
+            user_uuid, fields["company_name"], fields["siret_number"], contract_html, signature_slots
+        )
+    except asyncpg.UndefinedColumnError:
+        # Migration 004 pas encore appliquée : la signature recherchera les marqueurs
+        return await conn.fetchrow(
+            """
+            INSERT INTO contracts (user_id, company_name, siret_number, contract_html)
+            VALUES ($1, $2, $3, $4)
+            RETURNING *
+            """,
+            user_uuid, fields["company_name"], fields["siret_number"], contract_html
+        )
 
-@rate_limit_contracts
 @router.post("/generate-contract")
 async def generate_contract(request_data: ContractGenerationRequest, user: AuthorizedUser, request: Request):
     """Génère un nouveau contrat pour l'utilisateur"""
@@ -148,57 +121,53 @@ async def generate_contract(request_data: ContractGenerationRequest, user: Autho
             company_name = request_data.company_name
             siret_number = request_data.siret_number
             
-            # Formater la date du jour en français (sans lieu car le template contient déjà "Montpellier")
-            current_date = datetime.now()
-            # Format: "11 juillet 2025" (sans ville car template dit "Fait à Montpellier le :")
-            months_fr = [
-                "", "janvier", "février", "mars", "avril", "mai", "juin",
-                "juillet", "août", "septembre", "octobre", "novembre", "décembre"
-            ]
-            signature_date_french = f"{current_date.day} {months_fr[current_date.month]} {current_date.year}"
+            # Date du jour en français, ex: "11 juillet 2025" (le template contient déjà "Fait à Montpellier le :")
+            signature_date_french = french_date(datetime.now())
             
-            # Générer le HTML du contrat avec les vrais champs
-            contract_html = CONTRAT_TEMPLATE
-            contract_html = contract_html.replace("{company_name}", company_name)
-            contract_html = contract_html.replace("{siret_number}", siret_number)
-            contract_html = contract_html.replace("{signature_date}", signature_date_french)
-            contract_html = contract_html.replace("{signature_datetime}", "[SIGNATURE_DATETIME_PLACEHOLDER]")
-            contract_html = contract_html.replace("{signature_ip}", "[SIGNATURE_IP_PLACEHOLDER]")
+            # Stockage par contenu : empreinte du template, champs variables et
+            # empreinte du document rendu (voir app.libs.contract_store)
+            fields = {
+                "company_name": company_name,
+                "siret_number": siret_number,
+                "signature_date": signature_date_french,
+            }
+            contract_html, digest = contract_store.render_new(fields)
             
             # Insérer en base de données
-            contract_id = await conn.fetchval(
-                """
-                INSERT INTO contracts (user_id, company_name, siret_number, contract_html)
-                VALUES ($1, $2, $3, $4)
-                RETURNING id
-                """,
-                user_uuid, company_name, siret_number, contract_html
-            )
-            
-            # Récupérer le contrat créé
-            contract_data = await conn.fetchrow(
-                "SELECT * FROM contracts WHERE id = $1", contract_id
-            )
+            try:
+                await contract_store.register_current_template(conn)
+                contract_data = await conn.fetchrow(
+                    """
+                    INSERT INTO contracts (user_id, company_name, siret_number, template_hash, fields, content_hash)
+                    VALUES ($1, $2, $3, $4, $5::jsonb, $6)
+                    RETURNING *
+                    """,
+                    user_uuid, company_name, siret_number, TEMPLATE_HASH, json.dumps(fields), digest
+                )
+            except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError):
+                # Migration 005 pas encore appliquée : HTML complet
+                log_warning("Contract content storage missing, apply migrations")
+                contract_data = await _insert_contract_html(conn, user_uuid, fields)
             
             return ContractResponse(
                 id=contract_data['id'],
                 contract_type=contract_data['contract_type'],
                 company_name=contract_data['company_name'],
                 siret_number=contract_data['siret_number'],
-                contract_html=contract_data['contract_html'],
+                contract_html=contract_html,
+                content_hash=contract_data.get('content_hash'),
                 is_signed=contract_data['is_signed'],
                 signed_at=contract_data['signed_at'],
                 created_at=contract_data['created_at']
             )
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in generate_contract: {e}"))
+        log_db_error(f"Database error in generate_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in generate_contract: {e}"))
+        log_error(f"Unexpected error in generate_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la génération du contrat")
 
-@rate_limit_contracts
 @router.post("/sign-contract")
 async def sign_contract(request_data: ContractSignatureRequest, user: AuthorizedUser, request: Request):
     """Signe électroniquement un contrat"""
@@ -230,25 +199,56 @@ async def sign_contract(request_data: ContractSignatureRequest, user: Authorized
             if contract['is_signed']:
                 raise HTTPException(status_code=400, detail="Contrat déjà signé")
             
-            # Mettre à jour le HTML avec les informations de signature
-            updated_html = contract['contract_html'].replace(
-                "[SIGNATURE_DATETIME_PLACEHOLDER]",
-                signature_datetime.strftime("%d/%m/%Y à %H:%M:%S")
-            ).replace(
-                "[SIGNATURE_IP_PLACEHOLDER]",
-                client_ip,
-                1  # Remplacer seulement la première occurrence pour l'IP
-            )
+            signature_values = [signature_datetime.strftime(SIGNATURE_DATETIME_FORMAT), client_ip]
             
-            # Marquer le contrat comme signé
-            await conn.execute(
-                """
-                UPDATE contracts 
-                SET is_signed = TRUE, signed_at = $1, signature_ip = $2, contract_html = $3, updated_at = $1
-                WHERE id = $4
-                """,
-                signature_datetime, client_ip, updated_html, contract['id']
-            )
+            if contract.get('fields') is not None:
+                # Stockage par contenu : seuls les champs et l'empreinte changent
+                fields = contract['fields']
+                if isinstance(fields, str):
+                    fields = json.loads(fields)
+                fields.update(zip(SIGNATURE_FIELDS, signature_values))
+                # Même version du template qu'à la génération
+                _, digest = await contract_store.render(conn, contract['template_hash'], fields)
+                
+                await conn.execute(
+                    """
+                    UPDATE contracts 
+                    SET is_signed = TRUE, signed_at = $1, signature_ip = $2, fields = $3::jsonb,
+                        content_hash = $4, updated_at = $1
+                    WHERE id = $5
+                    """,
+                    signature_datetime, client_ip, json.dumps(fields), digest, contract['id']
+                )
+            else:
+                # Contrat stocké en HTML complet : mettre à jour le HTML
+                updated_html = None
+                if contract.get('signature_slots'):
+                    updated_html = fill_slots(
+                        contract['contract_html'],
+                        contract['signature_slots'],
+                        signature_values,
+                        expected=[SIGNATURE_PLACEHOLDERS[name] for name in SIGNATURE_FIELDS]
+                    )
+                if updated_html is None:
+                    # Contrats générés avant le stockage des positions
+                    updated_html = contract['contract_html'].replace(
+                        "[SIGNATURE_DATETIME_PLACEHOLDER]",
+                        signature_values[0]
+                    ).replace(
+                        "[SIGNATURE_IP_PLACEHOLDER]",
+                        client_ip,
+                        1  # Remplacer seulement la première occurrence pour l'IP
+                    )
+                
+                # Marquer le contrat comme signé
+                await conn.execute(
+                    """
+                    UPDATE contracts 
+                    SET is_signed = TRUE, signed_at = $1, signature_ip = $2, contract_html = $3, updated_at = $1
+                    WHERE id = $4
+                    """,
+                    signature_datetime, client_ip, updated_html, contract['id']
+                )
             
             # Récupérer le contrat mis à jour
             updated_contract = await conn.fetchrow(
@@ -264,7 +264,7 @@ async def sign_contract(request_data: ContractSignatureRequest, user: Authorized
                 )
                 
                 if not user_profile or not user_profile['email']:
-                    print(f"Impossible d'envoyer l'email: profil ou email manquant pour {user_uuid}")
+                    log_warning(f"Impossible d'envoyer l'email: profil ou email manquant pour {user_uuid}")
                     # Continuer sans erreur, l'important est que le contrat soit signé
                 else:
                     user_name = user_profile['full_name'] if user_profile else "Apporteur d'affaires"
@@ -332,10 +332,10 @@ async def sign_contract(request_data: ContractSignatureRequest, user: Authorized
                         Ce contrat a été signé électroniquement et a la même valeur juridique qu'une signature manuscrite.
                         """
                     )
-                    print(f"Email de confirmation envoyé à {user_email}")
+                    log_info(f"Email de confirmation envoyé à {user_email}")
                 
             except Exception as email_error:
-                print(f"Erreur lors de l'envoi de l'email : {email_error}")
+                log_error(f"Erreur lors de l'envoi de l'email : {email_error}")
                 # Ne pas faire échouer la signature si l'email ne part pas
             
             return ContractResponse(
@@ -343,7 +343,8 @@ async def sign_contract(request_data: ContractSignatureRequest, user: Authorized
                 contract_type=updated_contract['contract_type'],
                 company_name=updated_contract['company_name'],
                 siret_number=updated_contract['siret_number'],
-                contract_html=updated_contract['contract_html'],
+                contract_html=await contract_store.body(conn, updated_contract),
+                content_hash=updated_contract.get('content_hash'),
                 is_signed=updated_contract['is_signed'],
                 signed_at=updated_contract['signed_at'],
                 created_at=updated_contract['created_at']
@@ -352,10 +353,10 @@ async def sign_contract(request_data: ContractSignatureRequest, user: Authorized
     except HTTPException:
         raise
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in sign_contract: {e}"))
+        log_db_error(f"Database error in sign_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in sign_contract: {e}"))
+        log_error(f"Unexpected error in sign_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la signature du contrat")
 
 @router.get("/my-contract")
@@ -380,51 +381,127 @@ async def get_my_contract(user: AuthorizedUser) -> Optional[ContractResponse]:
                 contract_type=contract['contract_type'],
                 company_name=contract['company_name'],
                 siret_number=contract['siret_number'],
-                contract_html=contract['contract_html'],
+                contract_html=await contract_store.body(conn, contract),
+                content_hash=contract.get('content_hash'),
                 is_signed=contract['is_signed'],
                 signed_at=contract['signed_at'],
                 created_at=contract['created_at']
             )
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_my_contract: {e}"))
+        log_db_error(f"Database error in get_my_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données") from None
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_my_contract: {e}"))
+        log_error(f"Unexpected error in get_my_contract: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération du contrat") from None
 
-@router.get("/all-contracts")
-async def get_all_contracts(user: AuthorizedUser) -> List[ContractResponse]:
-    """Récupère tous les contrats (admin seulement)"""
+@router.get("/all-contracts", response_model=Page[ContractSummary])
+async def get_all_contracts(
+    user: AuthorizedUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    page: int = Query(1, ge=1, description="Numéro de page (sans curseur)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    signed_only: bool = Query(False, description="Uniquement les contrats signés"),
+    contract_type: str = Query("", description="Filtrer par type de contrat")
+):
+    """
+    Récupère les contrats par page (admin seulement).
+    Métadonnées uniquement : le HTML se lit avec GET /contracts/{id}/body.
+    """
     require_admin(user)
 
     try:
+        conditions, params = [], []
+        if signed_only:
+            conditions.append("c.is_signed")
+        if contract_type.strip():
+            params.append(contract_type.strip())
+            conditions.append(f"c.contract_type = ${len(params)}")
+        
+        keyset_page = KeysetPage(
+            CONTRACTS_KEYSET, limit=limit, cursor=cursor, order=order, page=page,
+            filters={"signed_only": signed_only, "contract_type": contract_type}
+        )
+        query, page_params = keyset_page.query(
+            """
+                SELECT c.id, c.user_id::text, up.full_name AS user_full_name,
+                       c.contract_type, c.company_name, c.siret_number,
+                       c.is_signed, c.signed_at, c.created_at
+                FROM contracts c
+                LEFT JOIN user_profiles up ON up.user_id = c.user_id
+            """,
+            conditions,
+            params
+        )
+        
         async with get_db_connection() as conn:
-            # Récupérer tous les contrats
-            contracts = await conn.fetch(
-                "SELECT * FROM contracts"
-            )
-            
-            result = []
-            for contract in contracts:
-                # Créer un dictionnaire avec les données du contrat
-                contract_dict = {
-                    "id": contract['id'],
-                    "contract_type": contract['contract_type'],
-                    "company_name": contract['company_name'],
-                    "siret_number": contract['siret_number'],
-                    "contract_html": contract['contract_html'],
-                    "is_signed": contract['is_signed'],
-                    "signed_at": contract['signed_at'],
-                    "created_at": contract['created_at']
-                }
-                result.append(contract_dict)
+            contracts = await conn.fetch(query, *page_params)
+            total = await estimate_total(conn, CONTRACTS_KEYSET, conditions, params)
             
-            return result
+            return keyset_page.envelope(contracts, total)
             
+    except HTTPException:
+        raise
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_all_contracts: {e}"))
+        log_db_error(f"Database error in get_all_contracts: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_all_contracts: {e}"))
+        log_error(f"Unexpected error in get_all_contracts: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des contrats")
+
+# Le HTML stocké (anciens contrats) n'est renvoyé que si son empreinte
+# diffère de celle connue du client ; les autres sont reconstruits
+CONTRACT_BODY_SQL = """
+    SELECT id, user_id, template_hash, fields, content_hash,
+           CASE WHEN content_hash = $2 THEN NULL ELSE contract_html END AS contract_html
+    FROM contracts
+    WHERE id = $1
+"""
+
+# Base sans la migration 005 : tout le HTML est stocké
+LEGACY_CONTRACT_BODY_SQL = """
+    SELECT id, user_id, md5(contract_html) AS content_hash,
+           CASE WHEN md5(contract_html) = $2 THEN NULL ELSE contract_html END AS contract_html
+    FROM contracts
+    WHERE id = $1
+"""
+
+@router.get("/contracts/{contract_id}/body")
+async def get_contract_body(contract_id: int, request: Request, user: AuthorizedUser):
+    """
+    HTML d'un contrat (admin ou titulaire du contrat), avec ETag.
+    Renvoie 304 si If-None-Match correspond ; compressé selon Accept-Encoding.
+    """
+    # Empreinte envoyée par le client : le HTML n'est pas relu s'il l'a déjà
+    known_digest = request.headers.get("if-none-match", "").strip().removeprefix("W/").strip('"')
+
+    try:
+        async with get_db_connection(readonly=True) as conn:
+            try:
+                contract = await conn.fetchrow(CONTRACT_BODY_SQL, contract_id, known_digest)
+            except asyncpg.UndefinedColumnError:
+                contract = await conn.fetchrow(LEGACY_CONTRACT_BODY_SQL, contract_id, known_digest)
+
+            # Même réponse qu'un contrat inexistant pour ne pas révéler les identifiants
+            if not contract or (not is_admin(user) and str(contract['user_id']) != get_user_uuid(user.sub)):
+                raise HTTPException(status_code=404, detail="Contrat non trouvé")
+            if contract['content_hash'] is None:
+                raise HTTPException(status_code=404, detail="Contrat sans contenu")
+
+            # L'empreinte SHA-256 du document sert d'ETag
+            etag = f'"{contract["content_hash"]}"'
+            if if_none_match(request, etag):
+                return not_modified_response(etag)
+
+            contract_html = await contract_store.body(conn, contract)
+    except HTTPException:
+        raise
+    except asyncpg.PostgresError as e:
+        log_db_error(f"Database error in get_contract_body: {e}")
+        raise HTTPException(status_code=500, detail="Erreur de base de données") from None
+    except Exception as e:
+        log_error(f"Unexpected error in get_contract_body: {e}")
+        raise HTTPException(status_code=500, detail="Erreur lors de la récupération du contrat") from None
+
+    return document_response(request, contract_html, etag)
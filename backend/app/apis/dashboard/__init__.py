@@ -6,7 +6,13 @@ from app.auth import AuthorizedUser
 from app.libs.models import Lead, LeadStatus, UserProfile
 from uuid import UUID
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
+from app.libs.logger import log_warning, log_error, log_db_error
+from app.libs.statements import (
+    fetch_lead_status_counts,
+    fetch_pending_commission_balance,
+    fetch_recent_leads,
+    fetch_user_profile,
+)
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
@@ -34,39 +40,26 @@ async def get_dashboard_data(user: AuthorizedUser):
         try:
             user_uuid = UUID(user_id)
         except ValueError:
-            print(sanitize_log(f"Invalid UUID format for user_id: {user_id}"))
+            log_warning(f"Invalid UUID format for user_id: {user_id}")
             raise HTTPException(status_code=400, detail="Format d'identifiant utilisateur invalide") from None
     else:
         try:
             user_uuid = UUID(user_id)
         except (ValueError, TypeError):
-            print(sanitize_log(f"Invalid UUID format for user_id: {user_id}"))
+            log_warning(f"Invalid UUID format for user_id: {user_id}")
             raise HTTPException(status_code=400, detail="Format d'identifiant utilisateur invalide") from None
     
     try:
         async with get_db_connection() as conn:
             # --- Fetch User Profile ---
-            profile_row = await conn.fetchrow(
-                "SELECT * FROM user_profiles WHERE user_id = $1", user_uuid
-            )
+            profile_row = await fetch_user_profile(conn, user_uuid)
             if not profile_row:
                 # User has no profile - redirect to onboarding instead of creating default
                 raise HTTPException(status_code=404, detail="Profil utilisateur non trouvé. Veuillez compléter votre onboarding.")
             user_profile = UserProfile.model_validate(dict(profile_row))
 
             # --- Fetch Lead Stats ---
-            lead_stats_query = """
-                SELECT 
-                    status,
-                    COUNT(*) as count
-                FROM leads 
-                WHERE user_id = $1 
-                GROUP BY status
-            """
-            lead_stats_rows = await conn.fetch(lead_stats_query, user_uuid)
-
-            # Convert to dictionary for easier access
-            lead_stats_dict = {row['status']: row['count'] for row in lead_stats_rows}
+            lead_stats_dict = await fetch_lead_status_counts(conn, user_uuid)
 
             # Build stats with defaults for missing statuses
             stats = DashboardStats(
@@ -78,34 +71,25 @@ async def get_dashboard_data(user: AuthorizedUser):
             )
 
             # --- Fetch Commission Balance ---
-            commission_balance = await conn.fetchval(
-                "SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE user_id = $1 AND status = 'pending'",
-                user_uuid
-            )
+            commission_balance = await fetch_pending_commission_balance(conn, user_uuid)
 
             # --- Fetch Recent Leads ---
-            recent_leads_query = """
-                SELECT * FROM leads 
-                WHERE user_id = $1 
-                ORDER BY created_at DESC 
-                LIMIT 5
-            """
-            recent_leads_rows = await conn.fetch(recent_leads_query, user_uuid)
+            recent_leads_rows = await fetch_recent_leads(conn, user_uuid, limit=5)
             recent_leads = [Lead.model_validate(dict(row)) for row in recent_leads_rows]
 
             return DashboardResponse(
                 user_profile=user_profile,
                 stats=stats,
-                commission_balance=float(commission_balance) if commission_balance else 0.0,
+                commission_balance=commission_balance,
                 recent_leads=recent_leads,
             )
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_dashboard_data: {e}"))
+        log_db_error(f"Database error in get_dashboard_data: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except HTTPException:
         # Re-raise HTTPException to preserve status code and detail
         raise
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_dashboard_data: {e}"))
+        log_error(f"Unexpected error in get_dashboard_data: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
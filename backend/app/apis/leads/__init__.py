@@ -7,8 +7,8 @@ from datetime import datetime
 from app.libs.models import Lead, CommissionStatus
 from uuid import UUID
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
-from app.libs.rate_limiter import rate_limit_leads_submit, rate_limit_public
+from app.libs.logger import log_warning, log_error, log_db_error
+from app.libs.statements import fetch_user_leads_with_commission_status, fetch_user_type
 
 router = APIRouter(prefix="/api/leads", tags=["Leads"])
 
@@ -22,7 +22,6 @@ class CreateLeadRequest(BaseModel):
 class LeadDetails(Lead):
     commission_status: CommissionStatus | None = None
 
-@rate_limit_leads_submit
 @router.post("/submit", status_code=201)
 async def submit_lead(lead_data: CreateLeadRequest, user: AuthorizedUser, request: Request):
     """
@@ -37,16 +36,13 @@ async def submit_lead(lead_data: CreateLeadRequest, user: AuthorizedUser, reques
     try:
         async with get_db_connection() as conn:
             # Vérifier le type d'utilisateur et la limite pour les particuliers
-            user_info = await conn.fetchrow(
-                "SELECT user_type FROM user_profiles WHERE user_id = $1",
-                user_uuid
-            )
+            user_type = await fetch_user_type(conn, user_uuid)
             
-            if not user_info:
+            if not user_type:
                 raise HTTPException(status_code=404, detail="Profil utilisateur introuvable")
             
             # Blocage pour les particuliers : max 5 parrainages par an
-            if user_info['user_type'] == 'particulier':
+            if user_type == 'particulier':
                 # Calculer les leads cette année civile
                 current_year = datetime.utcnow().year
                 
@@ -86,13 +82,12 @@ async def submit_lead(lead_data: CreateLeadRequest, user: AuthorizedUser, reques
     except HTTPException:
         raise
     except asyncpg.PostgresError as e:
-        print(sanitize_log(f"Database error in submit_lead: {e}"))
+        log_error(f"Database error in submit_lead: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in submit_lead: {e}"))
+        log_error(f"Unexpected error in submit_lead: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-@rate_limit_public
 @router.get("", response_model=list[LeadDetails])
 async def get_all_leads(user: AuthorizedUser, request: Request):
     """
@@ -105,28 +100,18 @@ async def get_all_leads(user: AuthorizedUser, request: Request):
     try:
         user_uuid = UUID(user_id)
     except ValueError:
-        print(sanitize_log(f"Invalid UUID format for user_id: {user_id}"))
+        log_warning(f"Invalid UUID format for user_id: {user_id}")
         raise HTTPException(status_code=400, detail="Format d'identifiant utilisateur invalide") from None
     
     try:
-        conn = await get_db_connection()
-        query = """
-            SELECT 
-                l.*, 
-                c.status as commission_status
-            FROM leads l
-            LEFT JOIN commissions c ON l.id = c.lead_id
-            WHERE l.user_id = $1
-            ORDER BY l.created_at DESC
-        """
-        
-        rows = await conn.fetch(query, user_uuid)
+        async with get_db_connection() as conn:
+            rows = await fetch_user_leads_with_commission_status(conn, user_uuid)
         
         return [LeadDetails.model_validate(dict(row)) for row in rows]
 
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_all_leads: {e}"))
+        log_db_error(f"Database error in get_all_leads: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_all_leads"))
+        log_error(f"Unexpected error in get_all_leads")
         raise HTTPException(status_code=500, detail=f"An error occurred while fetching leads: {str(e)}")
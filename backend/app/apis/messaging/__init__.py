@@ -7,8 +7,7 @@ from datetime import datetime
 from app.libs.models import Message, MessageType, SenderType, AnnouncementRead
 from app.libs.auth_utils import require_admin
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
-from app.libs.rate_limiter import rate_limit_messaging, rate_limit_admin
+from app.libs.logger import log_error, log_db_error
 
 router = APIRouter(prefix="/api/messaging", tags=["Messaging"])
 
@@ -35,7 +34,6 @@ class MessagesResponse(BaseModel):
 
 # ============= ENDPOINTS ADMIN =============
 
-@rate_limit_admin
 @router.get("/admin/received")
 async def get_admin_received_messages(user: AuthorizedUser, request: Request):
     """
@@ -71,13 +69,12 @@ async def get_admin_received_messages(user: AuthorizedUser, request: Request):
             return {"messages": messages}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_admin_received_messages: {e}"))
+        log_db_error(f"Database error in get_admin_received_messages: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_admin_received_messages: {e}"))
+        log_error(f"Unexpected error in get_admin_received_messages: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_admin
 @router.post("/send-announcement")
 async def send_announcement(request_data: SendAnnouncementRequest, user: AuthorizedUser, request: Request):
     """
@@ -105,13 +102,12 @@ async def send_announcement(request_data: SendAnnouncementRequest, user: Authori
             return {"message": "Annonce envoyée avec succès"}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in send_announcement: {e}"))
+        log_db_error(f"Database error in send_announcement: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in send_announcement: {e}"))
+        log_error(f"Unexpected error in send_announcement: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_messaging
 @router.delete("/delete-for-user")
 async def delete_message_for_user(request_data: DeleteMessageRequest, user: AuthorizedUser, request: Request):
     """
@@ -158,17 +154,16 @@ async def delete_message_for_user(request_data: DeleteMessageRequest, user: Auth
             return {"message": "Message supprimé avec succès"}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in delete_message_for_user: {e}"))
+        log_db_error(f"Database error in delete_message_for_user: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except HTTPException:
         raise
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in delete_message_for_user: {e}"))
+        log_error(f"Unexpected error in delete_message_for_user: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
 # ============= ENDPOINTS APPORTEUR =============
 
-@rate_limit_messaging
 @router.get("/my-messages", response_model=MessagesResponse)
 async def get_my_messages(user: AuthorizedUser, request: Request):
     """
@@ -222,13 +217,12 @@ async def get_my_messages(user: AuthorizedUser, request: Request):
             )
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_my_messages: {e}"))
+        log_db_error(f"Database error in get_my_messages: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_my_messages: {e}"))
+        log_error(f"Unexpected error in get_my_messages: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_messaging
 @router.post("/mark-announcement-read")
 async def mark_announcement_read(request_data: MarkAsReadRequest, user: AuthorizedUser, request: Request):
     """
@@ -261,15 +255,14 @@ async def mark_announcement_read(request_data: MarkAsReadRequest, user: Authoriz
             return {"message": "Annonce marquée comme lue"}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in mark_announcement_read: {e}"))
+        log_db_error(f"Database error in mark_announcement_read: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except HTTPException:
         raise
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in mark_announcement_read: {e}"))
+        log_error(f"Unexpected error in mark_announcement_read: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_messaging
 @router.post("/mark-private-message-read")
 async def mark_private_message_read(request_data: MarkAsReadRequest, user: AuthorizedUser, request: Request):
     """
@@ -296,15 +289,14 @@ async def mark_private_message_read(request_data: MarkAsReadRequest, user: Autho
             return {"message": "Message marqué comme lu"}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in mark_private_message_read: {e}"))
+        log_db_error(f"Database error in mark_private_message_read: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except HTTPException:
         raise
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in mark_private_message_read: {e}"))
+        log_error(f"Unexpected error in mark_private_message_read: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
 
-@rate_limit_messaging
 @router.post("/send-private-message")
 async def send_private_message_from_user(request_data: SendPrivateMessageRequest, user: AuthorizedUser, request: Request):
     """
@@ -336,8 +328,8 @@ async def send_private_message_from_user(request_data: SendPrivateMessageRequest
             return {"message": "Message envoyé à l'administrateur"}
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in send_private_message_from_user: {e}"))
+        log_db_error(f"Database error in send_private_message_from_user: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in send_private_message_from_user: {e}"))
+        log_error(f"Unexpected error in send_private_message_from_user: {e}")
         raise HTTPException(status_code=500, detail="Erreur inattendue")
@@ -7,7 +7,7 @@ import databutton as db
 from app.auth import AuthorizedUser
 from app.env import Mode, mode
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error, sanitize_auth_log
+from app.libs.logger import log_info, log_error, log_db_error
 
 router = APIRouter()
 
@@ -151,10 +151,10 @@ async def accept_referral_guide(request: GuideAcceptanceRequest, user: Authorize
                     Vous avez accepté ce guide le {acceptance['accepted_at'].strftime('%d/%m/%Y à %H:%M:%S')} depuis l'adresse IP {client_ip}.
                     """
                 )
-                print(sanitize_log(f"Email de confirmation du guide envoyé"))
+                log_info(f"Email de confirmation du guide envoyé")
                 
             except Exception as email_error:
-                print(sanitize_log(f"Erreur lors de l'envoi de l'email"))
+                log_error(f"Erreur lors de l'envoi de l'email")
                 # Ne pas faire échouer l'acceptation si l'email ne part pas
             
             return GuideAcceptanceResponse(
@@ -167,10 +167,10 @@ async def accept_referral_guide(request: GuideAcceptanceRequest, user: Authorize
     except HTTPException:
         raise
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in accept_referral_guide: {e}"))
+        log_db_error(f"Database error in accept_referral_guide: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in accept_referral_guide"))
+        log_error(f"Unexpected error in accept_referral_guide")
         raise HTTPException(status_code=500, detail="Erreur lors de l'acceptation du guide")
 
 @router.get("/referral-guide-status")
@@ -194,8 +194,8 @@ async def get_referral_guide_status(user: AuthorizedUser):
                 )
             
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in get_referral_guide_status: {e}"))
+        log_db_error(f"Database error in get_referral_guide_status: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in get_referral_guide_status"))
+        log_error(f"Unexpected error in get_referral_guide_status")
         raise HTTPException(status_code=500, detail="Erreur lors de la vérification du statut")
@@ -6,7 +6,8 @@ from app.auth import AuthorizedUser
 from app.libs.models import UserType
 from uuid import UUID
 from app.libs.database_pool import get_db_connection
-from app.libs.log_sanitizer import sanitize_log, sanitize_db_error
+from app.libs.logger import log_error, log_db_error
+from app.libs.statements import fetch_user_profile
 
 router = APIRouter()
 
@@ -57,50 +58,47 @@ async def create_user_profile(request: CreateUserProfileRequest, user: Authorize
         user_uuid = get_user_uuid(user_id)
         user_param = UUID(user_uuid)
 
-    conn = None
     try:
-        conn = await asyncpg.connect(db.secrets.get("DATABASE_URL_DEV"))
-
-        # Vérifier si le profil existe déjà
-        existing_profile = await conn.fetchrow(
-            "SELECT user_id FROM user_profiles WHERE user_id = $1",
-            user_param
-        )
-
-        if existing_profile:
-            raise HTTPException(status_code=409, detail="Un profil existe déjà pour cet utilisateur")
-
-        # Créer le profil utilisateur
-        await conn.execute(
-            """
-            INSERT INTO user_profiles (user_id, full_name, user_type, phone, email, city, gdpr_consent_date, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6, NOW(), NOW(), NOW())
-            """,
-            user_param,
-            request.full_name,
-            request.user_type.value,
-            request.phone,
-            request.email,
-            request.city
-        )
-
-        return CreateUserProfileResponse(
-            success=True,
-            message="Profil créé avec succès",
-            user_id=str(user_param)
-        )
+        async with get_db_connection() as conn:
+            # Vérifier si le profil existe déjà
+            existing_profile = await conn.fetchrow(
+                "SELECT user_id FROM user_profiles WHERE user_id = $1",
+                user_param
+            )
+
+            if existing_profile:
+                raise HTTPException(status_code=409, detail="Un profil existe déjà pour cet utilisateur")
+
+            # Créer le profil utilisateur
+            await conn.execute(
+                """
+                INSERT INTO user_profiles (user_id, full_name, user_type, phone, email, city, gdpr_consent_date, created_at, updated_at)
+                VALUES ($1, $2, $3, $4, $5, $6, NOW(), NOW(), NOW())
+                """,
+                user_param,
+                request.full_name,
+                request.user_type.value,
+                request.phone,
+                request.email,
+                request.city
+            )
 
+            return CreateUserProfileResponse(
+                success=True,
+                message="Profil créé avec succès",
+                user_id=str(user_param)
+            )
+
+    except HTTPException:
+        raise
     except asyncpg.UniqueViolationError:
         raise HTTPException(status_code=409, detail="Un profil existe déjà pour cet utilisateur")
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in create_user_profile: {e}"))
+        log_db_error(f"Database error in create_user_profile: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in create_user_profile"))
+        log_error(f"Unexpected error in create_user_profile")
         raise HTTPException(status_code=500, detail="Erreur lors de la création du profil")
-    finally:
-        if conn:
-            await conn.close()
 
 @router.get("/profile/check", response_model=ProfileCheckResponse)
 async def check_profile_completion(user: AuthorizedUser):
@@ -123,52 +121,44 @@ async def check_profile_completion(user: AuthorizedUser):
             )
         user_param = UUID(user_uuid)
 
-    conn = None
     try:
-        conn = await asyncpg.connect(db.secrets.get("DATABASE_URL_DEV"))
-
-        # Vérifier si le profil existe
-        profile_row = await conn.fetchrow(
-            "SELECT * FROM user_profiles WHERE user_id = $1",
-            user_param
-        )
-
-        if not profile_row:
-            return ProfileCheckResponse(
-                is_complete=False,
-                missing_fields=["profile_not_created"],
-                user_profile=None
-            )
-
-        # Convertir le Row en dict
-        profile_dict = dict(profile_row)
+        async with get_db_connection() as conn:
+            # Vérifier si le profil existe
+            profile_row = await fetch_user_profile(conn, user_param)
+
+            if not profile_row:
+                return ProfileCheckResponse(
+                    is_complete=False,
+                    missing_fields=["profile_not_created"],
+                    user_profile=None
+                )
+
+            # Convertir le Row en dict
+            profile_dict = dict(profile_row)
         
-        # Vérifier les champs requis
-        required_fields = ['full_name', 'user_type', 'phone', 'email']
-        missing_fields = []
+            # Vérifier les champs requis
+            required_fields = ['full_name', 'user_type', 'phone', 'email']
+            missing_fields = []
         
-        for field in required_fields:
-            if not profile_dict.get(field):
-                missing_fields.append(field)
+            for field in required_fields:
+                if not profile_dict.get(field):
+                    missing_fields.append(field)
         
-        # Vérifier le consentement RGPD
-        if not profile_dict.get('gdpr_consent_date'):
-            missing_fields.append('gdpr_consent')
+            # Vérifier le consentement RGPD
+            if not profile_dict.get('gdpr_consent_date'):
+                missing_fields.append('gdpr_consent')
         
-        is_complete = len(missing_fields) == 0
+            is_complete = len(missing_fields) == 0
         
-        return ProfileCheckResponse(
-            is_complete=is_complete,
-            missing_fields=missing_fields,
-            user_profile=profile_dict if is_complete else None
-        )
+            return ProfileCheckResponse(
+                is_complete=is_complete,
+                missing_fields=missing_fields,
+                user_profile=profile_dict if is_complete else None
+            )
         
     except asyncpg.PostgresError as e:
-        print(sanitize_db_error(f"Database error in check_profile_completion: {e}"))
+        log_db_error(f"Database error in check_profile_completion: {e}")
         raise HTTPException(status_code=500, detail="Erreur de base de données")
     except Exception as e:
-        print(sanitize_log(f"Unexpected error in check_profile_completion"))
+        log_error(f"Unexpected error in check_profile_completion")
         raise HTTPException(status_code=500, detail="Erreur lors de la vérification du profil")
-    finally:
-        if conn:
-            await conn.close()
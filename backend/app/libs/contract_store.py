@@ -0,0 +1,225 @@
+"""
+Stockage des contrats par contenu (template + champs).
+
+Un contrat ne stocke plus son HTML complet, dont 99 % est le template
+commun : seulement l'empreinte du template (`template_hash`, source gardée
+une fois dans contract_templates), ses champs variables (`fields` : société,
+SIRET, dates, IP) et l'empreinte SHA-256 du document rendu (`content_hash`).
+Le HTML est reconstruit à la lecture et vérifié contre `content_hash` ; les
+documents rendus sont gardés dans un LRU indexé par cette empreinte, qui
+sert aussi d'ETag.
+
+Les contrats plus anciens gardent leur `contract_html` ;
+DatabaseMaintenance.compact_contracts() convertit ceux dont le rendu à
+partir des champs redonne exactement le même document.
+
+Usage:
+
+    from app.libs.contract_store import contract_store
+
+    fields = {"company_name": ..., "siret_number": ..., "signature_date": ...}
+    html, digest = contract_store.render_new(fields)
+    ...
+    html = await contract_store.body(conn, contract_row)
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.libs.contract_template import CONTRAT_TEMPLATE, SIGNATURE_PLACEHOLDERS, CompiledTemplate, french_date
+from app.libs.logger import log_error, log_info
+
+# Documents rendus gardés en mémoire (quelques Ko chacun)
+CONTRACT_RENDER_CACHE_SIZE = int(os.environ.get("CONTRACT_RENDER_CACHE_SIZE", "512"))
+
+# Format de la date de signature dans le document
+SIGNATURE_DATETIME_FORMAT = "%d/%m/%Y à %H:%M:%S"
+
+def content_hash(text: str) -> str:
+    """SHA-256 hexadécimal du texte UTF-8 (identique à sha256(convert_to(text, 'UTF8')) en SQL)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+TEMPLATE_HASH = content_hash(CONTRAT_TEMPLATE)
+
+class ContractIntegrityError(Exception):
+    """Le document reconstruit ne correspond pas à l'empreinte enregistrée"""
+
+class ContractStore:
+    """Templates compilés par empreinte et LRU des documents rendus"""
+
+    def __init__(self, cache_size: int = CONTRACT_RENDER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.templates: Dict[str, CompiledTemplate] = {TEMPLATE_HASH: CompiledTemplate(CONTRAT_TEMPLATE)}
+        self._rendered: "OrderedDict[str, str]" = OrderedDict()
+        self._template_registered = False
+        self.hits = 0
+        self.misses = 0
+
+    # ---- Cache des documents rendus ----
+
+    def _cache_get(self, digest: str) -> Optional[str]:
+        html = self._rendered.get(digest)
+        if html is None:
+            self.misses += 1
+            return None
+        self._rendered.move_to_end(digest)
+        self.hits += 1
+        return html
+
+    def _cache_put(self, digest: str, html: str) -> None:
+        self._rendered[digest] = html
+        self._rendered.move_to_end(digest)
+        while len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+
+    # ---- Templates ----
+
+    async def register_current_template(self, conn) -> None:
+        """Enregistre le template courant dans contract_templates (une fois par processus)"""
+        if self._template_registered:
+            return
+        await conn.execute(
+            "INSERT INTO contract_templates (template_hash, source) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+            TEMPLATE_HASH, CONTRAT_TEMPLATE
+        )
+        self._template_registered = True
+
+    async def _template(self, conn, template_hash: str) -> CompiledTemplate:
+        """Template compilé d'une version donnée, chargé depuis la base si ce n'est pas la courante"""
+        template = self.templates.get(template_hash)
+        if template is None:
+            source = await conn.fetchval(
+                "SELECT source FROM contract_templates WHERE template_hash = $1", template_hash
+            )
+            if source is None or content_hash(source) != template_hash:
+                raise ContractIntegrityError(f"Template {template_hash[:12]} introuvable ou altéré")
+            template = self.templates[template_hash] = CompiledTemplate(source)
+            log_info(f"Contract template {template_hash[:12]} loaded")
+        return template
+
+    # ---- Rendu ----
+
+    @staticmethod
+    def values(fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Valeurs du rendu : les champs de signature absents gardent leur marqueur"""
+        return {**SIGNATURE_PLACEHOLDERS, **fields}
+
+    def render_new(self, fields: Dict[str, Any]) -> Tuple[str, str]:
+        """Rend le template courant (génération) ; renvoie (html, content_hash)"""
+        html = self.templates[TEMPLATE_HASH].render(self.values(fields))
+        digest = content_hash(html)
+        self._cache_put(digest, html)
+        return html, digest
+
+    async def render(self, conn, template_hash: str, fields: Dict[str, Any]) -> Tuple[str, str]:
+        """Rend une version donnée du template (signature) ; renvoie (html, content_hash)"""
+        template = await self._template(conn, template_hash)
+        html = template.render(self.values(fields))
+        digest = content_hash(html)
+        self._cache_put(digest, html)
+        return html, digest
+
+    async def body(self, conn, contract) -> str:
+        """HTML d'une ligne de contracts : stocké (anciens contrats) ou reconstruit et vérifié"""
+        if contract.get('contract_html') is not None:
+            return contract['contract_html']
+
+        digest = contract['content_hash']
+        html = self._cache_get(digest)
+        if html is not None:
+            return html
+
+        template = await self._template(conn, contract['template_hash'])
+        fields = contract['fields']
+        if isinstance(fields, str):
+            fields = json.loads(fields)
+        html = template.render(self.values(fields))
+        if content_hash(html) != digest:
+            log_error(f"Contract {contract.get('id')}: rendered body does not match content_hash")
+            raise ContractIntegrityError("Le contrat reconstruit ne correspond pas à son empreinte")
+
+        self._cache_put(digest, html)
+        return html
+
+    # ---- Contrats stockés en HTML complet ----
+
+    @staticmethod
+    def legacy_fields(contract) -> Dict[str, Any]:
+        """Champs d'un ancien contrat, déduits de ses colonnes"""
+        fields = {
+            "company_name": contract['company_name'],
+            "siret_number": contract['siret_number'],
+            "signature_date": french_date(contract['created_at']),
+        }
+        if contract['is_signed'] and contract['signed_at'] is not None:
+            fields["signature_datetime"] = contract['signed_at'].strftime(SIGNATURE_DATETIME_FORMAT)
+            fields["signature_ip"] = contract['signature_ip']
+        return fields
+
+    async def compact(self, conn, after_id: int = 0, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Convertit un lot d'anciens contrats (id > `after_id`) : si le rendu du
+        template courant à partir de leurs colonnes redonne exactement leur
+        HTML, le HTML est remplacé par template_hash + fields. Les autres (HTML
+        non échappé, template d'une autre version) restent tels quels.
+        Renvoie `last_id`, à passer en `after_id` pour le lot suivant.
+        """
+        await self.register_current_template(conn)
+        rows = await conn.fetch(
+            """
+            SELECT id, company_name, siret_number, created_at, is_signed, signed_at, signature_ip,
+                   content_hash, contract_html
+            FROM contracts
+            WHERE id > $1 AND contract_html IS NOT NULL AND template_hash IS NULL
+            ORDER BY id
+            LIMIT $2
+            """,
+            after_id, batch_size
+        )
+
+        converted = []
+        for row in rows:
+            fields = self.legacy_fields(row)
+            html = self.templates[TEMPLATE_HASH].render(self.values(fields))
+            if html == row['contract_html']:
+                converted.append((row['id'], TEMPLATE_HASH, json.dumps(fields), content_hash(html)))
+
+        if converted:
+            await conn.executemany(
+                """
+                UPDATE contracts
+                SET template_hash = $2, fields = $3::jsonb, content_hash = $4, contract_html = NULL
+                WHERE id = $1 AND contract_html IS NOT NULL
+                """,
+                converted
+            )
+        return {
+            "examined": len(rows),
+            "converted": len(converted),
+            "last_id": rows[-1]['id'] if rows else after_id,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "templates": len(self.templates),
+            "cached_bodies": len(self._rendered),
+            "cache_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+contract_store = ContractStore()
+
+__all__ = [
+    "CONTRACT_RENDER_CACHE_SIZE",
+    "SIGNATURE_DATETIME_FORMAT",
+    "TEMPLATE_HASH",
+    "content_hash",
+    "ContractIntegrityError",
+    "ContractStore",
+    "contract_store",
+]
@@ -0,0 +1,207 @@
+"""
+Template du contrat d'apporteur d'affaires, compilé à l'import.
+
+Le template est découpé une fois pour toutes en segments (texte fixe et
+champs `{nom}`) ; un rendu est une seule jointure de ces segments avec les
+valeurs échappées (html.escape), au lieu d'un str.replace par champ sur tout
+le document. Les champs de signature sont remplis par des marqueurs à la
+génération, et leurs positions (`signature_slots`, en caractères) sont
+gardées avec le contrat : la signature remplace ces plages directement,
+sans rechercher les marqueurs dans le HTML.
+
+Usage:
+
+    from app.libs.contract_template import CONTRACT_TEMPLATE, SIGNATURE_FIELDS, fill_slots
+
+    html, slots = CONTRACT_TEMPLATE.render_with_slots(values, SIGNATURE_FIELDS)
+    ...
+    signed_html = fill_slots(html, slots, [signature_datetime, signature_ip])
+
+benchmarks/contract_template.py compare le débit avec l'ancien rendu.
+"""
+
+import re
+from datetime import date
+from html import escape
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Template HTML du contrat
+CONTRAT_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Contrat d'Apporteur d'Affaires</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 20px; color: #333; }
+        .header { text-align: center; margin-bottom: 30px; border-bottom: 2px solid #2563eb; padding-bottom: 20px; }
+        .parties { margin-bottom: 30px; background: #f8fafc; padding: 20px; border-radius: 8px; }
+        .article { margin-bottom: 25px; }
+        .article-title { font-weight: bold; color: #1e40af; margin-bottom: 10px; }
+        .signature-section { margin-top: 40px; border-top: 1px solid #ddd; padding-top: 20px; }
+        .signature-info { background: #f0f9ff; padding: 15px; border-radius: 8px; margin-top: 10px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>CONTRAT D'APPORTEUR D'AFFAIRES</h1>
+    </div>
+    
+    <div class="parties">
+        <h2>ENTRE LES SOUSSIGNÉS :</h2>
+        <p><strong>Mandant :</strong><br>
+        Stéphane Aldrighettoni, Agent commercial MS-Voltalia<br>
+        134 rue amiral Nomy, 83000 Toulon</p>
+        
+        <p><strong>Et :</strong><br>
+        <strong>L'Apporteur d'affaires :</strong> {company_name}<br>
+        <strong>SIRET :</strong> {siret_number}</p>
+    </div>
+    
+    <div class="article">
+        <div class="article-title">Article 1 - Objet</div>
+        <p>Le présent contrat a pour objet de définir les conditions dans lesquelles l'Apporteur d'affaires présente des prospects au Mandant pour la conclusion de contrats d'installation de solutions solaires.</p>
+    </div>
+    
+    <div class="article">
+        <div class="article-title">Article 2 - Obligations de l'Apporteur</div>
+        <p>L'Apporteur s'engage à :</p>
+        <ul>
+            <li>Présenter des clients potentiels au Mandant</li>
+            <li>Garantir l'exactitude des informations transmises</li>
+            <li>Informer sur les solutions proposées si besoin</li>
+            <li>Annoncer les prix d'installation et engager l'agent commercial</li>
+            <li>Obtenir le consentement préalable des prospects conformément au RGPD</li>
+        </ul>
+    </div>
+    
+    <div class="article">
+        <div class="article-title">Article 3 - Rémunération</div>
+        <p>L'Apporteur percevra une commission de <strong>5% sur le montant HT</strong> de la solution vendue et installée.</p>
+        <p>Cette commission est due uniquement après :</p>
+        <ul>
+            <li>Signature du contrat final par le client</li>
+            <li>Mise en service effective de l'installation</li>
+        </ul>
+        <p>Le paiement sera effectué sous 30 jours après réception de la facture.</p>
+    </div>
+    
+    <div class="article">
+        <div class="article-title">Article 4 - Durée</div>
+        <p>Le présent contrat est conclu pour une durée indéterminée. Il peut être résilié par chacune des parties avec un préavis de 30 jours.</p>
+    </div>
+    
+    <div class="signature-section">
+        <p><strong>Fait à Montpellier le :</strong> {signature_date}</p>
+        <p><strong>Signature électronique validée</strong></p>
+        <div class="signature-info">
+            <p><strong>Informations de signature :</strong></p>
+            <p>• Date et heure : {signature_datetime}<br>
+            • Adresse IP : {signature_ip}<br>
+            • Statut : Contrat signé électroniquement</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Champ du template : {nom} (les accolades du CSS contiennent des espaces)
+PLACEHOLDER_PATTERN = re.compile(r"\{([a-z_]+)\}")
+
+# Champs remplis à la signature, dans l'ordre des valeurs passées à fill_slots
+SIGNATURE_FIELDS = ("signature_datetime", "signature_ip")
+
+# Texte affiché à leur place tant que le contrat n'est pas signé
+SIGNATURE_PLACEHOLDERS = {
+    "signature_datetime": "[SIGNATURE_DATETIME_PLACEHOLDER]",
+    "signature_ip": "[SIGNATURE_IP_PLACEHOLDER]",
+}
+
+MONTHS_FR = [
+    "", "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre"
+]
+
+def french_date(value: date) -> str:
+    """Ex: "11 juillet 2025" """
+    return f"{value.day} {MONTHS_FR[value.month]} {value.year}"
+
+class CompiledTemplate:
+    """Template découpé en segments : `literals[i]`, puis le champ `fields[i]`, ..., puis `literals[-1]`"""
+
+    def __init__(self, source: str):
+        parts = PLACEHOLDER_PATTERN.split(source)
+        self.source = source
+        self.literals: List[str] = parts[0::2]
+        self.fields: List[str] = parts[1::2]
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Document complet ; chaque valeur est échappée"""
+        escaped = [escape(str(values[name])) for name in self.fields]
+        parts = [None] * (len(self.literals) + len(escaped))
+        parts[0::2] = self.literals
+        parts[1::2] = escaped
+        return "".join(parts)
+
+    def render_with_slots(self, values: Mapping[str, str],
+                          slot_fields: Sequence[str]) -> Tuple[str, List[int]]:
+        """
+        Comme render, et renvoie aussi les positions [début, fin, ...] des
+        valeurs de `slot_fields` dans le document, dans l'ordre de `slot_fields`.
+        Chaque champ de `slot_fields` doit apparaître une seule fois.
+        """
+        parts: List[str] = []
+        positions: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+        for literal, name in zip(self.literals, self.fields):
+            value = escape(str(values[name]))
+            offset += len(literal)
+            if name in slot_fields:
+                if name in positions:
+                    raise ValueError(f"Champ {name} présent plusieurs fois dans le template")
+                positions[name] = (offset, offset + len(value))
+            parts.append(literal)
+            parts.append(value)
+            offset += len(value)
+        parts.append(self.literals[-1])
+
+        slots: List[int] = []
+        for name in slot_fields:
+            slots.extend(positions[name])
+        return "".join(parts), slots
+
+def fill_slots(html: str, slots: Sequence[int], values: Sequence[str],
+               expected: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    Remplace les plages `slots` ([début, fin, ...], dans l'ordre du document)
+    de `html` par `values` (échappées). Si `expected` est donné, chaque plage
+    doit encore contenir ce texte ; sinon (HTML modifié depuis la génération)
+    renvoie None.
+    """
+    parts: List[str] = []
+    position = 0
+    for index, value in enumerate(values):
+        start, end = slots[2 * index], slots[2 * index + 1]
+        if start < position or end > len(html):
+            return None
+        if expected is not None and (end - start != len(expected[index])
+                                     or not html.startswith(expected[index], start)):
+            return None
+        parts.append(html[position:start])
+        parts.append(escape(value))
+        position = end
+    parts.append(html[position:])
+    return "".join(parts)
+
+CONTRACT_TEMPLATE = CompiledTemplate(CONTRAT_TEMPLATE)
+
+__all__ = [
+    "CONTRAT_TEMPLATE",
+    "CONTRACT_TEMPLATE",
+    "SIGNATURE_FIELDS",
+    "SIGNATURE_PLACEHOLDERS",
+    "CompiledTemplate",
+    "french_date",
+    "fill_slots",
+]
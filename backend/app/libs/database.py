@@ -1,12 +1,14 @@
-import databutton as db
-import asyncpg
-from app.env import mode, Mode
-
-async def get_db_connection():
-    if mode == Mode.PROD:
-        db_url = db.secrets.get("DATABASE_URL_ADMIN_PROD")
-    else:
-        db_url = db.secrets.get("DATABASE_URL_ADMIN_DEV")
-    
-    conn = await asyncpg.connect(db_url)
-    return conn
+"""Point d'entrée historique pour les connexions à la base de données.
+
+Toutes les connexions passent désormais par le pool partagé de
+`app.libs.database_pool`. Ce module est conservé pour les anciens imports.
+
+Usage:
+
+    async with get_db_connection() as conn:
+        await conn.fetchval("SELECT 1")
+"""
+
+from app.libs.database_pool import get_db_connection
+
+__all__ = ["get_db_connection"]
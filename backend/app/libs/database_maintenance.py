@@ -17,58 +17,54 @@ await db_maintenance.delete_user_completely("user_id_here")
 
 # Supprimer tous les utilisateurs de test
 await db_maintenance.delete_all_test_users()
+
+# Appliquer les migrations SQL de backend/migrations pas encore appliquées
+await db_maintenance.apply_migrations()
+
+# Remplacer le HTML stocké des anciens contrats par template + champs
+await db_maintenance.compact_contracts()
 """
 
-import asyncpg
-import databutton as db
+import os
+import re
+from pathlib import Path
 from typing import List, Dict, Any
-from app.env import mode, Mode
+from app.libs.database_pool import get_db_connection
+from app.libs.reports import USER_ACTIVITY_COUNTS_SQL
+from app.libs.contract_store import contract_store
+
+# Scripts SQL numérotés (001_xxx.sql, 002_xxx.sql, ...), appliqués dans l'ordre
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# Première ligne d'un script à exécuter hors transaction (CREATE INDEX CONCURRENTLY) :
+# ses instructions, séparées par un ';' en fin de ligne, sont exécutées une à une
+NO_TRANSACTION_MARKER = "-- migration: no-transaction"
+
+# Délai par instruction de migration, au lieu du command_timeout du pool (la
+# construction d'un index sur une grande table dure plusieurs minutes)
+MIGRATION_STATEMENT_TIMEOUT = float(os.environ.get("MIGRATION_STATEMENT_TIMEOUT", "3600"))
+
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
 
 class DatabaseMaintenance:
     """Classe pour la maintenance de la base de données"""
     
-    def __init__(self):
-        # Sélectionner la bonne URL de base de données selon l'environnement
-        if mode == Mode.PROD:
-            self.db_url = db.secrets.get("DATABASE_URL_PROD")
-        else:
-            self.db_url = db.secrets.get("DATABASE_URL_DEV")
-    
-    async def get_connection(self):
-        """Créer une connexion à la base de données"""
-        return await asyncpg.connect(self.db_url)
+    def get_connection(self, readonly: bool = False):
+        """Emprunter une connexion au pool partagé (à utiliser avec `async with`)"""
+        return get_db_connection(readonly=readonly)
     
     async def list_all_users(self) -> List[Dict[str, Any]]:
         """Lister tous les utilisateurs avec leurs informations"""
-        conn = await self.get_connection()
-        try:
-            query = """
-            SELECT 
-                up.user_id,
-                up.full_name,
-                up.user_type,
-                up.created_at,
-                COUNT(DISTINCT l.id) as total_leads,
-                COUNT(DISTINCT c.id) as total_commissions,
-                COUNT(DISTINCT p.id) as total_payments,
-                COUNT(DISTINCT contracts.id) as total_contracts
-            FROM user_profiles up
-            LEFT JOIN leads l ON up.user_id = l.user_id
-            LEFT JOIN commissions c ON up.user_id = c.user_id
-            LEFT JOIN payments p ON up.user_id = p.user_id
-            LEFT JOIN contracts ON up.user_id = contracts.user_id
-            GROUP BY up.user_id, up.full_name, up.user_type, up.created_at
-            ORDER BY up.created_at DESC;
-            """
-            rows = await conn.fetch(query)
+        async with self.get_connection() as conn:
+            # Comptes agrégés par table avant jointure (au lieu de COUNT(DISTINCT) sur le produit des jointures)
+            rows = await conn.fetch(USER_ACTIVITY_COUNTS_SQL)
             return [dict(row) for row in rows]
-        finally:
-            await conn.close()
     
     async def get_user_details(self, user_id: str) -> Dict[str, Any]:
         """Récupérer tous les détails d'un utilisateur"""
-        conn = await self.get_connection()
-        try:
+        async with self.get_connection() as conn:
             # Profil utilisateur
             profile = await conn.fetchrow(
                 "SELECT * FROM user_profiles WHERE user_id = $1", user_id
@@ -113,8 +109,6 @@ class DatabaseMaintenance:
                 "messages": [dict(row) for row in messages],
                 "referral_guide": dict(referral_guide) if referral_guide else None
             }
-        finally:
-            await conn.close()
     
     async def delete_user_completely(self, user_id: str) -> Dict[str, int]:
         """Supprimer complètement un utilisateur et toutes ses données
@@ -127,8 +121,7 @@ class DatabaseMaintenance:
         Returns:
             Dict avec le nombre d'éléments supprimés par table
         """
-        conn = await self.get_connection()
-        try:
+        async with self.get_connection() as conn:
             # Commencer une transaction
             async with conn.transaction():
                 deleted_counts = {}
@@ -182,9 +175,6 @@ class DatabaseMaintenance:
                 deleted_counts['user_profiles'] = int(result.split()[-1])
                 
                 return deleted_counts
-                
-        finally:
-            await conn.close()
     
     async def delete_test_users_by_name_pattern(self, name_patterns: List[str]) -> List[Dict[str, Any]]:
         """Supprimer les utilisateurs dont le nom contient certains mots (pour les comptes de test)
@@ -195,8 +185,7 @@ class DatabaseMaintenance:
         Returns:
             Liste des utilisateurs supprimés avec leurs statistiques
         """
-        conn = await self.get_connection()
-        try:
+        async with self.get_connection() as conn:
             # Construire la requête pour trouver les utilisateurs de test
             conditions = []
             for pattern in name_patterns:
@@ -212,36 +201,35 @@ class DatabaseMaintenance:
             """
             
             test_users = await conn.fetch(query)
-            deleted_users = []
-            
-            for user in test_users:
-                user_id = str(user['user_id'])
-                user_details = await self.get_user_details(user_id)
-                deletion_result = await self.delete_user_completely(user_id)
-                
-                deleted_users.append({
-                    'user_id': user_id,
-                    'full_name': user['full_name'],
-                    'user_type': user['user_type'],
-                    'created_at': user['created_at'],
-                    'deleted_counts': deletion_result,
-                    'had_data': {
-                        'leads': len(user_details['leads']),
-                        'commissions': len(user_details['commissions']),
-                        'payments': len(user_details['payments']),
-                        'contracts': len(user_details['contracts'])
-                    }
-                })
-            
-            return deleted_users
+        
+        # La connexion est rendue au pool avant les appels imbriqués,
+        # qui empruntent chacun leur propre connexion
+        deleted_users = []
+        
+        for user in test_users:
+            user_id = str(user['user_id'])
+            user_details = await self.get_user_details(user_id)
+            deletion_result = await self.delete_user_completely(user_id)
             
-        finally:
-            await conn.close()
+            deleted_users.append({
+                'user_id': user_id,
+                'full_name': user['full_name'],
+                'user_type': user['user_type'],
+                'created_at': user['created_at'],
+                'deleted_counts': deletion_result,
+                'had_data': {
+                    'leads': len(user_details['leads']),
+                    'commissions': len(user_details['commissions']),
+                    'payments': len(user_details['payments']),
+                    'contracts': len(user_details['contracts'])
+                }
+            })
+        
+        return deleted_users
     
     async def cleanup_orphaned_data(self) -> Dict[str, int]:
         """Nettoyer les données orphelines (sans utilisateur associé)"""
-        conn = await self.get_connection()
-        try:
+        async with self.get_connection() as conn:
             async with conn.transaction():
                 cleanup_counts = {}
                 
@@ -281,14 +269,10 @@ class DatabaseMaintenance:
                 cleanup_counts['commissions_without_leads'] = int(result.split()[-1])
                 
                 return cleanup_counts
-                
-        finally:
-            await conn.close()
     
     async def get_database_stats(self) -> Dict[str, Any]:
         """Obtenir des statistiques générales sur la base de données"""
-        conn = await self.get_connection()
-        try:
+        async with self.get_connection(readonly=True) as conn:
             stats = {}
             
             # Compter les utilisateurs par type
@@ -323,6 +307,86 @@ class DatabaseMaintenance:
             stats['general'] = dict(general_stats)
             
             return stats
+    
+    async def apply_migrations(self) -> List[str]:
+        """Appliquer les migrations SQL pas encore appliquées, dans l'ordre
+        
+        Chaque script s'exécute dans sa propre transaction et est enregistré
+        dans schema_migrations, un script déjà appliqué n'est jamais rejoué.
+        Un script commençant par NO_TRANSACTION_MARKER est exécuté instruction
+        par instruction, hors transaction : CREATE INDEX CONCURRENTLY construit
+        l'index sans bloquer les écritures sur la table. S'il échoue, il est
+        rejoué à l'appel suivant, après suppression des index invalides
+        laissés par la construction interrompue.
+        
+        Returns:
+            Noms des migrations appliquées par cet appel
+        """
+        applied = []
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name text PRIMARY KEY,
+                    applied_at timestamptz NOT NULL DEFAULT now()
+                )
+            """)
+            done = {row['name'] for row in await conn.fetch("SELECT name FROM schema_migrations")}
             
-        finally:
-            await conn.close()
+            for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                if path.name in done:
+                    continue
+                script = path.read_text(encoding="utf-8")
+                if script.startswith(NO_TRANSACTION_MARKER):
+                    await self._apply_without_transaction(conn, script)
+                    await conn.execute("INSERT INTO schema_migrations (name) VALUES ($1)", path.name)
+                else:
+                    async with conn.transaction():
+                        await conn.execute(script, timeout=MIGRATION_STATEMENT_TIMEOUT)
+                        await conn.execute("INSERT INTO schema_migrations (name) VALUES ($1)", path.name)
+                applied.append(path.name)
+        
+        return applied
+    
+    async def _apply_without_transaction(self, conn, script: str) -> None:
+        """Exécuter un script hors transaction, une instruction à la fois"""
+        # Une construction concurrente interrompue laisse un index invalide,
+        # que IF NOT EXISTS ne reconstruirait pas
+        for index_name in CONCURRENT_INDEX_PATTERN.findall(script):
+            invalid = await conn.fetchval(
+                """
+                SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = $1 AND NOT i.indisvalid
+                """,
+                index_name
+            )
+            if invalid:
+                await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"',
+                                   timeout=MIGRATION_STATEMENT_TIMEOUT)
+        
+        for statement in re.split(r";[ \t]*(?:\n|$)", script):
+            lines = [line for line in statement.splitlines() if not line.strip().startswith("--")]
+            if "".join(lines).strip():
+                await conn.execute(statement, timeout=MIGRATION_STATEMENT_TIMEOUT)
+    
+    async def compact_contracts(self, batch_size: int = 500) -> Dict[str, int]:
+        """Convertir les contrats stockés en HTML complet au stockage par contenu
+        
+        Seuls les contrats dont le rendu à partir des champs redonne
+        exactement le HTML stocké sont convertis (voir app.libs.contract_store).
+        Nécessite la migration 005_contract_content_storage.sql.
+        
+        Returns:
+            Nombre de contrats examinés et convertis
+        """
+        totals = {"examined": 0, "converted": 0}
+        after_id = 0
+        async with self.get_connection() as conn:
+            while True:
+                batch = await contract_store.compact(conn, after_id, batch_size)
+                totals["examined"] += batch["examined"]
+                totals["converted"] += batch["converted"]
+                if batch["examined"] < batch_size:
+                    break
+                after_id = batch["last_id"]
+        
+        return totals
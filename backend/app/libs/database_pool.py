@@ -1,8 +1,16 @@
 import asyncpg
 import databutton as db
 from app.env import Mode, mode
+import ast
 import asyncio
-from typing import Optional
+import itertools
+import os
+import pathlib
+import time
+import traceback
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 from contextlib import asynccontextmanager
 import logging
 
@@ -26,18 +34,225 @@ POOL_CONFIG = {
     }
 }
 
+# Dimensionnement adaptatif : le pool est créé avec `max_limit` connexions au plus,
+# et un contrôleur ajuste la concurrence autorisée selon l'attente observée
+ADAPTIVE_POOL_CONFIG = {
+    Mode.DEV: {
+        "enabled": os.environ.get("DATABASE_POOL_ADAPTIVE", "false").lower() == "true",
+        "min_limit": 3,
+        "max_limit": 15,
+        "target_wait_ms": 20.0,
+        "interval": 5.0,
+        "step": 2
+    },
+    Mode.PROD: {
+        "enabled": os.environ.get("DATABASE_POOL_ADAPTIVE", "false").lower() == "true",
+        "min_limit": 5,
+        "max_limit": 40,
+        "target_wait_ms": 20.0,
+        "interval": 5.0,
+        "step": 2
+    }
+}
+
+# Réplique en lecture (optionnelle) pour les requêtes de reporting admin.
+# DATABASE_REPLICA_LOCAL=true : la "réplique" pointe sur la base principale (tests, dev)
+REPLICA_CONFIG = {
+    Mode.DEV: {
+        "secret": "DATABASE_URL_REPLICA_DEV",
+        "min_size": 1,
+        "max_size": 5,
+        "max_queries": 10000,
+        "max_inactive_connection_lifetime": 300.0,
+        "timeout": 5.0,
+        "command_timeout": 30.0
+    },
+    Mode.PROD: {
+        "secret": "DATABASE_URL_REPLICA_PROD",
+        "min_size": 2,
+        "max_size": 10,
+        "max_queries": 50000,
+        "max_inactive_connection_lifetime": 300.0,
+        "timeout": 5.0,
+        "command_timeout": 30.0
+    }
+}
+REPLICA_LOCAL_STANDIN = os.environ.get("DATABASE_REPLICA_LOCAL", "false").lower() == "true"
+REPLICA_MAX_STALENESS = 30.0  # secondes de retard tolérées par défaut
+REPLICA_LAG_CHECK_INTERVAL = 5.0  # secondes entre deux mesures du retard
+REPLICA_RETRY_DELAY = 30.0  # secondes avant de retenter une réplique indisponible
+
+# Retard de réplication en secondes (0 sur un serveur primaire ou une réplique à jour)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Détection des fuites de connexions
+LEAK_DETECTION = {
+    # Durée (secondes) au-delà de laquelle une connexion empruntée est signalée
+    "threshold": float(os.environ.get("DATABASE_LEAK_THRESHOLD", "10")),
+    # Mode debug : une requête qui répond en gardant une connexion est mise en échec
+    "debug": os.environ.get("DATABASE_LEAK_DEBUG", "false").lower() == "true",
+    # Nombre de frames conservées pour localiser l'emprunt
+    "stack_depth": 8
+}
+
+# Route en cours et emprunts de la requête, renseignés par ConnectionLeakMiddleware
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+request_leases: ContextVar[Optional[set]] = ContextVar("request_leases", default=None)
+
+class ConnectionLeakError(RuntimeError):
+    """Une requête s'est terminée sans rendre une connexion au pool"""
+
+@dataclass
+class ConnectionLease:
+    """Emprunt d'une connexion : qui l'a prise, d'où, et depuis quand"""
+    id: int
+    route: str
+    stack: str
+    acquired_at: float
+    warned: bool = False
+    
+    def held_for(self) -> float:
+        return time.monotonic() - self.acquired_at
+
+# Bornes (ms) de l'histogramme des temps d'attente sur acquire()
+ACQUIRE_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Délai maximal (secondes) accordé aux requêtes en cours lors de l'arrêt du pool
+DRAIN_TIMEOUT = float(os.environ.get("DATABASE_POOL_DRAIN_TIMEOUT", "10"))
+
+# Hook exécuté une fois sur chaque nouvelle connexion du pool
+ConnectionInitHook = Callable[[asyncpg.Connection], Awaitable[None]]
+
+class PooledConnection(asyncpg.Connection):
+    """Connexion du pool : conserve les requêtes préparées par les hooks d'init"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: dict = {}
+
+class WaitHistogram:
+    """Histogramme cumulatif des temps d'attente (ms) à l'acquisition d'une connexion"""
+    
+    def __init__(self, buckets: tuple = ACQUIRE_WAIT_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernière case : au-delà de la plus grande borne
+        self.count = 0
+        self.sum_ms = 0.0
+        # Fenêtre glissante lue puis remise à zéro par le contrôleur adaptatif
+        self._window_count = 0
+        self._window_sum_ms = 0.0
+    
+    def observe(self, wait_ms: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if wait_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += wait_ms
+        self._window_count += 1
+        self._window_sum_ms += wait_ms
+    
+    def take_window_average(self) -> Optional[float]:
+        """Attente moyenne depuis le dernier appel (None si aucune acquisition)"""
+        if self._window_count == 0:
+            return None
+        average = self._window_sum_ms / self._window_count
+        self._window_count = 0
+        self._window_sum_ms = 0.0
+        return average
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation d'un quantile : borne supérieure du bucket qui le contient"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else float("inf")
+        return float("inf")
+    
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets
+        }
+
 class DatabasePool:
     """Gestionnaire de pool de connexions asyncpg singleton"""
     
     _instance: Optional['DatabasePool'] = None
     _pool: Optional[asyncpg.Pool] = None
+    _replica_pool: Optional[asyncpg.Pool] = None
     _lock = asyncio.Lock()
+    _replica_lock = asyncio.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._init_hooks = []
+            cls._instance._reset_metrics()
         return cls._instance
     
+    def _reset_metrics(self) -> None:
+        """Remet à zéro les métriques de saturation et l'état du contrôleur"""
+        self._wait_histogram = WaitHistogram()
+        self._in_use = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._adaptive = ADAPTIVE_POOL_CONFIG[mode]
+        self._limit: Optional[int] = None  # None : pas de limite en plus de max_size
+        self._limit_changed: Optional[asyncio.Condition] = None
+        self._controller_task: Optional[asyncio.Task] = None
+        # État de la réplique
+        self._replica_lag: Optional[float] = None
+        self._replica_lag_checked_at = 0.0
+        self._replica_retry_at = 0.0
+        self._replica_reads = 0
+        self._replica_fallbacks = 0
+        # Répliques écartées dont la fermeture est en cours
+        self._replica_closing: set[asyncio.Task] = set()
+        # Détection des fuites
+        self._leases: dict[int, ConnectionLease] = {}
+        self._lease_ids = itertools.count(1)
+        self._long_holds = 0
+        self._leaked_requests = 0
+        self._leak_watchdog_task: Optional[asyncio.Task] = None
+    
+    def add_init_hook(self, hook: ConnectionInitHook) -> None:
+        """
+        Enregistre un hook appelé sur chaque nouvelle connexion du pool
+        (préparation de requêtes, paramètres de session...).
+        À enregistrer avant l'initialisation du pool.
+        """
+        if hook not in self._init_hooks:
+            self._init_hooks.append(hook)
+    
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        """Callback `init` d'asyncpg : exécute les hooks enregistrés"""
+        for hook in self._init_hooks:
+            await hook(connection)
+    
     async def initialize(self) -> None:
         """Initialise le pool de connexions"""
         if self._pool is not None:
@@ -57,31 +272,205 @@ class DatabasePool:
                     raise ValueError(f"DATABASE_URL not found for mode {mode}")
                 
                 # Configuration du pool selon l'environnement
-                config = POOL_CONFIG[mode]
+                config = dict(POOL_CONFIG[mode])
+                if self._adaptive["enabled"]:
+                    # Le pool peut monter jusqu'au plafond, le contrôleur fixe la limite effective
+                    config["max_size"] = max(config["max_size"], self._adaptive["max_limit"])
+                    self._limit = min(POOL_CONFIG[mode]["max_size"], config["max_size"])
+                    self._limit_changed = asyncio.Condition()
                 
                 print(f"🚀 Initializing database pool for {mode.value} environment...")
                 print(f"Pool config: {config}")
                 
                 # Créer le pool de connexions
-                self._pool = await asyncpg.create_pool(
-                    dsn=database_url,
-                    **config
-                )
+                self._pool = await self._create_pool(database_url, config)
                 
                 print(f"✅ Database pool initialized successfully with {config['min_size']}-{config['max_size']} connections")
                 
+                if self._adaptive["enabled"]:
+                    self._controller_task = asyncio.create_task(self._run_controller())
+                self._leak_watchdog_task = asyncio.create_task(self._run_leak_watchdog())
+                
             except Exception as e:
                 print(f"❌ Failed to initialize database pool: {e}")
                 raise
     
-    async def close(self) -> None:
-        """Ferme le pool de connexions"""
+    async def _create_pool(self, dsn: str, config: dict) -> asyncpg.Pool:
+        return await asyncpg.create_pool(
+            dsn=dsn,
+            init=self._init_connection,
+            connection_class=PooledConnection,
+            **config
+        )
+    
+    def _replica_dsn(self) -> Optional[str]:
+        """URL de la réplique, la base principale en mode local, ou None si non configurée"""
+        if REPLICA_LOCAL_STANDIN:
+            return db.secrets.get("DATABASE_URL_DEV" if mode == Mode.DEV else "DATABASE_URL_PROD")
+        try:
+            return db.secrets.get(REPLICA_CONFIG[mode]["secret"]) or None
+        except Exception:
+            return None
+    
+    async def _get_replica_pool(self) -> Optional[asyncpg.Pool]:
+        """
+        Récupère le pool de la réplique, le crée si nécessaire.
+        Retourne None si aucune réplique n'est configurée ou si elle est indisponible.
+        """
+        if self._replica_pool is not None:
+            return self._replica_pool
+        if time.monotonic() < self._replica_retry_at:
+            return None
+        
+        dsn = self._replica_dsn()
+        if not dsn:
+            self._replica_retry_at = float("inf")
+            return None
+        
+        async with self._replica_lock:
+            if self._replica_pool is not None:
+                return self._replica_pool
+            config = {k: v for k, v in REPLICA_CONFIG[mode].items() if k != "secret"}
+            try:
+                self._replica_pool = await self._create_pool(dsn, config)
+                label = "local stand-in" if REPLICA_LOCAL_STANDIN else "replica"
+                print(f"✅ Read replica pool initialized ({label}) with {config['min_size']}-{config['max_size']} connections")
+            except Exception as e:
+                self._replica_retry_at = time.monotonic() + REPLICA_RETRY_DELAY
+                print(f"⚠️ Read replica unavailable, reads go to primary: {e}")
+        return self._replica_pool
+    
+    async def _acquire_replica(self, max_staleness: Optional[float]):
+        """
+        Emprunte une connexion à la réplique si son retard est dans la tolérance.
+        Retourne (pool, connexion), ou None pour se rabattre sur la base principale.
+        """
+        replica_pool = await self._get_replica_pool()
+        if replica_pool is None:
+            return None
+        
+        tolerance = REPLICA_MAX_STALENESS if max_staleness is None else max_staleness
+        try:
+            connection = await replica_pool.acquire(timeout=REPLICA_CONFIG[mode]["timeout"])
+        except Exception as e:
+            print(f"⚠️ Read replica acquire failed, falling back to primary: {e}")
+            self._replica_fallbacks += 1
+            await self._drop_replica_pool()
+            return None
+        
+        try:
+            # Le retard est mesuré au plus une fois par intervalle
+            if time.monotonic() - self._replica_lag_checked_at >= REPLICA_LAG_CHECK_INTERVAL:
+                self._replica_lag = float(await connection.fetchval(REPLICA_LAG_QUERY))
+                self._replica_lag_checked_at = time.monotonic()
+        except Exception as e:
+            print(f"⚠️ Read replica lag check failed, falling back to primary: {e}")
+            await replica_pool.release(connection)
+            self._replica_fallbacks += 1
+            await self._drop_replica_pool()
+            return None
+        
+        if self._replica_lag is not None and self._replica_lag > tolerance:
+            await replica_pool.release(connection)
+            self._replica_fallbacks += 1
+            return None
+        
+        self._replica_reads += 1
+        return replica_pool, connection
+    
+    async def _drop_replica_pool(self) -> None:
+        """Écarte une réplique défaillante ; elle sera retentée après REPLICA_RETRY_DELAY"""
+        self._replica_retry_at = time.monotonic() + REPLICA_RETRY_DELAY
+        self._replica_lag = None
+        self._replica_lag_checked_at = 0.0
+        replica_pool, self._replica_pool = self._replica_pool, None
+        if replica_pool is not None:
+            # Les connexions déjà empruntées finissent leur requête : fermeture en arrière-plan
+            task = asyncio.create_task(self._close_replica_pool(replica_pool, DRAIN_TIMEOUT))
+            self._replica_closing.add(task)
+            task.add_done_callback(self._replica_closing.discard)
+    
+    @staticmethod
+    async def _close_replica_pool(replica_pool: asyncpg.Pool, timeout: float) -> None:
+        """Ferme une réplique écartée ; coupe les connexions encore empruntées après `timeout` secondes"""
+        try:
+            await asyncio.wait_for(replica_pool.close(), timeout=timeout)
+        except asyncio.TimeoutError:
+            replica_pool.terminate()
+            print(f"⚠️ Dropped replica pool drain exceeded {timeout}s, remaining connections terminated")
+        except Exception as e:
+            replica_pool.terminate()
+            print(f"⚠️ Dropped replica pool close failed: {e}")
+    
+    async def warm_up(self) -> int:
+        """
+        Préchauffe le pool : emprunte simultanément `min_size` connexions
+        et vérifie chacune avec un `SELECT 1`.
+        Retourne le nombre de connexions saines.
+        """
+        pool = await self.get_pool()
+        connections = []
+        healthy = 0
+        
+        try:
+            for _ in range(pool.get_min_size()):
+                connections.append(await pool.acquire())
+            
+            results = await asyncio.gather(
+                *(connection.fetchval("SELECT 1") for connection in connections),
+                return_exceptions=True
+            )
+            for result in results:
+                if result == 1:
+                    healthy += 1
+                else:
+                    print(f"⚠️ Unhealthy connection during warm-up: {result}")
+        finally:
+            for connection in connections:
+                await pool.release(connection)
+        
+        print(f"🔥 Database pool warmed up: {healthy}/{len(connections)} healthy connections")
+        return healthy
+    
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Ferme le pool de connexions en laissant aux requêtes en cours
+        jusqu'à `timeout` secondes pour rendre leur connexion.
+        Au-delà, les connexions restantes sont coupées.
+        """
+        timeout = DRAIN_TIMEOUT if timeout is None else timeout
+        
+        if self._controller_task is not None:
+            self._controller_task.cancel()
+            self._controller_task = None
+        if self._leak_watchdog_task is not None:
+            self._leak_watchdog_task.cancel()
+            self._leak_watchdog_task = None
+        
+        if self._replica_pool is not None:
+            async with self._replica_lock:
+                if self._replica_pool is not None:
+                    try:
+                        await asyncio.wait_for(self._replica_pool.close(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        self._replica_pool.terminate()
+                    finally:
+                        self._replica_pool = None
+        
+        if self._replica_closing:
+            await asyncio.gather(*self._replica_closing, return_exceptions=True)
+        
         if self._pool is not None:
             async with self._lock:
                 if self._pool is not None:
-                    await self._pool.close()
-                    self._pool = None
-                    print("🔒 Database pool closed")
+                    try:
+                        await asyncio.wait_for(self._pool.close(), timeout=timeout)
+                        print("🔒 Database pool closed")
+                    except asyncio.TimeoutError:
+                        self._pool.terminate()
+                        print(f"⚠️ Database pool drain exceeded {timeout}s, remaining connections terminated")
+                    finally:
+                        self._pool = None
     
     async def get_pool(self) -> asyncpg.Pool:
         """Récupère le pool de connexions, l'initialise si nécessaire"""
@@ -94,23 +483,159 @@ class DatabasePool:
         return self._pool
     
     @asynccontextmanager
-    async def acquire_connection(self):
-        """Context manager pour acquérir et libérer une connexion du pool"""
+    async def acquire_connection(self, readonly: bool = False, max_staleness: Optional[float] = None):
+        """
+        Context manager pour acquérir et libérer une connexion du pool.
+        
+        Args:
+            readonly: la requête peut être servie par la réplique en lecture
+            max_staleness: retard de réplication toléré en secondes (REPLICA_MAX_STALENESS par défaut)
+        
+        Sans réplique, ou si elle est trop en retard ou indisponible,
+        la connexion vient de la base principale.
+        """
+        if readonly:
+            replica = await self._acquire_replica(max_staleness)
+            if replica is not None:
+                replica_pool, connection = replica
+                lease = self._open_lease()
+                try:
+                    yield connection
+                finally:
+                    self._close_lease(lease)
+                    try:
+                        await replica_pool.release(connection)
+                    except Exception as e:
+                        print(f"⚠️ Error releasing replica connection: {e}")
+                return
+        
+        async with self._acquire_primary() as connection:
+            lease = self._open_lease()
+            try:
+                yield connection
+            finally:
+                self._close_lease(lease)
+    
+    def _open_lease(self) -> ConnectionLease:
+        """Enregistre l'emprunt en cours avec la route et la pile d'appel de l'appelant"""
+        # Ignorer les frames de contextlib et du pool pour pointer sur le code appelant
+        frames = traceback.extract_stack(limit=LEAK_DETECTION["stack_depth"] + 3)[:-3]
+        lease = ConnectionLease(
+            id=next(self._lease_ids),
+            route=current_route.get() or "background",
+            stack="".join(traceback.format_list(frames)),
+            acquired_at=time.monotonic()
+        )
+        self._leases[lease.id] = lease
+        
+        leases = request_leases.get()
+        if leases is not None:
+            leases.add(lease.id)
+        return lease
+    
+    def _close_lease(self, lease: ConnectionLease) -> None:
+        self._leases.pop(lease.id, None)
+        leases = request_leases.get()
+        if leases is not None:
+            leases.discard(lease.id)
+        
+        held_for = lease.held_for()
+        if held_for > LEAK_DETECTION["threshold"]:
+            self._long_holds += 1
+            if not lease.warned:
+                print(f"⚠️ Connection held {held_for:.1f}s by {lease.route}")
+    
+    def report_request_leak(self, route: str, lease_ids: set) -> None:
+        """Signale les connexions encore détenues à la fin d'une requête"""
+        self._leaked_requests += 1
+        for lease_id in lease_ids:
+            lease = self._leases.get(lease_id)
+            if lease is not None:
+                print(f"❌ Request {route} finished without releasing its connection, acquired at:\n{lease.stack}")
+    
+    async def _run_leak_watchdog(self) -> None:
+        """Signale une fois chaque connexion détenue au-delà du seuil"""
+        threshold = LEAK_DETECTION["threshold"]
+        while True:
+            await asyncio.sleep(max(threshold / 2, 0.5))
+            for lease in list(self._leases.values()):
+                if not lease.warned and lease.held_for() > threshold:
+                    lease.warned = True
+                    print(f"⚠️ Possible connection leak: held {lease.held_for():.1f}s by {lease.route}, acquired at:\n{lease.stack}")
+    
+    @asynccontextmanager
+    async def _acquire_primary(self):
+        """Emprunte une connexion à la base principale (métriques et limite adaptative)"""
         pool = await self.get_pool()
         connection = None
+        admitted = False
         
         try:
-            connection = await pool.acquire()
+            started = time.perf_counter()
+            self._waiting += 1
+            try:
+                admitted = await self._admit()
+                connection = await pool.acquire(timeout=POOL_CONFIG[mode]["timeout"])
+            finally:
+                self._waiting -= 1
+                self._wait_histogram.observe((time.perf_counter() - started) * 1000)
+            
+            self._in_use += 1
             yield connection
         except Exception as e:
             print(f"❌ Database connection error: {e}")
             raise
         finally:
             if connection is not None:
+                self._in_use -= 1
                 try:
                     await pool.release(connection)
                 except Exception as e:
                     print(f"⚠️ Error releasing connection: {e}")
+            if admitted:
+                await self._leave()
+    
+    async def _admit(self) -> bool:
+        """
+        Attend que la concurrence passe sous la limite fixée par le contrôleur adaptatif.
+        Retourne False si le contrôleur est désactivé (aucune attente).
+        """
+        if self._limit_changed is None:
+            return False
+        async with self._limit_changed:
+            await asyncio.wait_for(
+                self._limit_changed.wait_for(lambda: self._admitted < self._limit),
+                timeout=POOL_CONFIG[mode]["timeout"]
+            )
+            self._admitted += 1
+        return True
+    
+    async def _leave(self) -> None:
+        async with self._limit_changed:
+            self._admitted -= 1
+            self._limit_changed.notify_all()
+    
+    async def _run_controller(self) -> None:
+        """
+        Contrôleur adaptatif : augmente la limite quand l'attente moyenne dépasse
+        la cible, la réduit quand le pool est sous-utilisé.
+        """
+        settings = self._adaptive
+        while True:
+            await asyncio.sleep(settings["interval"])
+            average_wait = self._wait_histogram.take_window_average()
+            previous = self._limit
+            
+            if average_wait is not None and average_wait > settings["target_wait_ms"]:
+                self._limit = min(self._limit + settings["step"], settings["max_limit"])
+            elif (average_wait is None or average_wait < settings["target_wait_ms"] / 4) \
+                    and self._admitted <= self._limit - settings["step"]:
+                self._limit = max(self._limit - settings["step"], settings["min_limit"])
+            
+            if self._limit != previous:
+                print(f"📈 Database pool limit adjusted: {previous} -> {self._limit} (avg wait {average_wait} ms)")
+                async with self._limit_changed:
+                    self._limit_changed.notify_all()
     
     async def get_pool_status(self) -> dict:
         """Retourne les statistiques du pool de connexions"""
@@ -123,6 +648,32 @@ class DatabasePool:
             "min_size": self._pool.get_min_size(),
             "max_size": self._pool.get_max_size(),
             "idle_connections": self._pool.get_idle_size(),
+            "in_use": self._in_use,
+            "queue_depth": self._waiting,
+            "acquire_wait_ms": self._wait_histogram.snapshot(),
+            "adaptive": {
+                "enabled": self._adaptive["enabled"],
+                "effective_limit": self._limit,
+                "min_limit": self._adaptive["min_limit"],
+                "max_limit": self._adaptive["max_limit"],
+                "target_wait_ms": self._adaptive["target_wait_ms"]
+            },
+            "leak_detection": {
+                "held": len(self._leases),
+                "held_over_threshold": sum(1 for lease in self._leases.values() if lease.held_for() > LEAK_DETECTION["threshold"]),
+                "long_holds": self._long_holds,
+                "leaked_requests": self._leaked_requests,
+                "threshold_seconds": LEAK_DETECTION["threshold"],
+                "debug": LEAK_DETECTION["debug"]
+            },
+            "replica": {
+                "configured": bool(self._replica_dsn()),
+                "active": self._replica_pool is not None,
+                "local_standin": REPLICA_LOCAL_STANDIN,
+                "lag_seconds": self._replica_lag,
+                "reads": self._replica_reads,
+                "fallbacks_to_primary": self._replica_fallbacks
+            },
             "mode": mode.value
         }
 
@@ -130,20 +681,76 @@ class DatabasePool:
 db_pool = DatabasePool()
 
 # Fonctions helper pour les APIs
-def get_db_connection():
-    """Helper pour acquérir une connexion dans les APIs"""
-    return db_pool.acquire_connection()
+def get_db_connection(readonly: bool = False, max_staleness: Optional[float] = None):
+    """
+    Helper pour acquérir une connexion dans les APIs.
+    `readonly=True` autorise la réplique en lecture (reporting admin).
+    """
+    return db_pool.acquire_connection(readonly=readonly, max_staleness=max_staleness)
 
 async def get_pool_stats():
     """Helper pour récupérer les stats du pool"""
     return await db_pool.get_pool_status()
 
 # Fonction d'initialisation pour le démarrage de l'app
-async def initialize_database_pool():
+async def initialize_database_pool(warm_up: bool = True):
     """Fonction à appeler au démarrage de l'application"""
     await db_pool.initialize()
+    # La réplique est optionnelle : son absence n'empêche pas le démarrage
+    await db_pool._get_replica_pool()
+    if warm_up:
+        await db_pool.warm_up()
 
 # Fonction de nettoyage pour l'arrêt de l'app
-async def close_database_pool():
+async def close_database_pool(timeout: Optional[float] = None):
     """Fonction à appeler à l'arrêt de l'application"""
-    await db_pool.close()
+    await db_pool.close(timeout)
+
+# Vérification au démarrage : aucune connexion directe hors du pool
+def find_direct_connections(root: Optional[pathlib.Path] = None) -> list[str]:
+    """
+    Analyse les modules de l'application et retourne les appels directs
+    à `asyncpg.connect` (format "chemin:ligne").
+    """
+    root = root or pathlib.Path(__file__).resolve().parents[1]
+    offenders = []
+    
+    for path in sorted(root.rglob("*.py")):
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        except (OSError, SyntaxError) as e:
+            print(f"⚠️ Unable to inspect {path}: {e}")
+            continue
+        
+        # Alias locaux de `asyncpg.connect` (ex: `from asyncpg import connect`)
+        connect_aliases = {
+            alias.asname or alias.name
+            for node in ast.walk(tree)
+            if isinstance(node, ast.ImportFrom) and node.module == "asyncpg"
+            for alias in node.names
+            if alias.name == "connect"
+        }
+        
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call):
+                continue
+            func = node.func
+            is_direct = (
+                isinstance(func, ast.Attribute)
+                and func.attr == "connect"
+                and isinstance(func.value, ast.Name)
+                and func.value.id == "asyncpg"
+            ) or (isinstance(func, ast.Name) and func.id in connect_aliases)
+            if is_direct:
+                offenders.append(f"{path.relative_to(root.parent)}:{node.lineno}")
+    
+    return offenders
+
+def check_no_direct_connections(root: Optional[pathlib.Path] = None) -> None:
+    """Fonction à appeler au démarrage : échoue si un module contourne le pool"""
+    offenders = find_direct_connections(root)
+    if offenders:
+        raise RuntimeError(
+            "Direct asyncpg.connect() calls found, use get_db_connection() instead: "
+            + ", ".join(offenders)
+        )
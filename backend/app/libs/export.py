@@ -0,0 +1,134 @@
+"""
+Exports admin en flux (CSV ou NDJSON).
+
+Les lignes sont lues par un curseur côté serveur et envoyées par lots au
+fur et à mesure : la mémoire reste constante quelle que soit la taille de
+l'export, et le premier octet part dès le premier lot lu. La connexion est
+empruntée dans le générateur, donc seulement pendant l'envoi du corps, et
+rendue au pool dès la fin de l'export ou la déconnexion du client : la
+réponse ferme elle-même le générateur avant de rendre la main, donc avant
+la vérification des fuites de ConnectionLeakMiddleware.
+
+Usage:
+
+    from app.libs.export import export_response
+
+    @router.get("/export/leads")
+    async def export_leads(user: AuthorizedUser, format: str = "csv"):
+        require_admin(user)
+        return export_response("SELECT * FROM leads ORDER BY id", [], format, "leads")
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Sequence
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from app.libs.database_pool import get_db_connection
+from app.libs.logger import log_error, log_info
+
+# Lignes lues par aller-retour avec le curseur, et envoyées par morceau
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _json_default(value: Any) -> Any:
+    # Dates en ISO 8601, UUID et Decimal en texte
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+async def stream_rows(sql: str, params: Sequence[Any], fmt: str,
+                      batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """Exécute `sql` avec un curseur côté serveur et produit l'export morceau par morceau"""
+    exported = 0
+    try:
+        async with get_db_connection(readonly=True) as conn:
+            # Un curseur n'existe que dans une transaction ; lecture seule,
+            # instantané unique pour tout l'export
+            async with conn.transaction(readonly=True, isolation="repeatable_read"):
+                statement = await conn.prepare(sql)
+                columns: List[str] = [attribute.name for attribute in statement.get_attributes()]
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if fmt == "csv":
+                    # BOM : Excel lit alors correctement les accents
+                    buffer.write("\ufeff")
+                    writer.writerow(columns)
+                    # En-tête envoyé tout de suite, avant le premier lot
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+
+                pending = 0
+                async for record in statement.cursor(*params, prefetch=batch_rows):
+                    if fmt == "csv":
+                        writer.writerow([_csv_value(value) for value in record.values()])
+                    else:
+                        buffer.write(json.dumps(dict(record), default=_json_default, ensure_ascii=False))
+                        buffer.write("\n")
+
+                    pending += 1
+                    if pending >= batch_rows:
+                        yield buffer.getvalue().encode("utf-8")
+                        buffer.seek(0)
+                        buffer.truncate()
+                        exported += pending
+                        pending = 0
+
+                exported += pending
+                if buffer.tell():
+                    yield buffer.getvalue().encode("utf-8")
+    except Exception as e:
+        # Les en-têtes sont déjà partis : l'export est tronqué, on le journalise
+        log_error(f"Export interrupted after {exported} rows: {e}")
+        raise
+
+    log_info(f"Export completed: {exported} rows ({fmt})")
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse qui ferme son générateur quand l'envoi s'arrête.
+    Si le client se déconnecte, Starlette annule l'envoi sans fermer le
+    générateur : sa connexion ne serait rendue qu'au passage du ramasse-miettes.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+def export_response(sql: str, params: Sequence[Any], fmt: str, name: str) -> StreamingResponse:
+    """Réponse HTTP en flux d'un export `fmt` ("csv" ou "ndjson")"""
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return ClosingStreamingResponse(
+        stream_rows(sql, params, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+__all__ = [
+    "EXPORT_BATCH_ROWS",
+    "EXPORT_FORMATS",
+    "ClosingStreamingResponse",
+    "stream_rows",
+    "export_response",
+]
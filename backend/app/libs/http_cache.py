@@ -0,0 +1,107 @@
+"""
+Réponses HTTP cachables des documents (corps de contrat).
+
+Le client garde le document avec son ETag et le redemande avec
+If-None-Match : s'il n'a pas changé, la réponse est une 304 sans corps.
+Sinon le corps est compressé selon Accept-Encoding (brotli si le module
+est installé, sinon gzip).
+
+Usage:
+
+    from app.libs.http_cache import if_none_match, not_modified_response, document_response
+
+    etag = '"' + digest + '"'
+    if if_none_match(request, etag):
+        return not_modified_response(etag)
+    return document_response(request, html, etag)
+"""
+
+import gzip
+import os
+from typing import Optional
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# En dessous, la compression ne vaut pas son coût
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Le client doit revalider à chaque fois, mais peut garder sa copie
+DOCUMENT_CACHE_CONTROL = "private, no-cache"
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Vrai si l'ETag courant fait partie de ceux envoyés dans If-None-Match"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110) : W/"x" et "x" désignent la même version
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Encodage retenu parmi ceux acceptés par le client ("br", "gzip" ou None)"""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime fixe : même document, mêmes octets
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={
+        "ETag": etag,
+        "Cache-Control": DOCUMENT_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    })
+
+def document_response(request: Request, content: str, etag: str,
+                      media_type: str = "text/html; charset=utf-8") -> Response:
+    """Document complet avec ETag, compressé si le client l'accepte"""
+    body = content.encode("utf-8")
+    headers = {
+        "ETag": etag,
+        "Cache-Control": DOCUMENT_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+
+    encoding = negotiate_encoding(request) if len(body) >= COMPRESSION_MIN_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+__all__ = [
+    "COMPRESSION_MIN_BYTES",
+    "if_none_match",
+    "negotiate_encoding",
+    "compress",
+    "not_modified_response",
+    "document_response",
+]
@@ -3,10 +3,15 @@ Module de sanitisation des logs pour protéger les données sensibles.
 Masque automatiquement les informations critiques selon l'environnement.
 """
 
+import functools
 import re
 from typing import Any, Dict, Optional
 from app.env import Mode, mode
 
+# Taille du mémo de chaque fonction de masquage (mêmes UUIDs / emails masqués
+# des milliers de fois par heure)
+MASK_CACHE_SIZE = 4096
+
 class LogSanitizer:
     """
     Sanitise les logs en masquant les données sensibles selon l'environnement.
@@ -23,12 +28,41 @@ class LogSanitizer:
     TOKEN_PATTERN = re.compile(r'\b[A-Za-z0-9]{20,}\b')
     PATH_PATTERN = re.compile(r'/[^\s]*(?:venv|build|site-packages|user-venvs)[^\s]*')
     
+    # Passe unique, tentée uniquement en début de mot : emails, puis UUIDs, puis
+    # suites alphanumériques complètes contenant un téléphone (8 chiffres) ou
+    # assez longues pour être un token, dans l'ordre des anciennes passes
+    _RUN = r'(?:[A-Za-z0-9]*?[0-9]{8}[A-Za-z0-9]*|[A-Za-z0-9]{20,})'
+    SENSITIVE_PATTERN = re.compile(
+        r'\b(?:(?P<email>' + EMAIL_PATTERN.pattern + r')'
+        r'|(?P<uuid>' + UUID_PATTERN.pattern + r')'
+        r'|(?P<run>' + _RUN + r'))'
+    )
+    # Variante pour les messages contenant '_' ou des caractères non ASCII :
+    # une suite peut alors commencer juste après un caractère de mot
+    SENSITIVE_PATTERN_FULL = re.compile(
+        SENSITIVE_PATTERN.pattern
+        + r'|(?P<prefix>[^\W0-9A-Za-z])(?P<prefixed_run>' + _RUN + r')'
+    )
+    
+    # Sans '@' (email), '-' (UUID), 8 chiffres (téléphone) ni 20 alphanumériques
+    # (token), aucun masquage n'est possible
+    DIGIT_RUN_PATTERN = re.compile(r'[0-9]{8}')
+    LONG_RUN_PATTERN = re.compile(r'[A-Za-z0-9]{20}')
+    
+    # Mots-clés des lignes de stack trace supprimées en production
+    STACK_TRACE_KEYWORDS = ('traceback', 'file "/', 'line ', '  at ', 'in <module>')
+    STACK_TRACE_PATTERN = re.compile('|'.join(re.escape(k) for k in STACK_TRACE_KEYWORDS))
+    
+    # Statistiques : messages sanitisés et messages passés par le chemin rapide
+    _stats = {"messages": 0, "fast_path": 0}
+    
     @classmethod
     def is_production(cls) -> bool:
         """Vérifie si on est en environnement de production"""
         return mode == Mode.PROD
     
     @classmethod
+    @functools.lru_cache(maxsize=MASK_CACHE_SIZE)
     def mask_email(cls, email: str) -> str:
         """
         Masque partiellement un email.
@@ -49,6 +83,7 @@ class LogSanitizer:
             return f"{masked_local}@{masked_domain}"
     
     @classmethod
+    @functools.lru_cache(maxsize=MASK_CACHE_SIZE)
     def mask_uuid(cls, uuid_str: str) -> str:
         """
         Masque partiellement un UUID.
@@ -59,6 +94,7 @@ class LogSanitizer:
         return f"{uuid_str[:4]}***-***-***-***-***{uuid_str[-4:]}"
     
     @classmethod
+    @functools.lru_cache(maxsize=MASK_CACHE_SIZE)
     def mask_phone(cls, phone: str) -> str:
         """
         Masque partiellement un numéro de téléphone.
@@ -72,6 +108,7 @@ class LogSanitizer:
             return f"{phone[:2]}***{phone[-3:]}"
     
     @classmethod
+    @functools.lru_cache(maxsize=MASK_CACHE_SIZE)
     def mask_token(cls, token: str) -> str:
         """
         Masque partiellement un token.
@@ -91,21 +128,72 @@ class LogSanitizer:
             return message
             
         # En production, masquer les chemins sensibles
-        sanitized = cls.PATH_PATTERN.sub('/***/', message)
+        sanitized = cls.PATH_PATTERN.sub('/***/', message) if '/' in message else message
         
         # Supprimer les lignes de stack trace détaillées
-        lines = sanitized.split('\n')
-        filtered_lines = []
+        # (garder seulement les messages d'erreur, pas les chemins de fichiers)
+        keywords = cls.STACK_TRACE_KEYWORDS
+        if not cls.STACK_TRACE_PATTERN.search(sanitized.lower()):
+            # Aucune ligne concernée
+            return sanitized
         
-        for line in lines:
-            # Garder seulement les messages d'erreur, pas les chemins de fichiers
-            if not any(keyword in line.lower() for keyword in [
-                'traceback', 'file "/', 'line ', '  at ', 'in <module>'
-            ]):
+        filtered_lines = []
+        for line in sanitized.split('\n'):
+            lowered = line.lower()
+            if not any(keyword in lowered for keyword in keywords):
                 filtered_lines.append(line)
         
         return '\n'.join(filtered_lines)
     
+    @classmethod
+    def has_trigger(cls, message: str) -> bool:
+        """Vérifie si le message contient de quoi déclencher un masquage"""
+        return (
+            '@' in message
+            or '-' in message
+            or cls.DIGIT_RUN_PATTERN.search(message) is not None
+            or cls.LONG_RUN_PATTERN.search(message) is not None
+        )
+    
+    @classmethod
+    def _mask_token_match(cls, match: re.Match) -> str:
+        return cls.mask_token(match.group(0))
+    
+    @classmethod
+    def _mask_phone_match(cls, match: re.Match) -> str:
+        return cls.mask_phone(match.group(0))
+    
+    @classmethod
+    def _mask_sensitive_match(cls, match: re.Match) -> str:
+        """
+        Callback de la passe unique. Reproduit l'effet des passes successives
+        (email → UUID → téléphone → token) sur la portion trouvée.
+        """
+        kind = match.lastgroup
+        value = match.group(kind)
+        
+        if kind == 'uuid':
+            return cls.mask_uuid(value)
+        
+        if kind == 'email':
+            # L'extension conservée peut encore être un token long
+            return cls.TOKEN_PATTERN.sub(cls._mask_token_match, cls.mask_email(value))
+        
+        # Suite alphanumérique : téléphones d'abord, puis tokens sur le résultat,
+        # avec les caractères voisins pour que les limites de mot restent exactes
+        text = match.string
+        start, end = match.span(kind)
+        before = text[start - 1] if start > 0 else ''
+        after = text[end] if end < len(text) else ''
+        prefix = match.group('prefix') if kind == 'prefixed_run' else ''
+        
+        masked = cls.PHONE_PATTERN.sub(cls._mask_phone_match, value)
+        if len(masked) < 20:
+            return prefix + masked
+        
+        masked = cls.TOKEN_PATTERN.sub(cls._mask_token_match, before + masked + after)
+        return prefix + masked[len(before):len(masked) - len(after)]
+    
     @classmethod
     def sanitize_message(cls, message: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -122,39 +210,48 @@ class LogSanitizer:
             # En développement, logs complets
             return message
             
-        sanitized = message
-        
-        # Masquer les emails
-        emails = cls.EMAIL_PATTERN.findall(sanitized)
-        for email in emails:
-            masked = cls.mask_email(email)
-            sanitized = sanitized.replace(email, masked)
+        cls._stats["messages"] += 1
         
-        # Masquer les UUIDs
-        uuids = cls.UUID_PATTERN.findall(sanitized)
-        for uuid_str in uuids:
-            masked = cls.mask_uuid(uuid_str)
-            sanitized = sanitized.replace(uuid_str, masked)
+        # Chemin rapide : rien à masquer sans caractère déclencheur
+        if not cls.has_trigger(message):
+            cls._stats["fast_path"] += 1
+            return cls.sanitize_stack_trace(message)
         
-        # Masquer les téléphones
-        phones = cls.PHONE_PATTERN.findall(sanitized)
-        for phone in phones:
-            if len(phone) >= 8:  # Éviter de masquer les codes courts
-                masked = cls.mask_phone(phone)
-                sanitized = sanitized.replace(phone, masked)
-        
-        # Masquer les tokens longs
-        tokens = cls.TOKEN_PATTERN.findall(sanitized)
-        for token in tokens:
-            if len(token) >= 20:  # Seulement les tokens longs
-                masked = cls.mask_token(token)
-                sanitized = sanitized.replace(token, masked)
+        # Emails, UUIDs, téléphones et tokens longs en une seule passe
+        if message.isascii() and '_' not in message:
+            pattern = cls.SENSITIVE_PATTERN
+        else:
+            pattern = cls.SENSITIVE_PATTERN_FULL
+        sanitized = pattern.sub(cls._mask_sensitive_match, message)
         
         # Sanitiser les stack traces
         sanitized = cls.sanitize_stack_trace(sanitized)
         
         return sanitized
     
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Statistiques du chemin rapide et des mémos de masquage"""
+        messages = cls._stats["messages"]
+        fast_path = cls._stats["fast_path"]
+        caches = {}
+        for name in ('mask_email', 'mask_uuid', 'mask_phone', 'mask_token'):
+            info = getattr(cls, name).cache_info()
+            lookups = info.hits + info.misses
+            caches[name] = {
+                "hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "max_size": info.maxsize,
+                "hit_rate": round(info.hits / lookups, 3) if lookups else 0.0,
+            }
+        return {
+            "messages": messages,
+            "fast_path": fast_path,
+            "fast_path_rate": round(fast_path / messages, 3) if messages else 0.0,
+            "mask_caches": caches,
+        }
+    
     @classmethod
     def sanitize_auth_log(cls, user_id: str, action: str) -> str:
         """
@@ -213,3 +310,7 @@ def sanitize_auth_log(user_id: str, action: str) -> str:
 def sanitize_db_error(error_message: str) -> str:
     """Fonction utilitaire pour les erreurs de base de données"""
     return LogSanitizer.sanitize_database_error(error_message)
+
+def get_sanitizer_stats() -> Dict[str, Any]:
+    """Fonction utilitaire pour les statistiques du sanitiseur"""
+    return LogSanitizer.get_stats()
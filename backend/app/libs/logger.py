@@ -0,0 +1,231 @@
+"""
+Journalisation asynchrone des routers, au-dessus de `app.libs.log_sanitizer`.
+
+Les routers ne font plus `print(sanitize_log(...))` sur la boucle d'événements :
+le message brut est déposé dans une file bornée, et un thread d'écriture le
+sanitise, le formate et l'écrit sur stdout par lots. Si la file est pleine
+(rafale de logs pendant un incident base de données), les plus anciens
+messages sont abandonnés et comptés, sans jamais bloquer la requête.
+
+Configuration :
+- LOG_QUEUE_SIZE : taille de la file (10000 par défaut)
+- LOG_FORMAT : "text" (une ligne par message, comme avant) ou "json" (JSON lines)
+
+Les champs structurés (`log_warning("...", category="auth")`) sont ajoutés en
+`clé=valeur` en mode texte, et comme clés du JSON sinon. Leurs valeurs
+texte passent par `sanitize_log`, sauf celles marquées `SafeField` (déjà
+sûres, ex: clé client hachée), écrites telles quelles.
+
+Usage:
+
+    from app.libs.logger import log_db_error, log_error
+
+    except asyncpg.PostgresError as e:
+        log_db_error(f"Database error in get_dashboard_data: {e}")
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, TextIO, Tuple
+from app.libs.log_sanitizer import sanitize_db_error, sanitize_log
+
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+
+# (horodatage, niveau, type de sanitisation, message, champs additionnels)
+LogEntry = Tuple[float, str, str, str, Dict[str, Any]]
+
+class SafeField(str):
+    """Valeur de champ déjà sûre (ex: clé client hachée), écrite sans sanitisation"""
+    __slots__ = ()
+
+class AsyncLogWriter:
+    """
+    File bornée + thread d'écriture.
+
+    `submit` est appelé depuis la boucle d'événements et ne fait qu'ajouter
+    le message à la file. Toute la sanitisation, le formatage et l'écriture
+    se font dans le thread d'écriture.
+    """
+
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE, log_format: str = LOG_FORMAT,
+                 stream: Optional[TextIO] = None):
+        self.max_queue = max_queue
+        self.log_format = log_format if log_format in ("text", "json") else "text"
+        self.stream = stream
+
+        self._queue: Deque[LogEntry] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Compteurs
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, level: str, kind: str, message: str, fields: Optional[Dict[str, Any]] = None) -> None:
+        """Dépose un message dans la file ; abandonne le plus ancien si elle est pleine"""
+        entry = (time.time(), level, kind, message, fields or {})
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(entry)
+            self.enqueued += 1
+
+        if self._thread is None:
+            self._start()
+        self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="app-log-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self) -> List[LogEntry]:
+        with self._lock:
+            batch = list(self._queue)
+            self._queue.clear()
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+
+            batch = self._drain()
+            if batch:
+                self._write(batch)
+            elif self._stopping:
+                return
+
+    def _sanitize(self, kind: str, message: str) -> str:
+        if kind == "db_error":
+            return sanitize_db_error(message)
+        if kind == "raw":
+            return message
+        return sanitize_log(message)
+
+    @staticmethod
+    def _field_value(value: Any) -> Any:
+        # Le type du message (db_error, ...) ne s'applique pas aux champs
+        if isinstance(value, SafeField):
+            return str(value)
+        if isinstance(value, str):
+            return sanitize_log(value)
+        return value
+
+    def _format(self, entry: LogEntry) -> str:
+        created, level, kind, message, fields = entry
+        sanitized = self._sanitize(kind, message)
+        values = {key: self._field_value(value) for key, value in fields.items()}
+
+        if self.log_format == "json":
+            record = {
+                "ts": datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": level,
+                "message": sanitized,
+            }
+            record.update(values)
+            return json.dumps(record, ensure_ascii=False, default=str)
+
+        if not values:
+            return sanitized
+        pairs = []
+        for key, value in values.items():
+            text = str(value)
+            # Guillemets si la valeur contient des espaces ou des '='
+            if not text or any(char.isspace() or char in '="' for char in text):
+                text = json.dumps(text, ensure_ascii=False)
+            pairs.append(f"{key}={text}")
+        return f"{sanitized} {' '.join(pairs)}"
+
+    def _write(self, batch: List[LogEntry]) -> None:
+        lines = []
+        for entry in batch:
+            try:
+                lines.append(self._format(entry))
+            except Exception:
+                self.errors += 1
+
+        if not lines:
+            return
+
+        try:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.errors += len(lines)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Écrit les messages en attente puis arrête le thread d'écriture"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.log_format,
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+# Instance partagée par toute l'application
+log_writer = AsyncLogWriter()
+
+def log_info(message: str, **fields: Any) -> None:
+    """Message d'information (sanitisé hors de la boucle)"""
+    log_writer.submit("info", "log", message, fields)
+
+def log_warning(message: str, **fields: Any) -> None:
+    """Avertissement (sanitisé hors de la boucle)"""
+    log_writer.submit("warning", "log", message, fields)
+
+def log_error(message: str, **fields: Any) -> None:
+    """Erreur (sanitisée hors de la boucle)"""
+    log_writer.submit("error", "log", message, fields)
+
+def log_db_error(message: str, **fields: Any) -> None:
+    """Erreur de base de données (générique en production, comme sanitize_db_error)"""
+    log_writer.submit("error", "db_error", message, fields)
+
+def get_log_stats() -> Dict[str, Any]:
+    """Statistiques de la file de logs"""
+    return log_writer.get_stats()
+
+def close_logger(timeout: float = 2.0) -> None:
+    """Vide la file et arrête le thread d'écriture (arrêt de l'application)"""
+    log_writer.close(timeout)
+
+__all__ = [
+    "SafeField",
+    "AsyncLogWriter",
+    "log_writer",
+    "log_info",
+    "log_warning",
+    "log_error",
+    "log_db_error",
+    "get_log_stats",
+    "close_logger",
+]
@@ -1,9 +1,18 @@
-from fastapi import FastAPI, Request, HTTPException
-from slowapi import Limiter
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from app.libs.rate_limiter import limiter, custom_rate_limit_exceeded_handler
-from app.libs.log_sanitizer import sanitize_log
+import os
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from app.libs.rate_limiter import compile_route_limits, get_client_key, limiter, rate_limit_exceeded_response
+from app.libs.logger import SafeField, log_info, log_error, log_warning
+from databutton_app.mw.auth_mw import resolve_verified_subject
+from app.libs.database_pool import (
+    LEAK_DETECTION,
+    ConnectionLeakError,
+    current_route,
+    db_pool,
+    request_leases,
+)
 
 def setup_rate_limiting_middleware(app: FastAPI) -> None:
     """
@@ -13,18 +22,55 @@ def setup_rate_limiting_middleware(app: FastAPI) -> None:
         app: Instance FastAPI à configurer
     """
     try:
-        # Ajouter le middleware SlowAPI
+        # Exposer le limiteur hybride
         app.state.limiter = limiter
-        app.add_exception_handler(RateLimitExceeded, custom_rate_limit_exceeded_handler)
         
-        # Le middleware sera automatiquement utilisé par les décorateurs @limiter.limit
-        print(sanitize_log("Rate limiting middleware configured successfully"))
+        # Les limites sont déclarées par route dans ROUTE_RATE_LIMITS
+        app.add_middleware(RateLimitMiddleware)
+        
+        # Surveillance ajoutée en dernier : elle voit aussi les requêtes refusées
+        app.add_middleware(RateLimitMonitoringMiddleware)
+        log_info("Rate limiting middleware configured successfully")
         
     except Exception as e:
-        print(sanitize_log("Failed to configure rate limiting middleware"))
+        log_error("Failed to configure rate limiting middleware")
         # Ne pas faire planter l'application si le rate limiting échoue
         pass
 
+# Middleware de rate limiting : une recherche dans la table des routes par requête
+class RateLimitMiddleware:
+    """
+    Applique les limites de ROUTE_RATE_LIMITS avant le routage.
+    Les routes absentes de la table ne coûtent qu'une recherche dans un dict.
+    Un utilisateur dont le jeton a déjà été vérifié a son propre compteur,
+    même derrière une IP partagée (NAT opérateur).
+    """
+    
+    def __init__(self, app, routes=None, rate_limiter=None):
+        self.app = app
+        self.routes = compile_route_limits(routes)
+        self.limiter = rate_limiter or limiter
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        route = self.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        
+        resolve_verified_subject(scope)
+        key = f"{route.name}:{get_client_key(scope)}"
+        allowed, retry_after = self.limiter.hit(key, route.limit, route.period)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+        
+        response = rate_limit_exceeded_response(scope["path"], route.rate, retry_after)
+        await response(scope, receive, send)
+
 def get_client_identifier(request: Request) -> str:
     """
     Extrait un identifiant unique du client pour le rate limiting.
@@ -33,63 +79,285 @@ def get_client_identifier(request: Request) -> str:
         request: Requête FastAPI
         
     Returns:
-        Identifiant unique du client (IP + user_id si authentifié)
+        Empreinte de l'utilisateur vérifié, ou de l'IP du client si anonyme
+    """
+    resolve_verified_subject(request.scope)
+    return get_client_key(request.scope)
+
+# Surveillance des endpoints sensibles
+# Préfixes surveillés (chemin complet, routers montés sous /routes) -> catégorie
+SUSPICIOUS_PREFIXES: Dict[str, str] = {
+    "/routes/api/admin/": "admin",
+    "/routes/api/auth/": "auth",
+    "/routes/api/leads/submit": "leads_submit",
+    "/routes/api/messaging/": "messaging",
+}
+
+# Nombre de clients suivis (taille fixe de l'anneau)
+MONITOR_RING_SIZE = int(os.environ.get("MONITOR_RING_SIZE", "4096"))
+# Cases par ensemble : un nouveau client évince le moins actif de son ensemble
+MONITOR_RING_WAYS = int(os.environ.get("MONITOR_RING_WAYS", "4"))
+# Fenêtre glissante en secondes, découpée en MONITOR_WINDOW_BUCKETS tranches
+MONITOR_WINDOW = float(os.environ.get("MONITOR_WINDOW", "60"))
+MONITOR_WINDOW_BUCKETS = int(os.environ.get("MONITOR_WINDOW_BUCKETS", "6"))
+# Requêtes vers des endpoints sensibles par client et par fenêtre avant alerte
+MONITOR_ALERT_THRESHOLD = int(os.environ.get("MONITOR_ALERT_THRESHOLD", "100"))
+
+class PrefixTrie:
+    """
+    Trie des préfixes surveillés, compilé une seule fois.
+    `match` parcourt le chemin caractère par caractère et s'arrête au premier
+    caractère hors du trie : la plupart des chemins sortent dès "/routes/api/x".
     """
-    # Récupérer l'IP du client
-    client_ip = request.client.host if request.client else "unknown"
     
-    # Si l'utilisateur est authentifié, ajouter son ID
-    user_id = getattr(request.state, 'user_id', None) if hasattr(request, 'state') else None
+    _END = ""  # clé du libellé dans un nœud (jamais un caractère du chemin)
     
-    if user_id:
-        return f"{client_ip}:{user_id}"
-    else:
-        return client_ip
+    def __init__(self, prefixes: Dict[str, str]):
+        self._root: Dict[str, Any] = {}
+        for prefix, label in prefixes.items():
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[self._END] = label
+    
+    def match(self, path: str) -> Optional[str]:
+        """Catégorie du plus long préfixe correspondant, ou None"""
+        node = self._root
+        label = None
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            label = node.get(self._END, label)
+        return label
+
+class SlidingWindowRing:
+    """
+    Compteurs par client sur une fenêtre glissante, en mémoire fixe.
+    
+    L'anneau compte `size` cases regroupées en ensembles de `ways` cases ;
+    la clé d'un client choisit son ensemble par hachage. Chaque case contient
+    `buckets` tranches de `window / buckets` secondes, stockées dans deux
+    tableaux plats préalloués. Un nouveau client prend une case libre de son
+    ensemble, sinon celle dont le total sur la fenêtre est le plus faible
+    (comptabilisé dans `collisions`) : un gros consommateur n'est pas évincé
+    par des petits clients du même ensemble, qui se disputent les cases
+    restantes.
+    """
+    
+    def __init__(self, size: int = MONITOR_RING_SIZE, window: float = MONITOR_WINDOW,
+                 buckets: int = MONITOR_WINDOW_BUCKETS, ways: int = MONITOR_RING_WAYS):
+        self.ways = max(1, min(ways, size))
+        self.sets = max(1, size // self.ways)
+        self.size = self.sets * self.ways
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self._owners: List[Optional[str]] = [None] * self.size
+        self._counts = array("I", [0]) * (self.size * buckets)
+        self._epochs = array("q", [-1]) * (self.size * buckets)
+        self._claimed = array("q", [0]) * self.size
+        self._claim_seq = 0
+        self.collisions = 0
+    
+    def _window_total(self, slot: int, oldest: int) -> int:
+        base = slot * self.buckets
+        counts = self._counts
+        epochs = self._epochs
+        total = 0
+        for i in range(base, base + self.buckets):
+            if epochs[i] > oldest:
+                total += counts[i]
+        return total
+    
+    def _claim(self, key: str, first: int, oldest: int) -> int:
+        """
+        Case attribuée à un nouveau client : libre, sinon la moins chargée ;
+        à égalité, la plus récemment attribuée, pour que les nouveaux venus
+        se disputent entre eux plutôt qu'avec un client installé.
+        """
+        victim, victim_rank = first, None
+        for slot in range(first, first + self.ways):
+            if self._owners[slot] is None:
+                victim = slot
+                break
+            rank = (self._window_total(slot, oldest), -self._claimed[slot])
+            if victim_rank is None or rank < victim_rank:
+                victim, victim_rank = slot, rank
+        else:
+            self.collisions += 1
+        
+        self._owners[victim] = key
+        self._claim_seq += 1
+        self._claimed[victim] = self._claim_seq
+        base = victim * self.buckets
+        for i in range(base, base + self.buckets):
+            self._counts[i] = 0
+            self._epochs[i] = -1
+        return victim
+    
+    def add(self, key: str, now: float) -> int:
+        """Compte une requête du client et retourne son total sur la fenêtre"""
+        first = (hash(key) % self.sets) * self.ways
+        epoch = int(now // self.bucket_seconds)
+        oldest = epoch - self.buckets
+        
+        owners = self._owners
+        for slot in range(first, first + self.ways):
+            if owners[slot] == key:
+                break
+        else:
+            slot = self._claim(key, first, oldest)
+        
+        counts = self._counts
+        epochs = self._epochs
+        index = slot * self.buckets + epoch % self.buckets
+        if epochs[index] != epoch:
+            epochs[index] = epoch
+            counts[index] = 0
+        counts[index] += 1
+        return self._window_total(slot, oldest)
+    
+    def snapshot(self, now: float, top: int = 10) -> Dict[str, Any]:
+        """Clients actifs sur la fenêtre et les plus gros consommateurs"""
+        oldest = int(now // self.bucket_seconds) - self.buckets
+        totals = []
+        for slot, owner in enumerate(self._owners):
+            if owner is None:
+                continue
+            base = slot * self.buckets
+            total = sum(
+                self._counts[i] for i in range(base, base + self.buckets)
+                if self._epochs[i] > oldest
+            )
+            if total:
+                totals.append((total, owner))
+        totals.sort(reverse=True)
+        return {
+            "active_clients": len(totals),
+            "top_clients": [{"client": owner, "requests": total} for total, owner in totals[:top]],
+        }
+
+class RequestMonitor:
+    """
+    Métriques de surveillance des endpoints sensibles, partagées par
+    l'application (comme `limiter` et `log_writer`).
+    Rien n'est journalisé par requête : seul le franchissement du seuil
+    d'alerte par un client produit un avertissement.
+    """
+    
+    def __init__(self, prefixes: Dict[str, str] = SUSPICIOUS_PREFIXES,
+                 alert_threshold: int = MONITOR_ALERT_THRESHOLD, ring: Optional[SlidingWindowRing] = None):
+        self.trie = PrefixTrie(prefixes)
+        self.alert_threshold = alert_threshold
+        self.ring = ring or SlidingWindowRing()
+        
+        # Métriques
+        self.requests = 0
+        self.by_category: Dict[str, int] = {label: 0 for label in prefixes.values()}
+        self.alerts = 0
+    
+    def observe(self, scope) -> None:
+        self.requests += 1
+        category = self.trie.match(scope["path"])
+        if category is None:
+            return
+        
+        self.by_category[category] += 1
+        resolve_verified_subject(scope)
+        client_key = get_client_key(scope)
+        total = self.ring.add(f"{category}:{client_key}", time.time())
+        if total == self.alert_threshold:
+            self.alerts += 1
+            log_warning(
+                f"Client exceeded {self.alert_threshold} requests to {category} endpoints",
+                category=category,
+                client=SafeField(client_key),
+            )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "sensitive_requests": dict(self.by_category),
+            "alerts": self.alerts,
+            "alert_threshold": self.alert_threshold,
+            "ring_size": self.ring.size,
+            "ring_collisions": self.ring.collisions,
+            **self.ring.snapshot(time.time()),
+        }
+
+# Instance partagée par toute l'application
+request_monitor = RequestMonitor()
+
+def get_monitoring_stats() -> Dict[str, Any]:
+    """Métriques de surveillance des endpoints sensibles"""
+    return request_monitor.get_stats()
 
 # Middleware personnalisé pour surveillance des patterns suspects
 class RateLimitMonitoringMiddleware:
     """
     Middleware pour surveiller les patterns suspects de rate limiting.
+    ASGI pur : ni objet Request, ni log par requête.
     """
     
-    def __init__(self, app: FastAPI):
+    def __init__(self, app, monitor: Optional[RequestMonitor] = None):
         self.app = app
-        self.suspicious_attempts = {}  # Stockage temporaire des tentatives suspectes
+        self.monitor = monitor or request_monitor
     
     async def __call__(self, scope, receive, send):
         if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Surveiller les patterns suspects avant traitement
-            await self._monitor_request_pattern(request)
+            self.monitor.observe(scope)
         
         await self.app(scope, receive, send)
+
+# Middleware de détection des fuites de connexions
+class ConnectionLeakMiddleware:
+    """
+    Associe chaque emprunt de connexion à la route en cours et vérifie
+    qu'aucune connexion n'est encore détenue quand la requête répond.
+    En mode debug (DATABASE_LEAK_DEBUG=true), une telle requête échoue.
+    """
     
-    async def _monitor_request_pattern(self, request: Request):
-        """
-        Surveille les patterns de requêtes potentiellement suspects.
-        """
-        client_id = get_client_identifier(request)
-        endpoint = request.url.path
-        
-        # Patterns suspects à surveiller:
-        # 1. Requêtes répétées vers endpoints sensibles
-        # 2. Balayage d'endpoints (scanning)
-        # 3. Tentatives de bruteforce
-        
-        suspicious_endpoints = [
-            "/api/admin/",
-            "/api/auth/", 
-            "/api/leads/submit",
-            "/api/messaging/"
-        ]
-        
-        if any(endpoint.startswith(sus_ep) for sus_ep in suspicious_endpoints):
-            # Log pattern suspect (sans exposer d'infos sensibles)
-            print(sanitize_log(f"Monitoring request to sensitive endpoint: {endpoint}"))
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        route = f"{scope['method']} {scope['path']}"
+        leases = set()
+        route_token = current_route.set(route)
+        leases_token = request_leases.set(leases)
+        reported = False
+        
+        async def send_with_leak_check(message):
+            nonlocal reported
+            # Une connexion encore détenue au moment de répondre ne sera jamais rendue par la route
+            if message["type"] == "http.response.start" and leases and LEAK_DETECTION["debug"]:
+                reported = True
+                db_pool.report_request_leak(route, leases)
+                raise ConnectionLeakError(f"{route} responded without releasing its database connection")
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_leak_check)
+        finally:
+            current_route.reset(route_token)
+            request_leases.reset(leases_token)
+        
+        if leases and not reported:
+            db_pool.report_request_leak(route, leases)
+            if LEAK_DETECTION["debug"]:
+                raise ConnectionLeakError(f"{route} finished without releasing its database connection")
 
 __all__ = [
     "setup_rate_limiting_middleware",
+    "RateLimitMiddleware",
     "get_client_identifier",
-    "RateLimitMonitoringMiddleware"
+    "RateLimitMonitoringMiddleware",
+    "RequestMonitor",
+    "request_monitor",
+    "get_monitoring_stats",
+    "ConnectionLeakMiddleware"
 ]
@@ -0,0 +1,224 @@
+"""
+Pagination par curseur (keyset) des listes admin.
+
+Une page est lue par `WHERE (tri, id) < (dernière valeur vue) ORDER BY tri,
+id LIMIT n` : le coût ne dépend pas de la position dans la liste, contrairement
+à OFFSET qui relit toutes les lignes précédentes. Le curseur renvoyé au client
+(`next_cursor`) est opaque (base64) et lié au tri et aux filtres qui l'ont
+produit : le réutiliser avec d'autres paramètres renvoie une 400.
+
+Le total affiché n'est pas un COUNT(*) : sans filtre, il vient des
+statistiques de pg_class (reltuples) ; avec filtres, de l'estimation du
+planificateur. Les deux sont en temps constant et suffisent pour la
+pagination de l'interface.
+
+Usage:
+
+    from app.libs.pagination import Keyset, KeysetPage, estimate_total
+
+    LEADS_KEYSET = Keyset(table="leads l", id_column="l.id", sort_columns={"created_at": "l.created_at"})
+
+    page = KeysetPage(LEADS_KEYSET, limit=limit, cursor=cursor, order=order, filters={"status": status})
+    sql, params = page.query("SELECT l.* FROM leads l", conditions, params)
+    rows = await conn.fetch(sql, *params)
+    total = await estimate_total(conn, LEADS_KEYSET, conditions, params)
+    return page.envelope(rows, total)
+
+Compatibilité : sans curseur, `page` > 1 est servi par OFFSET, pour les
+clients qui naviguent encore par numéro de page.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """Enveloppe de réponse d'une liste paginée"""
+    data: List[T]
+    next_cursor: Optional[str] = None
+    total: int
+    total_is_estimate: bool = True
+    page: int = 1
+    limit: int
+    total_pages: int
+
+@dataclass(frozen=True)
+class Keyset:
+    """
+    Ordre de parcours d'une liste : une colonne de tri (au choix parmi
+    `sort_columns`) départagée par un identifiant unique.
+    Les noms exposés (clés de `sort_columns`, `id_field`) doivent aussi être
+    des colonnes des lignes retournées, pour construire le curseur suivant.
+    Une colonne de tri qui peut être NULL doit avoir un repli non NULL dans
+    `sort_fallbacks` : le tri, la condition de curseur et le curseur portent
+    alors sur COALESCE(colonne, repli), comme l'index qui les sert.
+    """
+    table: str  # table et alias de la requête, ex: "leads l"
+    id_column: str  # ex: "l.id"
+    sort_columns: Dict[str, str] = field(default_factory=dict)  # champ exposé -> expression SQL
+    id_field: str = "id"
+    id_type: Callable[[Any], Any] = int
+    default_sort: str = "created_at"
+    sort_fallbacks: Dict[str, str] = field(default_factory=dict)  # champ exposé -> champ utilisé s'il est NULL
+
+    def sort_expression(self, sort: str) -> str:
+        """Expression SQL du tri, avec son repli"""
+        fallback = self.sort_fallbacks.get(sort)
+        if fallback is None:
+            return self.sort_columns[sort]
+        return f"COALESCE({self.sort_columns[sort]}, {self.sort_columns[fallback]})"
+
+    def sort_value(self, row: Any, sort: str) -> Any:
+        """Valeur de tri d'une ligne, avec son repli"""
+        value = row[sort]
+        if value is None and sort in self.sort_fallbacks:
+            value = row[self.sort_fallbacks[sort]]
+        return value
+
+def _fingerprint(sort: str, descending: bool, filters: Dict[str, Any]) -> str:
+    """Empreinte courte du tri et des filtres, embarquée dans le curseur"""
+    payload = json.dumps([sort, descending, sorted(filters.items())], default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=6).hexdigest()
+
+def encode_cursor(sort_value: datetime, id_value: Any, fingerprint: str) -> str:
+    if sort_value is None:
+        # Une ligne NULL ne peut pas être située dans l'ordre : déclarer un repli (sort_fallbacks)
+        raise ValueError("Valeur de tri NULL : colonne de tri sans repli")
+    payload = json.dumps([sort_value.isoformat(), str(id_value), fingerprint], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, keyset: Keyset, fingerprint: str) -> Tuple[datetime, Any]:
+    """Valeurs (tri, id) du curseur ; 400 si le curseur est invalide ou d'une autre requête"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, id_value, cursor_fingerprint = json.loads(base64.urlsafe_b64decode(padded))
+        after = (datetime.fromisoformat(sort_value), keyset.id_type(id_value))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+    if cursor_fingerprint != fingerprint:
+        raise HTTPException(status_code=400, detail="Curseur de pagination obtenu avec d'autres filtres")
+    return after
+
+class KeysetPage:
+    """Une page demandée : construit la requête SQL et l'enveloppe de réponse"""
+
+    def __init__(self, keyset: Keyset, *, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                 sort: Optional[str] = None, order: str = "desc", page: int = 1,
+                 filters: Optional[Dict[str, Any]] = None):
+        sort = sort or keyset.default_sort
+        if sort not in keyset.sort_columns:
+            raise HTTPException(status_code=400, detail=f"Tri non supporté: {sort}")
+
+        self.keyset = keyset
+        self.limit = max(1, min(limit, MAX_PAGE_SIZE))
+        self.sort = sort
+        self.sort_column = keyset.sort_expression(sort)
+        self.descending = order.lower() != "asc"
+        self.fingerprint = _fingerprint(sort, self.descending, filters or {})
+        self.after = decode_cursor(cursor, keyset, self.fingerprint) if cursor else None
+        self.page = max(page, 1)
+        self.offset = 0 if cursor else (self.page - 1) * self.limit
+
+    @property
+    def order_by(self) -> str:
+        direction = "DESC" if self.descending else "ASC"
+        return f"{self.sort_column} {direction}, {self.keyset.id_column} {direction}"
+
+    def query(self, base_sql: str, conditions: Sequence[str] = (), params: Sequence[Any] = ()) -> Tuple[str, List[Any]]:
+        """
+        Complète `base_sql` (SELECT ... FROM ... sans WHERE) avec les filtres,
+        la condition de curseur, l'ordre et la limite. Une ligne de plus que la
+        limite est demandée pour savoir s'il existe une page suivante.
+        """
+        conditions = list(conditions)
+        params = list(params)
+
+        if self.after is not None:
+            params.extend(self.after)
+            operator = "<" if self.descending else ">"
+            conditions.append(
+                f"({self.sort_column}, {self.keyset.id_column}) {operator} (${len(params) - 1}, ${len(params)})"
+            )
+
+        sql = base_sql
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        params.append(self.limit + 1)
+        sql += f" ORDER BY {self.order_by} LIMIT ${len(params)}"
+        if self.offset:
+            params.append(self.offset)
+            sql += f" OFFSET ${len(params)}"
+        return sql, params
+
+    def envelope(self, rows: Sequence[Any], total: int,
+                 serialize: Callable[[Any], Any] = dict) -> Dict[str, Any]:
+        """Réponse `{data, next_cursor, total, total_pages, ...}` à partir des lignes lues"""
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(self.keyset.sort_value(last, self.sort), last[self.keyset.id_field],
+                                        self.fingerprint)
+
+        # L'estimation peut être en retard sur la page lue
+        total = max(total, self.offset + len(rows) + (1 if has_more else 0))
+        return {
+            "data": [serialize(row) for row in rows],
+            "next_cursor": next_cursor,
+            "total": total,
+            "total_is_estimate": True,
+            "page": self.page,
+            "limit": self.limit,
+            "total_pages": max(1, math.ceil(total / self.limit)),
+        }
+
+async def estimate_total(conn, keyset: Keyset, conditions: Sequence[str] = (),
+                         params: Sequence[Any] = ()) -> int:
+    """
+    Nombre de lignes estimé, en temps constant.
+    Sans filtre : reltuples de pg_class (COUNT(*) si la table n'a jamais été
+    analysée). Avec filtres : nombre de lignes prévu par le planificateur.
+    """
+    if not conditions:
+        table = keyset.table.split()[0]
+        estimate = await conn.fetchval(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)", table
+        )
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+        return await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+
+    plan = await conn.fetchval(
+        f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {keyset.table} WHERE " + " AND ".join(conditions),
+        *params
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "Page",
+    "Keyset",
+    "KeysetPage",
+    "encode_cursor",
+    "decode_cursor",
+    "estimate_total",
+]
@@ -1,13 +1,15 @@
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from fastapi import Request, HTTPException
+import asyncio
+import hashlib
+import ipaddress
+import os
+import time
+from dataclasses import dataclass
+from fastapi import Request
+from starlette.responses import JSONResponse
 from app.env import Mode, mode
 import databutton as db
-from app.libs.log_sanitizer import sanitize_log
-from typing import Callable, Union
-from functools import wraps
+from app.libs.logger import log_info, log_warning
+from typing import Dict, NamedTuple, Optional, Tuple, Union
 
 # Configuration des limites par type d'endpoint
 RATE_LIMITS = {
@@ -38,134 +40,469 @@ RATE_LIMITS = {
     "contracts": "50/minute"
 }
 
+# Limites par route : (méthode, chemin complet) → catégorie de RATE_LIMITS.
+# Appliquées par RateLimitMiddleware, avant le routage.
+ROUTE_RATE_LIMITS = {
+    # Leads
+    ("POST", "/routes/api/leads/submit"): "leads_submit",
+    ("GET", "/routes/api/leads"): "public",
+    
+    # Messaging
+    ("GET", "/routes/api/messaging/admin/received"): "admin",
+    ("POST", "/routes/api/messaging/send-announcement"): "admin",
+    ("DELETE", "/routes/api/messaging/delete-for-user"): "messaging",
+    ("GET", "/routes/api/messaging/my-messages"): "messaging",
+    ("POST", "/routes/api/messaging/mark-announcement-read"): "messaging",
+    ("POST", "/routes/api/messaging/mark-private-message-read"): "messaging",
+    ("POST", "/routes/api/messaging/send-private-message"): "messaging",
+    
+    # Commissions
+    ("GET", "/routes/api/commissions/balance"): "payment",
+    ("POST", "/routes/api/commissions/request-payment"): "payment",
+    
+    # Contrats
+    ("POST", "/routes/generate-contract"): "contracts",
+    ("POST", "/routes/sign-contract"): "contracts",
+}
+
+# Proxies de confiance (IP ou CIDR séparés par des virgules) : seuls eux
+# peuvent fournir l'IP réelle du client via X-Forwarded-For
+RATE_LIMIT_TRUSTED_PROXIES = os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "")
+# Sel des clés hachées (identique sur toutes les instances pour partager les compteurs)
+RATE_LIMIT_KEY_SALT = os.environ.get("RATE_LIMIT_KEY_SALT", "")
+# Nombre maximal de clés suivies par instance (seaux locaux, compteurs en mémoire)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Clé de l'identité vérifiée dans l'état de la requête (request.state.user_id),
+# publiée par la couche d'authentification
+SUBJECT_STATE_KEY = "user_id"
+
+def parse_trusted_proxies(value: str) -> Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    """Analyse RATE_LIMIT_TRUSTED_PROXIES ; les entrées invalides sont ignorées"""
+    networks = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            log_warning(f"Ignoring invalid trusted proxy: {entry}")
+    return tuple(networks)
+
+TRUSTED_PROXIES = parse_trusted_proxies(RATE_LIMIT_TRUSTED_PROXIES)
+
+def _is_trusted_proxy(address: str) -> bool:
+    if not TRUSTED_PROXIES:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def get_client_ip(scope: dict) -> str:
+    """
+    IP du client pour une requête ASGI.
+    X-Forwarded-For n'est lu que si le pair direct est un proxy de confiance ;
+    la chaîne est alors parcourue de droite à gauche jusqu'à la première
+    adresse qui n'est pas un proxy de confiance.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+    
+    forwarded = None
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            forwarded = value.decode("latin-1")
+    if not forwarded:
+        return peer
+    
+    for hop in reversed(forwarded.split(",")):
+        hop = hop.strip()
+        if hop and not _is_trusted_proxy(hop):
+            return hop
+    return peer
+
+def get_client_key(scope: dict) -> str:
+    """
+    Clé compacte et stable d'un client : empreinte de l'identité vérifiée si la
+    requête est authentifiée, sinon de l'IP du client. Longueur fixe (16
+    caractères), sans donnée personnelle en clair dans Redis ni dans les logs.
+    """
+    subject = scope.get("state", {}).get(SUBJECT_STATE_KEY)
+    identity = f"u:{subject}" if subject else f"ip:{get_client_ip(scope)}"
+    return hashlib.blake2b(
+        identity.encode(), digest_size=8, key=RATE_LIMIT_KEY_SALT.encode()[:64]
+    ).hexdigest()
+
 def get_rate_limiter_key_func(request: Request) -> str:
     """
     Détermine la clé pour le rate limiting.
-    Utilise l'IP du client et potentiellement l'ID utilisateur.
+    Utilise l'identité vérifiée de l'utilisateur, ou l'IP du client.
     """
-    client_ip = get_remote_address(request)
+    return get_client_key(request.scope)
+
+# Limiteur hybride : seaux à jetons locaux, réconciliés périodiquement par lots
+# avec un stockage partagé (Redis, ou un équivalent en mémoire)
+RATE_LIMIT_SYNC_INTERVAL = float(os.environ.get("RATE_LIMIT_SYNC_INTERVAL", "1.0"))
+# Dépassement toléré entre deux synchronisations, en fraction de la limite
+RATE_LIMIT_TOLERANCE = float(os.environ.get("RATE_LIMIT_TOLERANCE", "0.1"))
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Convertit une limite au format slowapi en (requêtes, période en secondes).
+    Exemple: "10/minute" → (10, 60)
+    """
+    count, _, period = rate.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Unsupported rate limit period: {rate}")
+    return int(count), _PERIODS[period]
+
+class RouteLimit(NamedTuple):
+    """Limite compilée d'une route"""
+    name: str  # préfixe des clés du limiteur (ex: "POST /routes/api/leads/submit")
+    rate: str
+    limit: int
+    period: int
+
+def compile_route_limits(routes: Dict[Tuple[str, str], str] = None) -> Dict[Tuple[str, str], RouteLimit]:
+    """Résout la table des routes en limites prêtes à l'emploi (une seule fois, au démarrage)"""
+    routes = ROUTE_RATE_LIMITS if routes is None else routes
+    compiled = {}
+    for (method, path), category in routes.items():
+        rate = RATE_LIMITS[category]
+        limit, period = parse_rate(rate)
+        compiled[(method, path)] = RouteLimit(f"{method} {path}", rate, limit, period)
+    return compiled
+
+class RateLimitExceeded(Exception):
+    """Limite atteinte pour une clé"""
     
-    # Si utilisateur authentifié, on peut combiner IP + user_id pour plus de granularité
-    user_id = getattr(request.state, 'user_id', None) if hasattr(request, 'state') else None
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+@dataclass
+class _Bucket:
+    """Seau à jetons local d'une clé"""
+    limit: int
+    period: int
+    tokens: float
+    updated_at: float
+    pending: int = 0  # admissions pas encore envoyées au stockage partagé
+    synced: bool = False  # total global connu au moins une fois
+    shared: bool = False  # d'autres instances consomment aussi cette clé
+    window: int = -1  # fenêtre du stockage partagé en cours
+    window_sent: int = 0  # admissions de cette instance déjà envoyées pour cette fenêtre
+
+class MemoryLimiterStore:
+    """
+    Stockage partagé en mémoire : compteurs par clé et fenêtre fixe.
+    Remplace Redis en développement et dans les tests (une seule instance).
+    """
     
-    if user_id:
-        # Format: IP:USER_ID pour utilisateurs authentifiés
-        return f"{client_ip}:{user_id}"
-    else:
-        # Format: IP seulement pour utilisateurs anonymes
-        return client_ip
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counts: Dict[Tuple[str, int], int] = {}
+    
+    async def add(self, increments: Dict[Tuple[str, int, int], int]) -> Dict[Tuple[str, int, int], int]:
+        """Ajoute les admissions par (clé, période, fenêtre) et retourne les totaux"""
+        totals = {}
+        for (key, period, window), count in increments.items():
+            counter = (f"{key}:{period}", window)
+            self._counts[counter] = self._counts.get(counter, 0) + count
+            totals[(key, period, window)] = self._counts[counter]
+        
+        # Oublier les fenêtres terminées
+        now = time.time()
+        for (counter_key, window) in list(self._counts):
+            period = int(counter_key.rsplit(":", 1)[1])
+            if window < int(now // period) - 1:
+                del self._counts[(counter_key, window)]
+        
+        # Borne mémoire : les compteurs les plus anciens partent en premier
+        while len(self._counts) > self.max_keys:
+            del self._counts[next(iter(self._counts))]
+        return totals
+    
+    async def close(self) -> None:
+        self._counts.clear()
+
+class RedisLimiterStore:
+    """
+    Stockage partagé Redis : un seul pipeline par synchronisation.
+    Les clés (`rl:<route>:<empreinte>:<période>:<fenêtre>`) ont une taille fixe
+    et expirent après deux périodes, le nombre de clés reste donc borné.
+    """
+    
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+    
+    async def add(self, increments: Dict[Tuple[str, int, int], int]) -> Dict[Tuple[str, int, int], int]:
+        pipe = self._client.pipeline(transaction=False)
+        for (key, period, window), count in increments.items():
+            redis_key = f"rl:{key}:{period}:{window}"
+            pipe.incrby(redis_key, count)
+            pipe.expire(redis_key, period * 2)
+        results = await pipe.execute()
+        return {
+            counter: int(results[2 * i])
+            for i, counter in enumerate(increments)
+        }
+    
+    async def close(self) -> None:
+        await self._client.aclose()
+
+class HybridRateLimiter:
+    """
+    Décide localement, sans aller-retour réseau par requête.
+    
+    Chaque clé a un seau à jetons en mémoire (capacité = limite, recharge
+    continue sur la période). Toutes les `sync_interval` secondes, les
+    admissions locales sont envoyées par lots au stockage partagé, qui
+    renvoie le total de la fenêtre courante toutes instances confondues.
+    Le seau est alors ramené au reste global de la fenêtre. Tant qu'une clé
+    n'a jamais été synchronisée, ou si d'autres instances la consomment
+    aussi, une instance n'admet pas plus de `tolerance × limite` requêtes
+    entre deux synchronisations : c'est le dépassement maximal toléré par
+    instance et par intervalle. Sans synchronisation démarrée, les seaux
+    locaux décident seuls.
+    """
+    
+    def __init__(self, store, sync_interval: float = RATE_LIMIT_SYNC_INTERVAL,
+                 tolerance: float = RATE_LIMIT_TOLERANCE, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.store = store
+        self.sync_interval = sync_interval
+        self.tolerance = tolerance
+        self.max_keys = max_keys
+        self._buckets: Dict[Tuple[str, int], _Bucket] = {}
+        self._task: Optional[asyncio.Task] = None
+        
+        # Statistiques
+        self.allowed = 0
+        self.rejected = 0
+        self.syncs = 0
+        self.sync_failures = 0
+        self.evictions = 0
+    
+    def hit(self, key: str, limit: int, period: int) -> Tuple[bool, float]:
+        """
+        Consomme un jeton pour la clé.
+        Retourne (admis, secondes avant le prochain jeton).
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get((key, period))
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict()
+            bucket = self._buckets[(key, period)] = _Bucket(limit, period, float(limit), now)
+        else:
+            rate = bucket.limit / bucket.period
+            bucket.tokens = min(bucket.limit, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+        
+        # Avant la première synchronisation, ou si d'autres instances consomment
+        # la même clé, seule la tolérance est admise entre deux synchronisations
+        if (
+            self._task is not None
+            and (not bucket.synced or bucket.shared)
+            and bucket.pending >= max(1, self.tolerance * bucket.limit)
+        ):
+            self.rejected += 1
+            return False, self.sync_interval
+        
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            self.allowed += 1
+            return True, 0.0
+        
+        self.rejected += 1
+        return False, (1 - bucket.tokens) * bucket.period / bucket.limit
+    
+    def _evict(self) -> None:
+        """Retire le seau créé le plus tôt (borne mémoire sous une rafale de nouvelles clés)"""
+        bucket_key = next(iter(self._buckets))
+        del self._buckets[bucket_key]
+        self.evictions += 1
+    
+    def check(self, key: str, rate: str) -> None:
+        """Lève RateLimitExceeded si la limite `rate` (ex: "10/minute") est atteinte"""
+        limit, period = parse_rate(rate)
+        allowed, retry_after = self.hit(key, limit, period)
+        if not allowed:
+            raise RateLimitExceeded(rate, retry_after)
+    
+    async def sync(self) -> None:
+        """Réconciliation par lots avec le stockage partagé"""
+        if not self._buckets:
+            return
+        
+        now = time.time()
+        increments = {}
+        for (key, period), bucket in list(self._buckets.items()):
+            window = int(now // period)
+            if window != bucket.window:
+                bucket.window = window
+                bucket.window_sent = 0
+            increments[(key, period, window)] = bucket.pending
+            bucket.window_sent += bucket.pending
+            bucket.pending = 0
+        
+        try:
+            totals = await self.store.add(increments)
+        except Exception as e:
+            # Remettre les admissions en attente pour la prochaine tentative
+            for (key, period, _), count in increments.items():
+                bucket = self._buckets.get((key, period))
+                if bucket is not None:
+                    bucket.pending += count
+                    bucket.window_sent -= count
+            self.sync_failures += 1
+            log_warning(f"Rate limiter sync failed: {e}")
+            return
+        
+        self.syncs += 1
+        monotonic_now = time.monotonic()
+        for (key, period, _), total in totals.items():
+            bucket = self._buckets.get((key, period))
+            if bucket is None:
+                continue
+            bucket.shared = total > bucket.window_sent
+            bucket.synced = True
+            
+            # Le seau ne peut pas dépasser le reste global de la fenêtre ; seule
+            # une instance qui consomme seule la clé garde la marge de tolérance
+            remaining = max(bucket.limit - total, 0)
+            if not bucket.shared:
+                remaining += self.tolerance * bucket.limit
+            bucket.tokens = min(bucket.tokens, remaining)
+            
+            # Un seau plein et inactif depuis une période entière n'apporte plus rien
+            if bucket.pending == 0 and monotonic_now - bucket.updated_at > bucket.period:
+                del self._buckets[(key, period)]
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+        await self.store.close()
+    
+    def get_stats(self) -> Dict[str, Union[int, float, str]]:
+        return {
+            "store": type(self.store).__name__,
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "evictions": self.evictions,
+            "max_keys": self.max_keys,
+            "sync_interval": self.sync_interval,
+            "tolerance": self.tolerance,
+        }
 
 def get_redis_url() -> Union[str, None]:
     """
     Récupère l'URL Redis selon l'environnement.
+    Sans REDIS_URL, le stockage partagé reste en mémoire (pas de Redis local implicite).
     """
     if mode == Mode.PROD:
         # En production, utiliser Redis externe si disponible
-        redis_url = db.secrets.get("REDIS_URL")
-        if redis_url:
-            return redis_url
-        # Fallback: Redis local en production
-        return "redis://localhost:6379/0"
+        return db.secrets.get("REDIS_URL") or None
     else:
         # En développement, utiliser le stockage en mémoire pour simplicité
         return None
 
-# Création du limiter principal
-try:
-    redis_url = get_redis_url()
+def create_limiter_store():
+    """Redis si configuré et joignable en client, sinon stockage en mémoire"""
+    try:
+        redis_url = get_redis_url()
+    except Exception:
+        redis_url = None
+    
     if redis_url:
-        limiter = Limiter(
-            key_func=get_rate_limiter_key_func,
-            storage_uri=redis_url,
-            default_limits=["1000/minute"]  # Limite globale de sécurité
-        )
-        print(sanitize_log(f"Rate limiter initialized with Redis backend"))
+        try:
+            store = RedisLimiterStore(redis_url)
+            log_info("Rate limiter initialized with Redis reconciliation")
+            return store
+        except Exception:
+            log_warning("Rate limiter fallback to memory store due to Redis client issue")
+    elif mode == Mode.PROD:
+        log_warning("REDIS_URL not set: rate limits are enforced per instance only")
     else:
-        # Fallback: stockage en mémoire pour développement
-        limiter = Limiter(
-            key_func=get_rate_limiter_key_func,
-            default_limits=["1000/minute"]
-        )
-        print(sanitize_log(f"Rate limiter initialized with memory backend (dev mode)"))
-except Exception as e:
-    # Fallback de sécurité: stockage en mémoire
-    limiter = Limiter(
-        key_func=get_rate_limiter_key_func,
-        default_limits=["1000/minute"]
-    )
-    print(sanitize_log(f"Rate limiter fallback to memory backend due to Redis connection issue"))
+        log_info("Rate limiter initialized with memory store (dev mode)")
+    return MemoryLimiterStore()
+
+# Création du limiter principal
+limiter = HybridRateLimiter(create_limiter_store())
 
-def custom_rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+def start_rate_limiter() -> None:
+    """Démarre la réconciliation périodique (au démarrage de l'application)"""
+    limiter.start()
+
+async def stop_rate_limiter() -> None:
+    """Dernière réconciliation puis fermeture du stockage (arrêt de l'application)"""
+    await limiter.stop()
+
+def rate_limit_exceeded_response(path: str, rate: str, retry_after: float) -> JSONResponse:
     """
-    Gestionnaire personnalisé pour les erreurs de rate limiting.
-    Retourne une réponse HTTP 429 avec message informatif.
+    Réponse HTTP 429 avec message informatif.
     """
     # Log de l'incident (sanitisé)
-    client_ip = get_remote_address(request)
-    print(sanitize_log(f"Rate limit exceeded for client from endpoint {request.url.path}"))
+    log_warning(f"Rate limit exceeded for client from endpoint {path}")
     
+    retry_after = max(int(retry_after + 0.999), 1)
     # Message utilisateur clair
-    response = {
-        "detail": f"Trop de requêtes. Limite: {exc.detail}. Veuillez patienter avant de réessayer.",
-        "error_code": "RATE_LIMIT_EXCEEDED",
-        "retry_after": 60  # Suggérer d'attendre 60 secondes
-    }
-    
-    raise HTTPException(
+    return JSONResponse(
         status_code=429,
-        detail=response["detail"],
-        headers={"Retry-After": "60"}
+        content={
+            "detail": f"Trop de requêtes. Limite: {rate}. Veuillez patienter avant de réessayer.",
+            "error_code": "RATE_LIMIT_EXCEEDED",
+            "retry_after": retry_after
+        },
+        headers={"Retry-After": str(retry_after)}
     )
 
-# Décorateurs de convenance pour les différents types d'endpoints
-def rate_limit_admin(func: Callable) -> Callable:
-    """Décorateur pour endpoints admin - limites élevées"""
-    return limiter.limit(RATE_LIMITS["admin"])(func)
-
-def rate_limit_admin_strict(func: Callable) -> Callable:
-    """Décorateur pour endpoints admin critiques - limites strictes"""
-    return limiter.limit(RATE_LIMITS["admin_strict"])(func)
-
-def rate_limit_auth(func: Callable) -> Callable:
-    """Décorateur pour endpoints d'authentification"""
-    return limiter.limit(RATE_LIMITS["auth"])(func)
-
-def rate_limit_auth_strict(func: Callable) -> Callable:
-    """Décorateur pour login/signup - protection bruteforce"""
-    return limiter.limit(RATE_LIMITS["auth_strict"])(func)
-
-def rate_limit_leads_submit(func: Callable) -> Callable:
-    """Décorateur pour soumission de leads - anti-spam"""
-    return limiter.limit(RATE_LIMITS["leads_submit"])(func)
-
-def rate_limit_messaging(func: Callable) -> Callable:
-    """Décorateur pour endpoints de messaging"""
-    return limiter.limit(RATE_LIMITS["messaging"])(func)
-
-def rate_limit_public(func: Callable) -> Callable:
-    """Décorateur pour endpoints publics standard"""
-    return limiter.limit(RATE_LIMITS["public"])(func)
-
-def rate_limit_payment(func: Callable) -> Callable:
-    """Décorateur pour endpoints de paiement/commissions"""
-    return limiter.limit(RATE_LIMITS["payment"])(func)
-
-def rate_limit_contracts(func: Callable) -> Callable:
-    """Décorateur pour endpoints de contrats"""
-    return limiter.limit(RATE_LIMITS["contracts"])(func)
-
 # Export des objets principaux
 __all__ = [
     "limiter",
-    "custom_rate_limit_exceeded_handler",
-    "rate_limit_admin",
-    "rate_limit_admin_strict", 
-    "rate_limit_auth",
-    "rate_limit_auth_strict",
-    "rate_limit_leads_submit",
-    "rate_limit_messaging",
-    "rate_limit_public",
-    "rate_limit_payment",
-    "rate_limit_contracts",
-    "RATE_LIMITS"
+    "HybridRateLimiter",
+    "MemoryLimiterStore",
+    "RedisLimiterStore",
+    "RateLimitExceeded",
+    "RouteLimit",
+    "parse_rate",
+    "compile_route_limits",
+    "rate_limit_exceeded_response",
+    "start_rate_limiter",
+    "stop_rate_limiter",
+    "get_client_ip",
+    "get_client_key",
+    "get_rate_limiter_key_func",
+    "SUBJECT_STATE_KEY",
+    "RATE_LIMITS",
+    "ROUTE_RATE_LIMITS"
 ]
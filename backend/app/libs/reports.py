@@ -0,0 +1,137 @@
+"""
+Requêtes des rapports admin par utilisateur.
+
+Chaque table enfant (leads, commissions, paiements, contrats) est agrégée
+par utilisateur dans sa propre CTE avant la jointure avec user_profiles.
+Joindre directement les tables enfants produit leur produit cartésien par
+utilisateur (50 leads × 50 commissions × 10 paiements = 25 000 lignes) et
+multiplie les sommes d'autant. Ici, chaque CTE lit sa table une seule fois
+et la jointure finale a exactement une ligne par utilisateur.
+
+Usage:
+
+    from app.libs.reports import USERS_WITH_STATS_SQL, users_with_stats_sql
+
+    # Tous les utilisateurs
+    rows = await conn.fetch(USERS_WITH_STATS_SQL)
+
+    # Une page : les agrégats ne portent que sur les utilisateurs de la page
+    sql, params = page.query("SELECT * FROM user_profiles up", conditions, params)
+    rows = await conn.fetch(users_with_stats_sql(sql, page.order_by), *params)
+
+benchmarks/reports.py vérifie les sommes et la montée en charge sur des
+tables temporaires.
+"""
+
+# Agrégats par utilisateur, une CTE par table enfant
+_LEAD_STATS = """
+    lead_stats AS (
+        SELECT user_id, COUNT(*) AS total_leads, MAX(updated_at) AS last_lead_update
+        FROM leads
+        WHERE user_id IN (SELECT user_id FROM users)
+        GROUP BY user_id
+    )"""
+
+_COMMISSION_STATS = """
+    commission_stats AS (
+        SELECT
+            user_id,
+            COUNT(*) AS total_commissions,
+            SUM(amount) FILTER (WHERE status = 'pending') AS pending_commissions,
+            SUM(amount) FILTER (WHERE status = 'paid') AS paid_commissions,
+            MAX(updated_at) AS last_commission_update
+        FROM commissions
+        WHERE user_id IN (SELECT user_id FROM users)
+        GROUP BY user_id
+    )"""
+
+_PAYMENT_STATS = """
+    payment_stats AS (
+        SELECT user_id, COUNT(*) AS total_payments, MAX(requested_at) AS last_payment_request
+        FROM payments
+        WHERE user_id IN (SELECT user_id FROM users)
+        GROUP BY user_id
+    )"""
+
+_CONTRACT_STATS = """
+    contract_stats AS (
+        SELECT user_id, COUNT(*) AS total_contracts
+        FROM contracts
+        WHERE user_id IN (SELECT user_id FROM users)
+        GROUP BY user_id
+    )"""
+
+# Utilisateurs du rapport : tous par défaut, ou une page (voir app.libs.pagination)
+ALL_USERS_RELATION = "SELECT * FROM user_profiles"
+DEFAULT_ORDER = "up.created_at DESC"
+
+def users_with_stats_sql(users: str = ALL_USERS_RELATION, order_by: str = DEFAULT_ORDER) -> str:
+    """GET /api/admin/users-with-stats"""
+    return f"""
+    WITH users AS ({users}),{_LEAD_STATS},{_COMMISSION_STATS},{_PAYMENT_STATS}
+    SELECT
+        up.user_id::text,
+        up.full_name,
+        up.user_type,
+        up.email,
+        up.phone,
+        up.city,
+        up.created_at,
+        COALESCE(ls.total_leads, 0) AS total_leads,
+        COALESCE(cs.pending_commissions, 0) AS pending_commissions,
+        COALESCE(cs.paid_commissions, 0) AS paid_commissions,
+        GREATEST(ls.last_lead_update, cs.last_commission_update, ps.last_payment_request) AS last_activity
+    FROM users up
+    LEFT JOIN lead_stats ls ON ls.user_id = up.user_id
+    LEFT JOIN commission_stats cs ON cs.user_id = up.user_id
+    LEFT JOIN payment_stats ps ON ps.user_id = up.user_id
+    ORDER BY {order_by}
+"""
+
+def all_users_sql(users: str = ALL_USERS_RELATION, order_by: str = DEFAULT_ORDER) -> str:
+    """GET /api/admin/all-users (total_commissions = commissions en attente)"""
+    return f"""
+    WITH users AS ({users}),{_LEAD_STATS},{_COMMISSION_STATS}
+    SELECT
+        up.*,
+        COALESCE(ls.total_leads, 0) AS total_leads,
+        COALESCE(cs.pending_commissions, 0) AS total_commissions
+    FROM users up
+    LEFT JOIN lead_stats ls ON ls.user_id = up.user_id
+    LEFT JOIN commission_stats cs ON cs.user_id = up.user_id
+    ORDER BY {order_by}
+"""
+
+def user_activity_counts_sql(users: str = ALL_USERS_RELATION, order_by: str = DEFAULT_ORDER) -> str:
+    """DatabaseMaintenance.list_all_users"""
+    return f"""
+    WITH users AS ({users}),{_LEAD_STATS},{_COMMISSION_STATS},{_PAYMENT_STATS},{_CONTRACT_STATS}
+    SELECT
+        up.user_id,
+        up.full_name,
+        up.user_type,
+        up.created_at,
+        COALESCE(ls.total_leads, 0) AS total_leads,
+        COALESCE(cs.total_commissions, 0) AS total_commissions,
+        COALESCE(ps.total_payments, 0) AS total_payments,
+        COALESCE(ct.total_contracts, 0) AS total_contracts
+    FROM users up
+    LEFT JOIN lead_stats ls ON ls.user_id = up.user_id
+    LEFT JOIN commission_stats cs ON cs.user_id = up.user_id
+    LEFT JOIN payment_stats ps ON ps.user_id = up.user_id
+    LEFT JOIN contract_stats ct ON ct.user_id = up.user_id
+    ORDER BY {order_by}
+"""
+
+USERS_WITH_STATS_SQL = users_with_stats_sql()
+ALL_USERS_SQL = all_users_sql()
+USER_ACTIVITY_COUNTS_SQL = user_activity_counts_sql()
+
+__all__ = [
+    "users_with_stats_sql",
+    "all_users_sql",
+    "user_activity_counts_sql",
+    "USERS_WITH_STATS_SQL",
+    "ALL_USERS_SQL",
+    "USER_ACTIVITY_COUNTS_SQL",
+]
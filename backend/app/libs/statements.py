@@ -0,0 +1,127 @@
+"""
+Registre central des requêtes SQL fréquentes de l'application.
+
+Chaque requête "chaude" est nommée ici une seule fois. Un hook d'init du pool
+la prépare sur chaque connexion dès son ouverture, ce qui évite l'analyse et
+la planification à chaque appel. Les routers utilisent les helpers typés
+ci-dessous plutôt que de renvoyer le texte SQL.
+
+Usage:
+
+    from app.libs.database_pool import get_db_connection
+    from app.libs.statements import fetch_pending_commission_balance
+
+    async with get_db_connection() as conn:
+        balance = await fetch_pending_commission_balance(conn, user_uuid)
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import asyncpg
+from app.libs.database_pool import db_pool
+
+# Requêtes nommées (nom -> SQL)
+STATEMENTS: Dict[str, str] = {
+    # Solde des commissions en attente (commissions, dashboard, admin)
+    "pending_commission_balance": (
+        "SELECT COALESCE(SUM(amount), 0) FROM commissions "
+        "WHERE user_id = $1 AND status = 'pending'"
+    ),
+    # Profil complet (dashboard, vérification du profil)
+    "user_profile": "SELECT * FROM user_profiles WHERE user_id = $1",
+    # Type d'utilisateur (soumission de leads)
+    "user_type": "SELECT user_type FROM user_profiles WHERE user_id = $1",
+    # Répartition des leads par statut (dashboard)
+    "lead_status_counts": (
+        "SELECT status, COUNT(*) AS count FROM leads "
+        "WHERE user_id = $1 GROUP BY status"
+    ),
+    # Leads d'un utilisateur avec le statut de leur commission (liste des leads)
+    "user_leads_with_commission_status": (
+        "SELECT l.*, c.status AS commission_status FROM leads l "
+        "LEFT JOIN commissions c ON l.id = c.lead_id "
+        "WHERE l.user_id = $1 ORDER BY l.created_at DESC"
+    ),
+    # Derniers leads d'un utilisateur (dashboard)
+    "recent_leads": (
+        "SELECT * FROM leads WHERE user_id = $1 "
+        "ORDER BY created_at DESC LIMIT $2"
+    ),
+}
+
+# Erreurs indiquant qu'une requête préparée est devenue obsolète (changement de schéma)
+_STALE_STATEMENT_ERRORS = (
+    asyncpg.exceptions.InvalidCachedStatementError,
+    asyncpg.exceptions.OutdatedSchemaCacheError,
+)
+
+async def prepare_statements(connection: asyncpg.Connection) -> None:
+    """Hook d'init du pool : prépare toutes les requêtes du registre"""
+    prepared = getattr(connection, "prepared_statements", None)
+    if prepared is None:
+        return
+
+    for name, sql in STATEMENTS.items():
+        prepared[name] = await connection.prepare(sql)
+
+async def _run(conn, name: str, method: str, *args: Any) -> Any:
+    """
+    Exécute une requête du registre via sa version préparée sur la connexion.
+    Si la connexion ne l'a pas (connexion hors pool), le SQL est envoyé tel quel.
+    """
+    prepared = getattr(conn, "prepared_statements", None)
+    if prepared is None:
+        return await getattr(conn, method)(STATEMENTS[name], *args)
+
+    statement = prepared.get(name)
+    if statement is None:
+        statement = prepared[name] = await conn.prepare(STATEMENTS[name])
+
+    try:
+        return await getattr(statement, method)(*args)
+    except _STALE_STATEMENT_ERRORS:
+        # Le schéma a changé : préparer à nouveau et réessayer une fois
+        statement = prepared[name] = await conn.prepare(STATEMENTS[name])
+        return await getattr(statement, method)(*args)
+
+# Helpers typés
+
+async def fetch_pending_commission_balance(conn, user_id: UUID | str) -> float:
+    """Somme des commissions en attente d'un utilisateur"""
+    balance = await _run(conn, "pending_commission_balance", "fetchval", user_id)
+    return float(balance or 0)
+
+async def fetch_user_profile(conn, user_id: UUID | str) -> Optional[asyncpg.Record]:
+    """Profil complet d'un utilisateur, ou None"""
+    return await _run(conn, "user_profile", "fetchrow", user_id)
+
+async def fetch_user_type(conn, user_id: UUID | str) -> Optional[str]:
+    """Type d'utilisateur ('particulier' / 'professionnel'), ou None sans profil"""
+    return await _run(conn, "user_type", "fetchval", user_id)
+
+async def fetch_lead_status_counts(conn, user_id: UUID | str) -> Dict[str, int]:
+    """Nombre de leads par statut pour un utilisateur"""
+    rows = await _run(conn, "lead_status_counts", "fetch", user_id)
+    return {row["status"]: row["count"] for row in rows}
+
+async def fetch_user_leads_with_commission_status(conn, user_id: UUID | str) -> List[asyncpg.Record]:
+    """Tous les leads d'un utilisateur avec le statut de leur commission, du plus récent au plus ancien"""
+    return await _run(conn, "user_leads_with_commission_status", "fetch", user_id)
+
+async def fetch_recent_leads(conn, user_id: UUID | str, limit: int = 5) -> List[asyncpg.Record]:
+    """Derniers leads d'un utilisateur, du plus récent au plus ancien"""
+    return await _run(conn, "recent_leads", "fetch", user_id, limit)
+
+# Préparation automatique sur chaque connexion du pool
+db_pool.add_init_hook(prepare_statements)
+
+__all__ = [
+    "STATEMENTS",
+    "prepare_statements",
+    "fetch_pending_commission_balance",
+    "fetch_user_profile",
+    "fetch_user_type",
+    "fetch_lead_status_counts",
+    "fetch_user_leads_with_commission_status",
+    "fetch_recent_leads",
+]
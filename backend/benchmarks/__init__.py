@@ -0,0 +1,7 @@
+"""
+Micro-benchmarks du backend.
+
+Chaque module s'exécute depuis le dossier backend :
+
+    python -m benchmarks.log_sanitizer
+"""
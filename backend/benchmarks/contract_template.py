@@ -0,0 +1,99 @@
+"""
+Micro-benchmark de la génération et de la signature des contrats.
+
+Compare le rendu compilé (segments + une jointure) à l'ancien rendu (cinq
+str.replace sur tout le template), et la signature par positions stockées
+à l'ancienne recherche des marqueurs. Vérifie d'abord que les deux
+produisent le même HTML quand les valeurs n'ont rien à échapper. Affiche
+enfin la taille stockée par contrat, HTML complet ou champs seuls.
+
+    python -m benchmarks.contract_template [--iterations 20000]
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+from typing import Callable
+
+from app.libs.contract_template import (
+    CONTRAT_TEMPLATE, CONTRACT_TEMPLATE, SIGNATURE_FIELDS, SIGNATURE_PLACEHOLDERS, fill_slots, french_date
+)
+
+VALUES = {
+    "company_name": "Solaire Pro SARL",
+    "siret_number": "12345678901234",
+    "signature_date": french_date(date(2025, 7, 11)),
+}
+SIGNATURE_VALUES = ["11/07/2025 à 14:32:05", "203.0.113.42"]
+EXPECTED_MARKERS = [SIGNATURE_PLACEHOLDERS[name] for name in SIGNATURE_FIELDS]
+
+
+def legacy_generate() -> str:
+    """Ancien rendu de generate-contract, pour comparaison"""
+    contract_html = CONTRAT_TEMPLATE
+    contract_html = contract_html.replace("{company_name}", VALUES["company_name"])
+    contract_html = contract_html.replace("{siret_number}", VALUES["siret_number"])
+    contract_html = contract_html.replace("{signature_date}", VALUES["signature_date"])
+    contract_html = contract_html.replace("{signature_datetime}", "[SIGNATURE_DATETIME_PLACEHOLDER]")
+    contract_html = contract_html.replace("{signature_ip}", "[SIGNATURE_IP_PLACEHOLDER]")
+    return contract_html
+
+
+def compiled_generate() -> str:
+    html, _ = CONTRACT_TEMPLATE.render_with_slots({**VALUES, **SIGNATURE_PLACEHOLDERS}, SIGNATURE_FIELDS)
+    return html
+
+
+def legacy_sign(html: str) -> str:
+    """Ancien remplissage de sign-contract, pour comparaison"""
+    return html.replace(
+        "[SIGNATURE_DATETIME_PLACEHOLDER]", SIGNATURE_VALUES[0]
+    ).replace("[SIGNATURE_IP_PLACEHOLDER]", SIGNATURE_VALUES[1], 1)
+
+
+def measure(label: str, operation: Callable[[], object], iterations: int, repeat: int = 5) -> float:
+    """Meilleur temps moyen par opération sur `repeat` séries, en µs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    per_call_us = best / iterations * 1e6
+    print(f"  {label:<10} {per_call_us:8.2f} µs  ({1e6 / per_call_us:,.0f}/s)")
+    return per_call_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    html, slots = CONTRACT_TEMPLATE.render_with_slots({**VALUES, **SIGNATURE_PLACEHOLDERS}, SIGNATURE_FIELDS)
+    signed = fill_slots(html, slots, SIGNATURE_VALUES, expected=EXPECTED_MARKERS)
+    print(f"Génération identique : {html == legacy_generate()}")
+    print(f"Signature identique  : {signed == legacy_sign(legacy_generate())}")
+    print(f"Template : {len(CONTRAT_TEMPLATE)} caractères, {len(CONTRACT_TEMPLATE.fields)} champs, positions {slots}")
+
+    print("Génération")
+    legacy = measure("ancienne", legacy_generate, args.iterations)
+    current = measure("compilée", compiled_generate, args.iterations)
+    print(f"  gain       x{legacy / current:.2f}")
+
+    print("Signature")
+    legacy = measure("ancienne", lambda: legacy_sign(html), args.iterations)
+    current = measure("positions", lambda: fill_slots(html, slots, SIGNATURE_VALUES, expected=EXPECTED_MARKERS),
+                      args.iterations)
+    print(f"  gain       x{legacy / current:.2f}")
+
+    # Stockage par contenu (app.libs.contract_store) : champs au lieu du HTML
+    signed_fields = {**VALUES, **dict(zip(SIGNATURE_FIELDS, SIGNATURE_VALUES))}
+    stored = len(json.dumps(signed_fields, ensure_ascii=False).encode()) + 2 * 64
+    print("Stockage par contrat")
+    print(f"  HTML       {len(signed.encode()):8d} octets")
+    print(f"  champs     {stored:8d} octets (dont deux empreintes SHA-256)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Benchmark de la recherche admin des leads (GET /routes/api/admin/leads/search).
+
+Charge un jeu synthétique (1M de leads par défaut) dans des tables
+TEMPORAIRES qui masquent les vraies tables le temps de la session, y crée
+les index des migrations 002, 003 et 007 (lus dans les fichiers de migration),
+puis exécute les requêtes de l'endpoint, construites par app.libs.lead_search
+et app.libs.pagination, pour des recherches typiques :
+
+- EXPLAIN (ANALYZE, BUFFERS) de la page : temps d'exécution, index utilisés,
+  et absence de parcours séquentiel de leads ;
+- temps mesuré côté client de la page et de l'estimation du total, comme
+  dans l'endpoint.
+
+Chaque recherche doit rester sous --target-ms (50 ms) ; le script échoue sinon.
+
+    python -m benchmarks.lead_search --dsn postgresql://... [--leads 1000000] [--explain]
+
+La DSN par défaut est lue dans DATABASE_URL.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import asyncpg
+
+from app.libs.lead_search import LEAD_SEARCH_SQL, LEADS_KEYSET, lead_search_filters
+from app.libs.pagination import KeysetPage, estimate_total
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+INDEX_MIGRATIONS = (
+    "002_keyset_pagination_indexes.sql", "003_lead_search_indexes.sql", "007_leads_updated_at_fallback_index.sql"
+)
+
+# Tables temporaires : même nom que les tables réelles, qu'elles masquent
+# pour cette session uniquement (pg_temp passe en premier dans le search_path)
+TEMP_TABLES_SQL = """
+    CREATE TEMP TABLE user_profiles (
+        user_id uuid PRIMARY KEY,
+        full_name text NOT NULL,
+        user_type text NOT NULL,
+        created_at timestamptz NOT NULL
+    );
+    CREATE TEMP TABLE leads (
+        id serial PRIMARY KEY,
+        user_id uuid NOT NULL,
+        prospect_name text NOT NULL,
+        prospect_phone text,
+        prospect_email text,
+        prospect_city text,
+        status text NOT NULL,
+        created_at timestamptz NOT NULL,
+        updated_at timestamptz
+    );
+"""
+
+# Données générées côté serveur : apporteurs, puis leads répartis sur trois
+# ans, 20 villes, 4 statuts, noms et emails tirés de listes courtes
+LOAD_USERS_SQL = """
+    INSERT INTO pg_temp.user_profiles (user_id, full_name, user_type, created_at)
+    SELECT md5('user' || n)::uuid, 'Apporteur ' || n,
+           CASE WHEN n % 3 = 0 THEN 'professionnel' ELSE 'particulier' END,
+           now() - interval '4 years' + n * interval '1 hour'
+    FROM generate_series(1, $1::int) AS n
+"""
+LOAD_LEADS_SQL = """
+    INSERT INTO pg_temp.leads (user_id, prospect_name, prospect_phone, prospect_email, prospect_city,
+                               status, created_at, updated_at)
+    SELECT
+        md5('user' || (1 + n % $1::int))::uuid,
+        (ARRAY['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand',
+               'Leroy', 'Moreau', 'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'Dupont'])[1 + n % 16]
+            || ' ' || (ARRAY['Jean', 'Marie', 'Pierre', 'Sophie', 'Luc', 'Claire', 'Paul', 'Julie'])[1 + n / 16 % 8]
+            || ' ' || n,
+        '06' || lpad((n * 7919 % 100000000)::text, 8, '0'),
+        'prospect' || n || '@' || (ARRAY['gmail.com', 'orange.fr', 'free.fr', 'yahoo.fr'])[1 + n % 4],
+        (ARRAY['Toulon', 'Marseille', 'Nice', 'Hyères', 'Fréjus', 'Aix-en-Provence', 'Cannes', 'Antibes',
+               'Avignon', 'Nîmes', 'Montpellier', 'Draguignan', 'Brignoles', 'La Seyne-sur-Mer',
+               'Six-Fours-les-Plages', 'Saint-Raphaël', 'Grasse', 'Arles', 'Aubagne', 'Istres'])[1 + n % 20],
+        (ARRAY['soumis', 'soumis', 'soumis', 'visité', 'visité', 'signé', 'installé'])[1 + n % 7],
+        now() - interval '3 years' * random(),
+        NULL
+    FROM generate_series(1, $2::int) AS n
+"""
+# Un lead sur cinq n'a jamais été modifié (updated_at NULL)
+LOAD_UPDATES_SQL = """
+    UPDATE pg_temp.leads SET updated_at = created_at + interval '30 days' * random() WHERE id % 5 <> 0
+"""
+
+# Recherches typiques de l'interface admin : (nom, filtres de lead_search_filters, tri)
+SEARCHES: List[Tuple[str, Dict[str, Any], str]] = [
+    ("aucun filtre", {}, "created_at"),
+    ("texte fréquent", {"q": "dupont"}, "created_at"),
+    ("texte rare (email)", {"q": "prospect123457@"}, "created_at"),
+    ("texte (téléphone)", {"q": "0612"}, "created_at"),
+    ("statut", {"statuses": ["signé"]}, "created_at"),
+    ("statuts multiples", {"statuses": ["visité", "signé"]}, "created_at"),
+    ("ville", {"city": "hyères"}, "created_at"),
+    ("apporteur", {"user_id": "__user__"}, "created_at"),
+    ("plage de dates", {"created_from": date(2024, 1, 1), "created_to": date(2024, 1, 31)}, "created_at"),
+    ("texte + statut", {"q": "martin", "statuses": ["soumis"]}, "created_at"),
+    ("statut + ville", {"statuses": ["installé"], "city": "Toulon"}, "created_at"),
+    ("tri par mise à jour", {}, "updated_at"),
+]
+
+
+# Seules ces tables sont masquées : les index des autres tables de la migration
+# 002 (paiements, contrats) seraient créés sur les vraies tables
+TEMP_TABLES = ("leads", "user_profiles")
+INDEXED_TABLE_PATTERN = re.compile(r"\bON\s+(\w+)\b", re.IGNORECASE)
+
+
+def index_statements() -> List[str]:
+    """CREATE INDEX des migrations de INDEX_MIGRATIONS sur les tables temporaires, sans CONCURRENTLY"""
+    statements = []
+    for name in INDEX_MIGRATIONS:
+        script = (MIGRATIONS_DIR / name).read_text(encoding="utf-8")
+        for statement in re.split(r";[ \t]*(?:\n|$)", script):
+            statement = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--"))
+            match = INDEXED_TABLE_PATTERN.search(statement)
+            if not statement.strip().upper().startswith("CREATE INDEX") or match is None:
+                continue
+            if match.group(1) in TEMP_TABLES:
+                statement = statement[:match.start(1)] + "pg_temp." + statement[match.start(1):]
+                statements.append(statement.replace(" CONCURRENTLY", ""))
+    return statements
+
+
+def plan_nodes(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+async def explain(conn: asyncpg.Connection, sql: str, params: List[Any]) -> Tuple[float, List[str], bool, str]:
+    """Temps d'exécution (ms), index utilisés, parcours séquentiel de leads, plan texte"""
+    plan = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *params)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = plan_nodes(plan[0]["Plan"])
+    indexes = sorted({node["Index Name"] for node in nodes if "Index Name" in node})
+    seq_scan = any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "leads" for node in nodes)
+    text = "\n".join(row[0] for row in await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *params))
+    return plan[0]["Execution Time"], indexes, seq_scan, text
+
+
+async def measure(conn: asyncpg.Connection, page: KeysetPage, conditions: List[str], params: List[Any],
+                  repeat: int) -> Tuple[float, List[asyncpg.Record]]:
+    """Meilleur temps de la page et de l'estimation du total sur `repeat` exécutions, en ms"""
+    sql, page_params = page.query(LEAD_SEARCH_SQL, conditions, params)
+    best = float("inf")
+    rows: List[asyncpg.Record] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = await conn.fetch(sql, *page_params)
+        await estimate_total(conn, LEADS_KEYSET, conditions, params)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(args.dsn, command_timeout=None)
+    try:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        await conn.execute(TEMP_TABLES_SQL)
+        start = time.perf_counter()
+        await conn.execute(LOAD_USERS_SQL, args.users)
+        await conn.execute(LOAD_LEADS_SQL, args.users, args.leads)
+        await conn.execute(LOAD_UPDATES_SQL)
+        for statement in index_statements():
+            await conn.execute(statement)
+        # Pas d'autovacuum sur les tables temporaires
+        await conn.execute("ANALYZE pg_temp.user_profiles, pg_temp.leads")
+        print(f"{args.leads} leads, {args.users} apporteurs chargés et indexés en {time.perf_counter() - start:.0f} s")
+
+        user_id = str(await conn.fetchval("SELECT user_id FROM pg_temp.leads ORDER BY id LIMIT 1"))
+        failures = 0
+        for name, filters, sort in SEARCHES:
+            filters = {key: user_id if value == "__user__" else value for key, value in filters.items()}
+            conditions, params, cursor_filters = lead_search_filters(**filters)
+
+            first = KeysetPage(LEADS_KEYSET, limit=args.limit, sort=sort, filters=cursor_filters)
+            first_ms, rows = await measure(conn, first, conditions, params, args.repeat)
+            pages = [("page 1", first, first_ms)]
+
+            # Page suivante par curseur : même coût que la première
+            next_cursor = first.envelope(rows, 0)["next_cursor"]
+            if next_cursor:
+                second = KeysetPage(LEADS_KEYSET, limit=args.limit, sort=sort, cursor=next_cursor,
+                                    filters=cursor_filters)
+                second_ms, _ = await measure(conn, second, conditions, params, args.repeat)
+                pages.append(("page 2", second, second_ms))
+
+            for label, page, elapsed in pages:
+                sql, page_params = page.query(LEAD_SEARCH_SQL, conditions, params)
+                execution_ms, indexes, seq_scan, plan = await explain(conn, sql, page_params)
+                ok = elapsed <= args.target_ms and not seq_scan
+                failures += not ok
+                print(f"  {name:<22} {label}  {elapsed:7.1f} ms (exécution {execution_ms:6.1f} ms)  "
+                      f"{'OK ' if ok else 'KO '} {', '.join(indexes) or '-'}"
+                      f"{'  PARCOURS SÉQUENTIEL' if seq_scan else ''}")
+                if args.explain or not ok:
+                    print("\n".join("      " + line for line in plan.splitlines()))
+
+        if failures:
+            raise SystemExit(f"{failures} recherche(s) au-dessus de {args.target_ms:.0f} ms ou sans index")
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=50.0)
+    parser.add_argument("--explain", action="store_true", help="affiche le plan de chaque recherche")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn ou DATABASE_URL requis")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Micro-benchmark de LogSanitizer.sanitize_message.
+
+Compare l'implémentation actuelle (chemin rapide, puis passe unique) à
+l'ancienne (quatre passes findall + str.replace) sur des lignes de log
+réalistes, vérifie que les deux produisent exactement la même sortie, puis
+mesure le débit et affiche les statistiques du sanitiseur.
+
+    python -m benchmarks.log_sanitizer [--iterations 2000]
+"""
+
+import argparse
+import random
+import string
+import time
+from typing import Callable, List
+
+from app.libs.log_sanitizer import LogSanitizer
+
+# Lignes typiques des logs de production
+SAMPLE_LINES: List[str] = [
+    "Error getting user profile: connection was closed in the middle of operation",
+    "asyncpg.exceptions.UniqueViolationError: duplicate key value violates unique constraint "
+    "\"user_profiles_user_id_key\" DETAIL: Key (user_id)=(cbbf092f-ba18-4d12-b104-f741df35dedb) already exists.",
+    "asyncpg.exceptions.ForeignKeyViolationError: insert or update on table \"leads\" violates foreign key "
+    "constraint \"leads_user_id_fkey\" DETAIL: Key (user_id)=(8d3f1a2b-4c5d-4e6f-8a9b-0c1d2e3f4a5b) is not present",
+    "Lead submitted by jean.dupont@example.com for client marie.martin@gmail.com (+33612345678)",
+    "Rate limit exceeded for user 3f2a9c1e-7b4d-4a8e-9f01-23456789abcd on /routes/submit-lead",
+    "Traceback (most recent call last):\n"
+    "  File \"/app/.venv/lib/python3.11/site-packages/starlette/middleware/errors.py\", line 164, in __call__\n"
+    "    await self.app(scope, receive, _send)\n"
+    "  File \"/app/backend/app/apis/leads/__init__.py\", line 88, in submit_lead\n"
+    "    user_type = await fetch_user_type(conn, user_uuid)\n"
+    "asyncpg.exceptions.TooManyConnectionsError: sorry, too many clients already",
+    "Auth header Bearer eyJhbGciOiJSUzI1NiIsImtpZCI6IjFlOTczZWUwZTE2ZjdlZWY0ZjkyMWQ1MGRjNjFkNzBiMmVmZWZjMTkiLCJ0eXAiOiJKV1QifQ rejected",
+    "Commission payment requested: 1250.00 EUR by contact@solaire-pro.fr, IBAN FR7630006000011234567890189",
+    "Profile updated for user 0f8fad5b-d9cb-469f-a165-70867728950e",
+    "Dashboard loaded",
+]
+
+# Messages constants, sans rien à masquer (chemin rapide)
+CONSTANT_LINES: List[str] = [
+    "Dashboard loaded",
+    "Error fetching dashboard data",
+    "Commission payment request created",
+    "Profile completion checked",
+    "Error getting leads: connection was closed in the middle of operation",
+]
+
+# Ligne volumineuse (import en masse) : beaucoup de valeurs à masquer, le cas
+# quadratique de l'ancienne implémentation
+BULK_LINE = "Bulk import failed for: " + ", ".join(
+    f"user{i}@example.com (0f8fad5b-d9cb-469f-a165-7086772{i:05d}) +3361234{i:04d}"
+    for i in range(300)
+)
+
+
+def legacy_sanitize_message(message: str) -> str:
+    """Ancienne implémentation (quatre passes findall + str.replace), pour comparaison"""
+    sanitized = message
+
+    for email in LogSanitizer.EMAIL_PATTERN.findall(sanitized):
+        sanitized = sanitized.replace(email, LogSanitizer.mask_email(email))
+
+    for uuid_str in LogSanitizer.UUID_PATTERN.findall(sanitized):
+        sanitized = sanitized.replace(uuid_str, LogSanitizer.mask_uuid(uuid_str))
+
+    for phone in LogSanitizer.PHONE_PATTERN.findall(sanitized):
+        if len(phone) >= 8:
+            sanitized = sanitized.replace(phone, LogSanitizer.mask_phone(phone))
+
+    for token in LogSanitizer.TOKEN_PATTERN.findall(sanitized):
+        if len(token) >= 20:
+            sanitized = sanitized.replace(token, LogSanitizer.mask_token(token))
+
+    return LogSanitizer.sanitize_stack_trace(sanitized)
+
+
+def random_lines(count: int, seed: int = 42) -> List[str]:
+    """
+    Lignes aléatoires mêlant fragments sensibles et bruit, pour la vérification.
+    Les fragments sont séparés comme dans un vrai log (espaces, ponctuation).
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + " .-_@+:/\n()\"'="
+    fragments = [
+        lambda: rng.choice(SAMPLE_LINES),
+        lambda: f"{rng.choice(['jean', 'a.b', 'x_y', 'contact'])}@{rng.choice(['ex.com', 'gmail.fr', 'a.bc'])}",
+        lambda: str(rng.randrange(10**7, 10**18)),
+        lambda: "+33" + str(rng.randrange(10**8, 10**9)),
+        lambda: "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randrange(15, 40))),
+        lambda: "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 12))),
+    ]
+    separators = [" ", ", ", ": ", "\n", " (", ") ", "="]
+    return [
+        rng.choice(separators).join(rng.choice(fragments)() for _ in range(rng.randrange(1, 8)))
+        for _ in range(count)
+    ]
+
+
+def check_equivalence(lines: List[str]) -> List[str]:
+    """Lignes pour lesquelles les deux implémentations diffèrent"""
+    return [
+        line for line in lines
+        if LogSanitizer.sanitize_message(line) != legacy_sanitize_message(line)
+    ]
+
+
+def measure(label: str, sanitize: Callable[[str], str], lines: List[str], iterations: int, repeat: int = 5) -> float:
+    """Meilleur temps moyen par ligne sur `repeat` séries, en µs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for line in lines:
+                sanitize(line)
+        best = min(best, time.perf_counter() - start)
+    per_line_us = best / (iterations * len(lines)) * 1e6
+    print(f"  {label:<10} {per_line_us:10.2f} µs/ligne")
+    return per_line_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--random-lines", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Le masquage n'est actif qu'en production
+    LogSanitizer.is_production = classmethod(lambda cls: True)
+
+    mismatches = check_equivalence(SAMPLE_LINES + CONSTANT_LINES + [BULK_LINE] + random_lines(args.random_lines))
+    print(f"Équivalence : {len(mismatches)} différence(s)")
+    for line in mismatches[:5]:
+        print(f"  {line!r}")
+
+    for title, lines, iterations in (
+        ("Lignes courantes", SAMPLE_LINES, args.iterations),
+        ("Messages constants", CONSTANT_LINES, args.iterations),
+        ("Ligne volumineuse", [BULK_LINE], max(args.iterations // 100, 1)),
+    ):
+        print(title)
+        legacy = measure("ancienne", legacy_sanitize_message, lines, iterations)
+        current = measure("actuelle", LogSanitizer.sanitize_message, lines, iterations)
+        print(f"  gain       x{legacy / current:.2f}")
+
+    stats = LogSanitizer.get_stats()
+    print(f"Chemin rapide : {stats['fast_path_rate']:.0%} des messages")
+    for name, cache in stats["mask_caches"].items():
+        print(f"  {name:<11} hit rate {cache['hit_rate']:.0%} ({cache['size']} entrées)")
+
+
+if __name__ == "__main__":
+    main()
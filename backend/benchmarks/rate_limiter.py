@@ -0,0 +1,135 @@
+"""
+Benchmark du coût du middleware de rate limiting.
+
+Enveloppe une application ASGI triviale avec et sans RateLimitMiddleware,
+envoie des requêtes cadencées à 1000 req/s (IP clientes variées, mélange de
+routes limitées et non limitées), puis mesure le surcoût par requête
+(moyenne et p99) et le débit maximal sans cadencement.
+
+    python -m benchmarks.rate_limiter [--rps 1000] [--seconds 3] [--clients 500]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import List, Tuple
+
+from app.libs.logger import log_writer
+from app.libs.middleware import RateLimitMiddleware
+from app.libs.rate_limiter import HybridRateLimiter, MemoryLimiterStore, ROUTE_RATE_LIMITS
+
+# Routes non limitées, majoritaires en production (dashboard, profil, ...)
+UNLIMITED_ROUTES: List[Tuple[str, str]] = [
+    ("GET", "/routes/api/dashboard"),
+    ("GET", "/routes/api/user-profile"),
+    ("GET", "/routes/api/commissions"),
+]
+
+
+async def ok_app(scope, receive, send) -> None:
+    """Application minimale : 200 sans corps"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+def build_scopes(count: int, clients: int) -> List[dict]:
+    """Requêtes aléatoires : moitié sur des routes limitées, moitié ailleurs"""
+    limited = list(ROUTE_RATE_LIMITS)
+    scopes = []
+    for _ in range(count):
+        method, path = random.choice(limited if random.random() < 0.5 else UNLIMITED_ROUTES)
+        client_ip = f"10.0.{random.randrange(clients) // 256}.{random.randrange(256)}"
+        scopes.append({
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": [],
+            "client": (client_ip, 40000),
+        })
+    return scopes
+
+
+async def paced(app, scopes: List[dict], rps: int) -> List[float]:
+    """Envoie les requêtes à `rps` req/s et renvoie la durée de chacune, en µs"""
+    interval = 1.0 / rps
+    durations = []
+    next_at = time.perf_counter()
+    for scope in scopes:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        durations.append((time.perf_counter() - start) * 1e6)
+        next_at += interval
+    return durations
+
+
+async def unpaced(app, scopes: List[dict], repeat: int = 5) -> float:
+    """Meilleur débit (req/s) sur `repeat` séries sans cadencement"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for scope in scopes:
+            await app(scope, receive, send)
+        best = min(best, time.perf_counter() - start)
+    return len(scopes) / best
+
+
+def summarize(label: str, durations: List[float]) -> Tuple[float, float]:
+    ordered = sorted(durations)
+    mean = sum(ordered) / len(ordered)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"  {label:<16} moyenne {mean:7.2f} µs   p99 {p99:7.2f} µs")
+    return mean, p99
+
+
+async def run(args: argparse.Namespace) -> None:
+    # Les refus sont journalisés : on garde l'écriture, sans polluer la sortie
+    log_writer.stream = open(os.devnull, "w")
+    limiter = HybridRateLimiter(MemoryLimiterStore())
+    limiter.start()
+    try:
+        bare = ok_app
+        limited = RateLimitMiddleware(ok_app, rate_limiter=limiter)
+        scopes = build_scopes(args.rps * args.seconds, args.clients)
+
+        print(f"Cadencé à {args.rps} req/s pendant {args.seconds} s ({args.clients} clients)")
+        base_mean, base_p99 = summarize("sans middleware", await paced(bare, scopes, args.rps))
+        mw_mean, mw_p99 = summarize("avec middleware", await paced(limited, scopes, args.rps))
+        print(f"  surcoût          moyenne {mw_mean - base_mean:7.2f} µs   p99 {mw_p99 - base_p99:7.2f} µs")
+
+        print("Débit maximal sans cadencement")
+        bare_rps = await unpaced(bare, scopes)
+        limited_rps = await unpaced(limited, scopes)
+        print(f"  sans middleware  {bare_rps:12,.0f} req/s")
+        print(f"  avec middleware  {limited_rps:12,.0f} req/s")
+
+        stats = limiter.get_stats()
+        print(f"Limiteur : {stats['allowed']} acceptées, {stats['rejected']} refusées, "
+              f"{stats['syncs']} synchronisations, {stats['keys']} clés")
+    finally:
+        await limiter.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=int, default=1000)
+    parser.add_argument("--seconds", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
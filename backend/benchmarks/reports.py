@@ -0,0 +1,320 @@
+"""
+Benchmark et vérification des rapports admin par utilisateur.
+
+Charge un jeu de données synthétique dans des tables TEMPORAIRES qui
+masquent les vraies tables le temps de la session (aucune donnée réelle
+n'est lue ni modifiée). Le jeu contient quelques utilisateurs "lourds"
+(50 leads, 50 commissions, 10 paiements).
+
+Pour chaque taille, le benchmark :
+- vérifie les totaux de chaque rapport d'app.libs.reports contre ceux
+  calculés en Python sur les données générées ;
+- montre que les anciennes requêtes (jointures directes) gonflent les sommes ;
+- mesure le temps de chaque requête.
+Le temps par millier d'utilisateurs doit rester stable jusqu'à 10 000
+utilisateurs (croissance linéaire).
+
+    python -m benchmarks.reports --dsn postgresql://... [--sizes 1250,2500,5000,10000]
+
+La DSN par défaut est lue dans DATABASE_URL.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.libs.reports import ALL_USERS_SQL, USER_ACTIVITY_COUNTS_SQL, USERS_WITH_STATS_SQL
+
+# Anciennes requêtes (jointures directes des tables enfants), pour comparaison
+LEGACY_USERS_WITH_STATS_SQL = """
+    SELECT
+        up.user_id::text,
+        up.full_name,
+        up.user_type,
+        up.email,
+        up.phone,
+        up.city,
+        up.created_at,
+        COUNT(l.id) as total_leads,
+        COALESCE(SUM(c.amount) FILTER (WHERE c.status = 'pending'), 0) as pending_commissions,
+        COALESCE(SUM(c.amount) FILTER (WHERE c.status = 'paid'), 0) as paid_commissions,
+        MAX(GREATEST(l.updated_at, c.updated_at, p.requested_at)) as last_activity
+    FROM user_profiles up
+    LEFT JOIN leads l ON up.user_id = l.user_id
+    LEFT JOIN commissions c ON up.user_id = c.user_id
+    LEFT JOIN payments p ON up.user_id = p.user_id
+    GROUP BY up.user_id, up.full_name, up.user_type, up.email, up.phone, up.city, up.created_at
+    ORDER BY up.created_at DESC
+"""
+
+LEGACY_ALL_USERS_SQL = """
+    SELECT
+        up.*,
+        COUNT(l.id) as total_leads,
+        COALESCE(SUM(c.amount), 0) as total_commissions
+    FROM user_profiles up
+    LEFT JOIN leads l ON up.user_id = l.user_id
+    LEFT JOIN commissions c ON up.user_id = c.user_id AND c.status = 'pending'
+    GROUP BY up.user_id, up.full_name, up.user_type, up.gdpr_consent_date, up.created_at, up.updated_at
+    ORDER BY up.created_at DESC
+"""
+
+LEGACY_USER_ACTIVITY_COUNTS_SQL = """
+    SELECT
+        up.user_id,
+        up.full_name,
+        up.user_type,
+        up.created_at,
+        COUNT(DISTINCT l.id) as total_leads,
+        COUNT(DISTINCT c.id) as total_commissions,
+        COUNT(DISTINCT p.id) as total_payments,
+        COUNT(DISTINCT contracts.id) as total_contracts
+    FROM user_profiles up
+    LEFT JOIN leads l ON up.user_id = l.user_id
+    LEFT JOIN commissions c ON up.user_id = c.user_id
+    LEFT JOIN payments p ON up.user_id = p.user_id
+    LEFT JOIN contracts ON up.user_id = contracts.user_id
+    GROUP BY up.user_id, up.full_name, up.user_type, up.created_at
+    ORDER BY up.created_at DESC
+"""
+
+# Tables temporaires : même nom que les tables réelles, qu'elles masquent
+# pour cette session uniquement (pg_temp passe en premier dans le search_path)
+TEMP_TABLES_SQL = """
+    CREATE TEMP TABLE user_profiles (
+        user_id uuid PRIMARY KEY,
+        full_name text NOT NULL,
+        user_type text NOT NULL,
+        email text,
+        phone text,
+        city text,
+        gdpr_consent_date timestamptz,
+        created_at timestamptz NOT NULL,
+        updated_at timestamptz
+    );
+    CREATE TEMP TABLE leads (
+        id serial PRIMARY KEY,
+        user_id uuid NOT NULL,
+        status text NOT NULL,
+        created_at timestamptz NOT NULL,
+        updated_at timestamptz NOT NULL
+    );
+    CREATE INDEX ON leads (user_id);
+    CREATE TEMP TABLE commissions (
+        id serial PRIMARY KEY,
+        user_id uuid NOT NULL,
+        amount numeric NOT NULL,
+        status text NOT NULL,
+        type text NOT NULL,
+        created_at timestamptz NOT NULL,
+        updated_at timestamptz NOT NULL
+    );
+    CREATE INDEX ON commissions (user_id);
+    CREATE TEMP TABLE payments (
+        id serial PRIMARY KEY,
+        user_id uuid NOT NULL,
+        amount_requested numeric NOT NULL,
+        status text NOT NULL,
+        requested_at timestamptz NOT NULL
+    );
+    CREATE INDEX ON payments (user_id);
+    CREATE TEMP TABLE contracts (
+        id serial PRIMARY KEY,
+        user_id uuid NOT NULL,
+        created_at timestamptz NOT NULL
+    );
+    CREATE INDEX ON contracts (user_id);
+"""
+
+COLUMNS = {
+    "user_profiles": ("user_id", "full_name", "user_type", "email", "phone", "city",
+                      "gdpr_consent_date", "created_at", "updated_at"),
+    "leads": ("user_id", "status", "created_at", "updated_at"),
+    "commissions": ("user_id", "amount", "status", "type", "created_at", "updated_at"),
+    "payments": ("user_id", "amount_requested", "status", "requested_at"),
+    "contracts": ("user_id", "created_at"),
+}
+
+
+@dataclass
+class Expected:
+    """Totaux attendus pour un utilisateur, calculés en Python"""
+    total_leads: int = 0
+    total_commissions: int = 0
+    total_payments: int = 0
+    total_contracts: int = 0
+    pending_commissions: Decimal = Decimal(0)
+    paid_commissions: Decimal = Decimal(0)
+    last_activity: Optional[datetime] = None
+
+    def touch(self, moment: datetime) -> None:
+        if self.last_activity is None or moment > self.last_activity:
+            self.last_activity = moment
+
+
+@dataclass
+class Dataset:
+    rows: Dict[str, List[Tuple[Any, ...]]] = field(default_factory=lambda: {name: [] for name in COLUMNS})
+    expected: Dict[str, Expected] = field(default_factory=dict)
+
+
+def generate(users: int, heavy_every: int = 500, seed: int = 42) -> Dataset:
+    """Jeu synthétique : un utilisateur lourd (50 × 50 × 10) tous les `heavy_every`"""
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    data = Dataset()
+
+    for i in range(users):
+        user_id = uuid.UUID(int=rng.getrandbits(128))
+        created = base + timedelta(minutes=i)
+        expected = data.expected[str(user_id)] = Expected()
+        heavy = i % heavy_every == 0
+
+        data.rows["user_profiles"].append((
+            user_id, f"Apporteur {i}", rng.choice(("particulier", "professionnel")),
+            f"apporteur{i}@example.com", None, "Lyon", created, created, created,
+        ))
+
+        for _ in range(50 if heavy else rng.randint(0, 8)):
+            updated = created + timedelta(hours=rng.randint(1, 5000))
+            data.rows["leads"].append((user_id, "nouveau", created, updated))
+            expected.total_leads += 1
+            expected.touch(updated)
+
+        for _ in range(50 if heavy else rng.randint(0, 6)):
+            amount = Decimal(rng.randint(10, 500))
+            status = rng.choice(("pending", "paid", "cancelled"))
+            updated = created + timedelta(hours=rng.randint(1, 5000))
+            data.rows["commissions"].append((user_id, amount, status, "bon_achat", created, updated))
+            expected.total_commissions += 1
+            if status == "pending":
+                expected.pending_commissions += amount
+            elif status == "paid":
+                expected.paid_commissions += amount
+            expected.touch(updated)
+
+        for _ in range(10 if heavy else rng.randint(0, 2)):
+            requested = created + timedelta(hours=rng.randint(1, 5000))
+            data.rows["payments"].append((user_id, Decimal(100), "requested", requested))
+            expected.total_payments += 1
+            expected.touch(requested)
+
+        for _ in range(rng.randint(0, 1)):
+            data.rows["contracts"].append((user_id, created))
+            expected.total_contracts += 1
+
+    return data
+
+
+async def load(conn: asyncpg.Connection, data: Dataset) -> None:
+    await conn.execute("TRUNCATE " + ", ".join(f"pg_temp.{name}" for name in COLUMNS))
+    for name, columns in COLUMNS.items():
+        await conn.copy_records_to_table(name, records=data.rows[name], columns=columns, schema_name="pg_temp")
+    # Pas d'autovacuum sur les tables temporaires
+    await conn.execute("ANALYZE " + ", ".join(f"pg_temp.{name}" for name in COLUMNS))
+
+
+# Vérifications par rapport : (nom de colonne, valeur attendue)
+Check = Callable[[Expected], Dict[str, Any]]
+
+CHECKS: Dict[str, Check] = {
+    "users-with-stats": lambda e: {
+        "total_leads": e.total_leads,
+        "pending_commissions": e.pending_commissions,
+        "paid_commissions": e.paid_commissions,
+        "last_activity": e.last_activity,
+    },
+    "all-users": lambda e: {
+        "total_leads": e.total_leads,
+        "total_commissions": e.pending_commissions,
+    },
+    "list_all_users": lambda e: {
+        "total_leads": e.total_leads,
+        "total_commissions": e.total_commissions,
+        "total_payments": e.total_payments,
+        "total_contracts": e.total_contracts,
+    },
+}
+
+REPORTS = {
+    "users-with-stats": (USERS_WITH_STATS_SQL, LEGACY_USERS_WITH_STATS_SQL),
+    "all-users": (ALL_USERS_SQL, LEGACY_ALL_USERS_SQL),
+    "list_all_users": (USER_ACTIVITY_COUNTS_SQL, LEGACY_USER_ACTIVITY_COUNTS_SQL),
+}
+
+
+def count_mismatches(rows: List[asyncpg.Record], data: Dataset, check: Check) -> int:
+    """Nombre d'utilisateurs dont au moins un total diffère de l'attendu"""
+    mismatches = 0 if len(rows) == len(data.expected) else abs(len(rows) - len(data.expected))
+    for row in rows:
+        expected = data.expected[str(row["user_id"])]
+        if any(row[column] != value for column, value in check(expected).items()):
+            mismatches += 1
+    return mismatches
+
+
+async def measure(conn: asyncpg.Connection, sql: str, repeat: int) -> Tuple[float, List[asyncpg.Record]]:
+    """Meilleur temps sur `repeat` exécutions, en ms, et les lignes de la dernière"""
+    best = float("inf")
+    rows: List[asyncpg.Record] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = await conn.fetch(sql)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        await conn.execute(TEMP_TABLES_SQL)
+
+        for users in args.sizes:
+            data = generate(users)
+            await load(conn, data)
+            print(f"{users} utilisateurs ({len(data.rows['leads'])} leads, "
+                  f"{len(data.rows['commissions'])} commissions, {len(data.rows['payments'])} paiements)")
+
+            for name, (sql, legacy_sql) in REPORTS.items():
+                elapsed, rows = await measure(conn, sql, args.repeat)
+                mismatches = count_mismatches(rows, data, CHECKS[name])
+                line = (f"  {name:<17} {elapsed:9.1f} ms  {elapsed / users * 1000:7.2f} ms/1k utilisateurs  "
+                        f"{mismatches} erreur(s)")
+
+                if users <= args.legacy_max_users:
+                    legacy_elapsed, legacy_rows = await measure(conn, legacy_sql, 1)
+                    legacy_mismatches = count_mismatches(legacy_rows, data, CHECKS[name])
+                    line += f"   ancienne : {legacy_elapsed:9.1f} ms, {legacy_mismatches} erreur(s)"
+                print(line)
+
+                if mismatches:
+                    raise SystemExit(f"{name} : totaux incorrects pour {mismatches} utilisateur(s)")
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--sizes", default="1250,2500,5000,10000",
+                        type=lambda value: [int(size) for size in value.split(",")])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy-max-users", type=int, default=2500,
+                        help="taille maximale à laquelle les anciennes requêtes sont aussi mesurées")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn ou DATABASE_URL requis")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
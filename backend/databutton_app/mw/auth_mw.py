@@ -1,12 +1,22 @@
-import functools
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter, OrderedDict
 from http import HTTPStatus
-from typing import Annotated, Callable
+from typing import Annotated, Any, Callable
 import jwt
 from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.requests import HTTPConnection
-from jwt import PyJWKClient
 from pydantic import BaseModel
 from starlette.requests import Request
+from app.libs.logger import log_writer
 
 
 class AuthConfig(BaseModel):
@@ -26,6 +36,57 @@ class User(BaseModel):
     email: str | None = None
 
 
+class AuthEventLog:
+    """Structured authentication events on the application log writer.
+
+    Events go through `app.libs.logger.log_writer` (bounded queue, writer
+    thread, sanitized fields), so the auth path shares the application's
+    format, drop policy and shutdown. Successes are logged for a sampled
+    fraction of requests (AUTH_LOG_SUCCESS_SAMPLE_RATE). Every outcome is
+    counted, and failures are counted by reason.
+    """
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+
+        self.successes = 0
+        self.failures: Counter[str] = Counter()
+
+    def _emit(self, level: str, event: str, fields: dict) -> None:
+        log_writer.submit(level, "log", event, fields)
+
+    def success(self, sub: str) -> None:
+        with self._lock:
+            self.successes += 1
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._emit("info", "auth_success", {"sub": sub})
+
+    def failure(self, reason: str, detail: str | None = None) -> None:
+        with self._lock:
+            self.failures[reason] += 1
+        fields = {"reason": reason}
+        if detail:
+            fields["detail"] = detail
+        self._emit("warning", "auth_failure", fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._emit("warning", event, fields)
+
+    def get_status(self) -> dict:
+        return {
+            "successes": self.successes,
+            "failures": dict(self.failures),
+            "dropped": log_writer.dropped,
+            "success_sample_rate": self.sample_rate,
+        }
+
+
+auth_log = AuthEventLog(
+    sample_rate=float(os.environ.get("AUTH_LOG_SUCCESS_SAMPLE_RATE", "0.01"))
+)
+
+
 def get_auth_config(request: HTTPConnection) -> AuthConfig:
     auth_config: AuthConfig | None = request.app.state.auth_config
 
@@ -46,24 +107,47 @@ def get_audit_log(request: HTTPConnection) -> Callable[[str], None] | None:
 AuditLogDep = Annotated[Callable[[str], None] | None, Depends(get_audit_log)]
 
 
-def get_authorized_user(
+# Key of the shared authentication task in the request scope state
+_AUTH_STATE_KEY = "authorized_user"
+
+# Key of the verified subject in the request scope state (request.state.user_id),
+# read by the rate limiter and the request logs
+SUBJECT_STATE_KEY = "user_id"
+
+
+async def get_authorized_user(
     request: HTTPConnection,
 ) -> User:
+    """Authenticate the request once, however many dependencies ask for the user.
+
+    The router level dependency in main.py and the `AuthorizedUser` route
+    parameter share the same task, stored in the request scope state.
+    """
+    state = request.scope.setdefault("state", {})
+    pending = state.get(_AUTH_STATE_KEY)
+    if pending is None:
+        pending = state[_AUTH_STATE_KEY] = asyncio.ensure_future(
+            _authenticate(request)
+        )
+    return await pending
+
+
+async def _authenticate(request: HTTPConnection) -> User:
     auth_config = get_auth_config(request)
 
     try:
         if isinstance(request, WebSocket):
-            user = authorize_websocket(request, auth_config)
+            user = await authorize_websocket(request, auth_config)
         elif isinstance(request, Request):
-            user = authorize_request(request, auth_config)
+            user = await authorize_request(request, auth_config)
         else:
             raise ValueError("Unexpected request type")
 
         if user is not None:
+            request.scope.setdefault("state", {})[SUBJECT_STATE_KEY] = user.sub
             return user
-        print("Request authentication returned no user")
     except Exception as e:
-        print(f"Request authentication failed: {e}")
+        auth_log.failure("error", str(e))
 
     if isinstance(request, WebSocket):
         raise WebSocketException(
@@ -75,23 +159,297 @@ def get_authorized_user(
         )
 
 
-@functools.cache
-def get_jwks_client(url: str):
-    """Reuse client cached by its url, client caches keys by default."""
-    return PyJWKClient(url, cache_keys=True)
+class JWKSKeyStore:
+    """In-memory signing keys for one JWKS url, refreshed in the background.
+
+    Keys are resolved by `kid` without any I/O on the event loop. The key set
+    is refetched before its Cache-Control max-age runs out, and at most once
+    per `min_refresh_interval` when a token carries an unknown kid. If a
+    refresh fails, the previous keys keep being served.
+
+    Keys are fetched from `url`, which must be https. Tests and local setups
+    pass a `loader` instead: a blocking callable returning (jwks, ttl), used
+    in place of the http fetch; `url` then only labels the store.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        default_ttl: float = 3600,
+        min_ttl: float = 60,
+        max_ttl: float = 86400,
+        min_refresh_interval: float = 30,
+        retry_delay: float = 30,
+        fetch_timeout: float = 10,
+        loader: Callable[[], tuple[dict, float]] | None = None,
+    ):
+        # Fetched signing keys only ever come from an https endpoint
+        if loader is None and not url.startswith("https://"):
+            raise ValueError(f"JWKS url must use https: {url}")
+        self.url = url
+        self.loader = loader
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.retry_delay = retry_delay
+        self.fetch_timeout = fetch_timeout
+
+        # kid -> (key, algorithm), swapped as a whole on every refresh
+        self._keys: dict[str, tuple[Any, str]] = {}
+        self._expires_at = 0.0
+        self._last_fetch: float | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: asyncio.Task | None = None
+        self._sync_lock = threading.Lock()
+
+        self.refreshes = 0
+        self.failures = 0
+
+    def _fetch(self) -> tuple[dict, float]:
+        """Blocking fetch of the key set, returns (jwks, ttl in seconds)"""
+        if self.loader is not None:
+            return self.loader()
+        with urllib.request.urlopen(self.url, timeout=self.fetch_timeout) as response:
+            jwks = json.loads(response.read())
+            cache_control = response.headers.get("Cache-Control", "")
+
+        match = re.search(r"max-age=(\d+)", cache_control or "")
+        ttl = float(match.group(1)) if match else self.default_ttl
+        return jwks, min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _install(self, jwks: dict, ttl: float) -> None:
+        keys = {
+            jwk.key_id: (jwk.key, jwk.algorithm_name)
+            for jwk in jwt.PyJWKSet.from_dict(jwks).keys
+            if jwk.key_id
+        }
+        self._keys = keys
+        self._expires_at = time.monotonic() + ttl
+        self.refreshes += 1
+
+    async def _refresh(self) -> None:
+        self._last_fetch = time.monotonic()
+        try:
+            jwks, ttl = await asyncio.to_thread(self._fetch)
+            self._install(jwks, ttl)
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def refresh(self) -> None:
+        """Refetch the key set off the event loop, concurrent callers share one fetch"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._inflight)
+
+    def refresh_from_thread(self) -> None:
+        """Refetch from a worker thread, through the store's loop when it runs"""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(self.refresh(), loop)
+            future.result(timeout=self.fetch_timeout)
+            return
+
+        with self._sync_lock:
+            self._last_fetch = time.monotonic()
+            try:
+                self._install(*self._fetch())
+            except Exception:
+                self.failures += 1
+                raise
+
+    def _may_refetch(self) -> bool:
+        return (
+            self._last_fetch is None
+            or time.monotonic() - self._last_fetch >= self.min_refresh_interval
+        )
+
+    def get_signing_key(self, kid: str) -> tuple[Any, str]:
+        """Key and algorithm for a kid, from memory when possible"""
+        key = self._keys.get(kid)
+        if key is None and self._may_refetch() and not self._on_loop():
+            # Key rotated before our refresh: fetch once, from this worker thread
+            self.refresh_from_thread()
+            key = self._keys.get(kid)
+        if key is None:
+            raise KeyError(f"Unknown signing key id: {kid}")
+        return key
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            delay = max((self._expires_at - time.monotonic()) * 0.9, 1.0)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                auth_log.warning("jwks_refresh_failed", url=self.url, error=str(e))
+                await asyncio.sleep(self.retry_delay)
+
+    async def start(self) -> None:
+        """Prefetch the key set and keep it fresh in the background"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self.refresh()
+        except Exception as e:
+            auth_log.warning("jwks_prefetch_failed", url=self.url, error=str(e))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    def get_status(self) -> dict:
+        return {
+            "url": self.url,
+            "keys": len(self._keys),
+            "expires_in": round(max(self._expires_at - time.monotonic(), 0.0), 1),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+_jwks_stores: dict[str, JWKSKeyStore] = {}
+
+
+def get_jwks_store(url: str) -> JWKSKeyStore:
+    """One key store per JWKS url"""
+    store = _jwks_stores.get(url)
+    if store is None:
+        store = _jwks_stores.setdefault(url, JWKSKeyStore(url))
+    return store
+
+
+def register_jwks_store(store: JWKSKeyStore) -> JWKSKeyStore:
+    """Serve `store` for its url, e.g. a store with a test `loader`"""
+    _jwks_stores[store.url] = store
+    return store
+
+
+async def start_jwks_store(url: str) -> JWKSKeyStore:
+    store = get_jwks_store(url)
+    await store.start()
+    return store
+
+
+async def stop_jwks_stores() -> None:
+    for store in list(_jwks_stores.values()):
+        await store.stop()
 
 
 def get_signing_key(url: str, token: str) -> tuple[str, str]:
-    client = get_jwks_client(url)
-    signing_key = client.get_signing_key_from_jwt(token)
-    key = signing_key.key
-    alg = signing_key.algorithm_name
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not kid:
+        raise ValueError("Token header has no kid")
+    key, alg = get_jwks_store(url).get_signing_key(kid)
     if alg != "RS256":
         raise ValueError(f"Unsupported signing algorithm: {alg}")
     return (key, alg)
 
 
-def authorize_websocket(
+class VerifiedTokenCache:
+    """Bounded LRU of tokens whose signature and claims were already verified.
+
+    Entries are keyed by a sha256 digest of the audience and token, so raw
+    tokens are never kept in memory, and expire at the token's `exp` claim.
+    Tokens without `exp` are not cached. Thread safe, since the auth
+    dependency runs in the threadpool.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        # digest -> (exp, user)
+        self._entries: OrderedDict[bytes, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str, audience: str) -> bytes:
+        return hashlib.sha256(f"{audience}\0{token}".encode()).digest()
+
+    def get(self, token: str, audience: str) -> User | None:
+        digest = self._digest(token, audience)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            exp, user = entry
+            if exp <= time.time():
+                del self._entries[digest]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return user
+
+    def peek(self, token: str, audience: str) -> User | None:
+        """Lookup without touching the LRU order or the hit/miss counters"""
+        digest = self._digest(token, audience)
+        with self._lock:
+            entry = self._entries.get(digest)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def put(self, token: str, audience: str, user: User, exp: Any) -> None:
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+
+        digest = self._digest(token, audience)
+        with self._lock:
+            self._entries[digest] = (float(exp), user)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_status(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+verified_tokens = VerifiedTokenCache(
+    max_size=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "4096"))
+)
+
+
+async def authorize_websocket(
     request: WebSocket,
     auth_config: AuthConfig,
 ) -> User | None:
@@ -111,30 +469,129 @@ def authorize_websocket(
             break
 
     if not token:
-        print(f"Missing bearer {prefix}.<token> in protocols")
+        auth_log.failure("missing_header", f"no {prefix}<token> protocol")
+        return None
+
+    return await verify_token(token, auth_config)
+
+
+def resolve_verified_subject(scope: dict) -> str | None:
+    """Publish the subject of an already verified token on the request scope.
+
+    Meant for middlewares that run before the auth dependency, such as the
+    rate limiter. Only the verified token cache is consulted, so no signature
+    is checked here: a token seen for the first time resolves to None, and
+    the auth dependency publishes the subject once it has verified it.
+    """
+    state = scope.setdefault("state", {})
+    subject = state.get(SUBJECT_STATE_KEY)
+    if subject is not None:
+        return subject
+
+    app = scope.get("app")
+    auth_config: AuthConfig | None = getattr(
+        getattr(app, "state", None), "auth_config", None
+    )
+    if auth_config is None:
+        return None
+
+    header = auth_config.header.lower().encode("latin-1")
+    for name, value in scope.get("headers", ()):
+        if name == header:
+            auth_header = value.decode("latin-1")
+            break
+    else:
+        return None
+
+    if not auth_header.startswith("Bearer "):
+        return None
+
+    user = verified_tokens.peek(auth_header[7:], auth_config.audience)
+    if user is None:
         return None
 
-    return authorize_token(token, auth_config)
+    state[SUBJECT_STATE_KEY] = user.sub
+    return user.sub
 
 
-def authorize_request(
+async def authorize_request(
     request: Request,
     auth_config: AuthConfig,
 ) -> User | None:
     auth_header = request.headers.get(auth_config.header)
     if not auth_header:
-        print(f"Missing header '{auth_config.header}'")
+        auth_log.failure("missing_header", auth_config.header)
         return None
 
     token = auth_header.startswith("Bearer ") and auth_header[7:]
     if not token:
-        print(f"Missing bearer token in '{auth_config.header}'")
+        auth_log.failure("missing_token", auth_config.header)
         return None
 
-    return authorize_token(token, auth_config)
+    return await verify_token(token, auth_config)
 
 
-def authorize_token(
+# Dedicated threads for RSA verification, so it never competes with the
+# default threadpool used by sync routes
+AUTH_VERIFY_WORKERS = int(
+    os.environ.get("AUTH_VERIFY_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+AUTH_VERIFY_MAX_PENDING = int(
+    os.environ.get("AUTH_VERIFY_MAX_PENDING", str(AUTH_VERIFY_WORKERS * 16))
+)
+
+# Created at lifespan startup (or on first use) and dropped at shutdown, so a
+# new lifespan gets a live executor and a semaphore bound to its own loop
+_verify_executor: concurrent.futures.ThreadPoolExecutor | None = None
+# Bounds the verifications queued on the executor, extra callers wait here
+_verify_slots: asyncio.Semaphore | None = None
+
+
+def start_auth_executor() -> None:
+    global _verify_executor, _verify_slots
+    if _verify_executor is None:
+        _verify_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=AUTH_VERIFY_WORKERS, thread_name_prefix="auth-verify"
+        )
+    if _verify_slots is None:
+        _verify_slots = asyncio.Semaphore(AUTH_VERIFY_MAX_PENDING)
+
+
+async def verify_token(
+    token: str,
+    auth_config: AuthConfig,
+) -> User | None:
+    """Async token verification: cache lookup on the loop, RSA on the auth executor"""
+    user = verified_tokens.get(token, auth_config.audience)
+    if user is not None:
+        return user
+
+    if _verify_executor is None or _verify_slots is None:
+        start_auth_executor()
+    async with _verify_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _verify_executor, _verify_token, token, auth_config
+        )
+
+
+def shutdown_auth_executor() -> None:
+    global _verify_executor, _verify_slots
+    executor, _verify_executor, _verify_slots = _verify_executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_auth_stats() -> dict:
+    """Counters of the auth path: outcomes, token cache and key stores"""
+    return {
+        "log": auth_log.get_status(),
+        "token_cache": verified_tokens.get_status(),
+        "jwks": [store.get_status() for store in _jwks_stores.values()],
+    }
+
+
+def _verify_token(
     token: str,
     auth_config: AuthConfig,
 ) -> User | None:
@@ -145,8 +602,11 @@ def authorize_token(
     for audience, jwks_url in jwks_urls:
         try:
             key, alg = get_signing_key(jwks_url, token)
+        except KeyError as e:
+            auth_log.failure("bad_kid", str(e))
+            continue
         except Exception as e:
-            print(f"Failed to get signing key {e}")
+            auth_log.failure("signing_key", str(e))
             continue
 
         try:
@@ -156,14 +616,27 @@ def authorize_token(
                 algorithms=[alg],
                 audience=audience,
             )
+        except jwt.ExpiredSignatureError:
+            auth_log.failure("expired")
+            continue
+        except jwt.InvalidAudienceError:
+            auth_log.failure("audience")
+            continue
+        except jwt.InvalidSignatureError:
+            auth_log.failure("invalid_signature")
+            continue
         except jwt.PyJWTError as e:
-            print(f"Failed to decode and validate token {e}")
+            auth_log.failure("invalid_token", str(e))
             continue
 
+    if payload is None:
+        return None
+
     try:
         user = User.model_validate(payload)
-        print(f"User {user.sub} authenticated")
+        auth_log.success(user.sub)
+        verified_tokens.put(token, auth_config.audience, user, payload.get("exp"))
         return user
     except Exception as e:
-        print(f"Failed to parse token payload {e}")
+        auth_log.failure("invalid_payload", str(e))
         return None
@@ -2,11 +2,27 @@ import os
 import pathlib
 import json
 import dotenv
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter, Depends
 
 dotenv.load_dotenv()
 
-from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user
+from databutton_app.mw.auth_mw import (
+    AuthConfig,
+    get_authorized_user,
+    shutdown_auth_executor,
+    start_auth_executor,
+    start_jwks_store,
+    stop_jwks_stores,
+)
+from app.libs.database_pool import (
+    check_no_direct_connections,
+    close_database_pool,
+    initialize_database_pool,
+)
+from app.libs.middleware import ConnectionLeakMiddleware, setup_rate_limiting_middleware
+from app.libs.logger import close_logger
+from app.libs.rate_limiter import start_rate_limiter, stop_rate_limiter
 
 
 def get_router_config() -> dict:
@@ -74,9 +90,40 @@ def get_firebase_config() -> dict | None:
     return None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open and warm the database pool, the rate limiter and the auth keys before serving, drain them on shutdown."""
+    try:
+        await initialize_database_pool()
+    except Exception as e:
+        # The pool will be created lazily on the first request instead
+        print(f"Database pool warm-up failed: {e}")
+
+    start_rate_limiter()
+    start_auth_executor()
+
+    auth_config: AuthConfig | None = app.state.auth_config
+    if auth_config is not None:
+        await start_jwks_store(auth_config.jwks_url)
+
+    yield
+
+    await stop_rate_limiter()
+    await stop_jwks_stores()
+    shutdown_auth_executor()
+    await close_database_pool()
+    close_logger()
+
+
 def create_app() -> FastAPI:
     """Create the app. This is called by uvicorn with the factory option to construct the app object."""
-    app = FastAPI()
+    # Every module must go through the shared connection pool
+    check_no_direct_connections()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(ConnectionLeakMiddleware)
+    # Added last so that it runs first and rejects before any other work
+    setup_rate_limiting_middleware(app)
     app.include_router(import_api_routers())
 
     for route in app.routes:
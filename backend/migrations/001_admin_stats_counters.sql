@@ -0,0 +1,137 @@
+-- Compteurs du tableau de bord admin, tenus à jour par triggers
+--
+-- GET /routes/api/admin/stats lit une seule ligne au lieu de compter les
+-- tables à chaque affichage. Les triggers appliquent des deltas sur cette
+-- ligne à chaque insertion, suppression ou changement de statut.
+-- refresh_admin_stats_counters() recalcule tout depuis les tables (après un
+-- TRUNCATE ou un import en masse hors triggers).
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+-- Pas d'écriture concurrente entre la création des triggers et le calcul initial
+LOCK TABLE user_profiles, leads, commissions, payments IN SHARE MODE;
+
+CREATE TABLE IF NOT EXISTS admin_stats_counters (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    total_users bigint NOT NULL DEFAULT 0,
+    total_leads bigint NOT NULL DEFAULT 0,
+    total_commissions_paid numeric NOT NULL DEFAULT 0,
+    pending_commission_requests bigint NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION refresh_admin_stats_counters() RETURNS void AS $$
+BEGIN
+    INSERT INTO admin_stats_counters (
+        id, total_users, total_leads, total_commissions_paid, pending_commission_requests, updated_at
+    )
+    SELECT
+        true,
+        (SELECT COUNT(*) FROM user_profiles),
+        (SELECT COUNT(*) FROM leads),
+        (SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE status = 'paid'),
+        (SELECT COUNT(*) FROM payments WHERE status = 'requested'),
+        now()
+    ON CONFLICT (id) DO UPDATE SET
+        total_users = EXCLUDED.total_users,
+        total_leads = EXCLUDED.total_leads,
+        total_commissions_paid = EXCLUDED.total_commissions_paid,
+        pending_commission_requests = EXCLUDED.pending_commission_requests,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Utilisateurs et leads : +1 / -1
+CREATE OR REPLACE FUNCTION admin_stats_count_users() RETURNS trigger AS $$
+BEGIN
+    UPDATE admin_stats_counters
+    SET total_users = total_users + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION admin_stats_count_leads() RETURNS trigger AS $$
+BEGIN
+    UPDATE admin_stats_counters
+    SET total_leads = total_leads + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Commissions payées : somme des montants au statut 'paid'
+CREATE OR REPLACE FUNCTION admin_stats_count_commissions() RETURNS trigger AS $$
+DECLARE
+    delta numeric := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.status = 'paid' THEN
+            delta := delta - COALESCE(OLD.amount, 0);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.status = 'paid' THEN
+            delta := delta + COALESCE(NEW.amount, 0);
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        UPDATE admin_stats_counters
+        SET total_commissions_paid = total_commissions_paid + delta, updated_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Demandes de paiement au statut 'requested'
+CREATE OR REPLACE FUNCTION admin_stats_count_payments() RETURNS trigger AS $$
+DECLARE
+    delta integer := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.status = 'requested' THEN
+            delta := delta - 1;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.status = 'requested' THEN
+            delta := delta + 1;
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        UPDATE admin_stats_counters
+        SET pending_commission_requests = pending_commission_requests + delta, updated_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS admin_stats_users ON user_profiles;
+CREATE TRIGGER admin_stats_users
+    AFTER INSERT OR DELETE ON user_profiles
+    FOR EACH ROW EXECUTE FUNCTION admin_stats_count_users();
+
+DROP TRIGGER IF EXISTS admin_stats_leads ON leads;
+CREATE TRIGGER admin_stats_leads
+    AFTER INSERT OR DELETE ON leads
+    FOR EACH ROW EXECUTE FUNCTION admin_stats_count_leads();
+
+DROP TRIGGER IF EXISTS admin_stats_commissions ON commissions;
+CREATE TRIGGER admin_stats_commissions
+    AFTER INSERT OR DELETE OR UPDATE OF status, amount ON commissions
+    FOR EACH ROW EXECUTE FUNCTION admin_stats_count_commissions();
+
+DROP TRIGGER IF EXISTS admin_stats_payments ON payments;
+CREATE TRIGGER admin_stats_payments
+    AFTER INSERT OR DELETE OR UPDATE OF status ON payments
+    FOR EACH ROW EXECUTE FUNCTION admin_stats_count_payments();
+
+-- Alertes anniversaire : calculées à la lecture (elles dépendent de la date),
+-- mais seulement sur les bons d'achat en attente grâce à cet index partiel
+CREATE INDEX IF NOT EXISTS idx_commissions_pending_bon_achat
+    ON commissions (user_id)
+    WHERE status = 'pending' AND type = 'bon_achat';
+
+SELECT refresh_admin_stats_counters();
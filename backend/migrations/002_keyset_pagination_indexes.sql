@@ -0,0 +1,22 @@
+-- Index des listes admin paginées par curseur (app.libs.pagination)
+--
+-- Chaque page lit `WHERE (tri, id) < ($1, $2) ORDER BY tri DESC, id DESC
+-- LIMIT n` : avec un index sur (tri, id), c'est un parcours d'index borné,
+-- quelle que soit la profondeur de la page.
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+CREATE INDEX IF NOT EXISTS idx_leads_created_at_id
+    ON leads (created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_leads_updated_at_id
+    ON leads (updated_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_user_profiles_created_at_user_id
+    ON user_profiles (created_at, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_payments_requested_at_id
+    ON payments (requested_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_contracts_created_at_id
+    ON contracts (created_at, id);
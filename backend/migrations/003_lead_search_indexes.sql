@@ -0,0 +1,36 @@
+-- migration: no-transaction
+-- Index de la recherche admin des leads (GET /routes/api/admin/leads/search)
+--
+-- Objectif : moins de 50 ms par page à 1M de leads, sans parcours de table.
+-- - Texte libre (nom, téléphone, email du prospect) : un seul index GIN
+--   trigramme sur l'expression LEAD_SEARCH_TEXT_SQL de app.libs.lead_search.
+--   La requête doit utiliser exactement la même expression, et au moins
+--   3 caractères (en dessous, aucun trigramme n'est extrait).
+-- - Statut, apporteur, ville : index composites (filtre, created_at, id). Le
+--   filtre et l'ordre de la pagination par curseur sont servis par le même
+--   parcours d'index, arrêté après `limit` lignes.
+-- - Plage de dates seule : idx_leads_created_at_id (migration 002).
+--
+-- Construits avec CONCURRENTLY, hors transaction : les leads restent
+-- modifiables pendant la construction (un CREATE INDEX simple bloque les
+-- écritures sur la table jusqu'à la fin).
+-- benchmarks/lead_search.py vérifie les plans et les temps sur 1M de leads.
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_search_trgm
+    ON leads USING gin (
+        (coalesce(prospect_name, '') || ' ' || coalesce(prospect_phone, '') || ' ' || coalesce(prospect_email, ''))
+        gin_trgm_ops
+    );
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_status_created_at_id
+    ON leads (status, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_user_id_created_at_id
+    ON leads (user_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_city_created_at_id
+    ON leads (lower(prospect_city), created_at, id);
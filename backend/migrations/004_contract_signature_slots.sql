@@ -0,0 +1,10 @@
+-- Positions des champs de signature dans le HTML du contrat
+--
+-- generate-contract enregistre [début, fin] (en caractères, depuis 0) du
+-- marqueur de date puis de celui de l'IP ; sign-contract remplace ces plages
+-- sans rechercher les marqueurs. NULL pour les contrats plus anciens, qui
+-- gardent la recherche des marqueurs.
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+ALTER TABLE contracts ADD COLUMN IF NOT EXISTS signature_slots integer[];
@@ -0,0 +1,56 @@
+-- Stockage des contrats par contenu
+--
+-- Les nouveaux contrats ne stockent plus leur HTML complet : seulement
+-- l'empreinte SHA-256 de la source du template (gardée une fois dans
+-- contract_templates), les champs variables (fields) et l'empreinte SHA-256
+-- du document rendu (content_hash), vérifiée à chaque reconstruction.
+-- Voir app/libs/contract_store.py.
+--
+-- Les contrats existants gardent contract_html et reçoivent leur
+-- content_hash ; DatabaseMaintenance.compact_contracts() convertit ensuite
+-- ceux qui peuvent être reconstruits à l'identique.
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+CREATE TABLE IF NOT EXISTS contract_templates (
+    template_hash text PRIMARY KEY,
+    source text NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE contracts
+    ADD COLUMN IF NOT EXISTS template_hash text REFERENCES contract_templates (template_hash),
+    ADD COLUMN IF NOT EXISTS fields jsonb,
+    ADD COLUMN IF NOT EXISTS content_hash text,
+    ALTER COLUMN contract_html DROP NOT NULL;
+
+UPDATE contracts
+SET content_hash = encode(sha256(convert_to(contract_html, 'UTF8')), 'hex')
+WHERE content_hash IS NULL AND contract_html IS NOT NULL;
+
+-- Chaque contrat a soit son HTML, soit de quoi le reconstruire
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'contracts_body_stored') THEN
+        ALTER TABLE contracts ADD CONSTRAINT contracts_body_stored CHECK (
+            contract_html IS NOT NULL
+            OR (template_hash IS NOT NULL AND fields IS NOT NULL AND content_hash IS NOT NULL)
+        );
+    END IF;
+END $$;
+
+-- content_hash suit contract_html pour les contrats encore stockés en HTML
+-- (signature des anciens contrats, insertion par un code plus ancien)
+CREATE OR REPLACE FUNCTION contracts_set_content_hash() RETURNS trigger AS $$
+BEGIN
+    IF NEW.contract_html IS NOT NULL THEN
+        NEW.content_hash := encode(sha256(convert_to(NEW.contract_html, 'UTF8')), 'hex');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS contracts_content_hash ON contracts;
+CREATE TRIGGER contracts_content_hash
+    BEFORE INSERT OR UPDATE OF contract_html ON contracts
+    FOR EACH ROW EXECUTE FUNCTION contracts_set_content_hash();
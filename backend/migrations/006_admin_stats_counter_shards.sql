@@ -0,0 +1,128 @@
+-- Compteurs du tableau de bord admin répartis sur 16 lignes
+--
+-- Avec une seule ligne (001), chaque transaction qui insère un lead, crée un
+-- profil ou change le statut d'une commission ou d'un paiement verrouillait
+-- cette ligne jusqu'à son commit : toutes les écritures attendaient les unes
+-- après les autres pour accélérer une lecture admin.
+--
+-- Les triggers appliquent maintenant leurs deltas sur la ligne
+-- pg_backend_pid() % 16 : deux connexions concurrentes touchent en général
+-- des lignes différentes, et une transaction ne verrouille jamais qu'une
+-- seule ligne (pas d'interblocage entre transactions multi-lignes).
+-- GET /routes/api/admin/stats fait la somme des 16 lignes.
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+-- Pas d'écriture concurrente entre le remplacement de la table et le calcul initial
+LOCK TABLE user_profiles, leads, commissions, payments IN SHARE MODE;
+
+DROP TABLE IF EXISTS admin_stats_counters;
+
+CREATE TABLE admin_stats_counters (
+    shard smallint PRIMARY KEY,
+    total_users bigint NOT NULL DEFAULT 0,
+    total_leads bigint NOT NULL DEFAULT 0,
+    total_commissions_paid numeric NOT NULL DEFAULT 0,
+    pending_commission_requests bigint NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO admin_stats_counters (shard) SELECT generate_series(0, 15);
+
+-- Ligne de compteurs de la connexion courante
+CREATE OR REPLACE FUNCTION admin_stats_shard() RETURNS smallint AS $$
+    SELECT (pg_backend_pid() % 16)::smallint
+$$ LANGUAGE sql STABLE;
+
+-- Recalcul complet : les totaux dans la ligne 0, les autres à zéro
+CREATE OR REPLACE FUNCTION refresh_admin_stats_counters() RETURNS void AS $$
+BEGIN
+    INSERT INTO admin_stats_counters (shard)
+    SELECT generate_series(0, 15)
+    ON CONFLICT (shard) DO NOTHING;
+
+    UPDATE admin_stats_counters
+    SET total_users = 0, total_leads = 0, total_commissions_paid = 0,
+        pending_commission_requests = 0, updated_at = now();
+
+    UPDATE admin_stats_counters
+    SET total_users = (SELECT COUNT(*) FROM user_profiles),
+        total_leads = (SELECT COUNT(*) FROM leads),
+        total_commissions_paid = (SELECT COALESCE(SUM(amount), 0) FROM commissions WHERE status = 'paid'),
+        pending_commission_requests = (SELECT COUNT(*) FROM payments WHERE status = 'requested')
+    WHERE shard = 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Utilisateurs et leads : +1 / -1
+CREATE OR REPLACE FUNCTION admin_stats_count_users() RETURNS trigger AS $$
+BEGIN
+    UPDATE admin_stats_counters
+    SET total_users = total_users + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = now()
+    WHERE shard = admin_stats_shard();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION admin_stats_count_leads() RETURNS trigger AS $$
+BEGIN
+    UPDATE admin_stats_counters
+    SET total_leads = total_leads + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = now()
+    WHERE shard = admin_stats_shard();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Commissions payées : somme des montants au statut 'paid'
+CREATE OR REPLACE FUNCTION admin_stats_count_commissions() RETURNS trigger AS $$
+DECLARE
+    delta numeric := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.status = 'paid' THEN
+            delta := delta - COALESCE(OLD.amount, 0);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.status = 'paid' THEN
+            delta := delta + COALESCE(NEW.amount, 0);
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        UPDATE admin_stats_counters
+        SET total_commissions_paid = total_commissions_paid + delta, updated_at = now()
+        WHERE shard = admin_stats_shard();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Demandes de paiement au statut 'requested'
+CREATE OR REPLACE FUNCTION admin_stats_count_payments() RETURNS trigger AS $$
+DECLARE
+    delta integer := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.status = 'requested' THEN
+            delta := delta - 1;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.status = 'requested' THEN
+            delta := delta + 1;
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        UPDATE admin_stats_counters
+        SET pending_commission_requests = pending_commission_requests + delta, updated_at = now()
+        WHERE shard = admin_stats_shard();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_admin_stats_counters();
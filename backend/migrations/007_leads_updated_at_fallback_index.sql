@@ -0,0 +1,16 @@
+-- migration: no-transaction
+-- Tri des leads par date de mise à jour (app.libs.lead_search.LEADS_KEYSET)
+--
+-- updated_at est NULL pour un lead jamais modifié : le tri, la condition de
+-- curseur et le curseur portent sur COALESCE(updated_at, created_at). L'index
+-- porte sur la même expression ; idx_leads_updated_at_id (migration 002), sur
+-- la colonne seule, ne sert plus ce tri.
+--
+-- Construits avec CONCURRENTLY, hors transaction (voir la migration 003).
+--
+-- Appliquer avec DatabaseMaintenance.apply_migrations().
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_updated_or_created_at_id
+    ON leads ((COALESCE(updated_at, created_at)), id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_leads_updated_at_id;
@@ -0,0 +1,78 @@
+"""Rendu compilé du contrat et signature par positions (app.libs.contract_template)"""
+
+from datetime import date
+
+from app.libs.contract_template import (
+    CONTRACT_TEMPLATE, SIGNATURE_FIELDS, SIGNATURE_PLACEHOLDERS, CompiledTemplate, fill_slots, french_date
+)
+
+VALUES = {
+    "company_name": "Solaire Pro SARL",
+    "siret_number": "12345678901234",
+    "signature_date": french_date(date(2025, 7, 11)),
+}
+EXPECTED_MARKERS = [SIGNATURE_PLACEHOLDERS[name] for name in SIGNATURE_FIELDS]
+
+
+def generate(values=VALUES):
+    return CONTRACT_TEMPLATE.render_with_slots({**values, **SIGNATURE_PLACEHOLDERS}, SIGNATURE_FIELDS)
+
+
+def test_render_matches_replace():
+    template = CompiledTemplate("<p>{a} et {b}, {a}</p> .x { color: red; }")
+    assert template.fields == ["a", "b", "a"]
+    assert template.render({"a": "1", "b": "2"}) == "<p>1 et 2, 1</p> .x { color: red; }"
+
+
+def test_render_escapes_values():
+    template = CompiledTemplate("<p>{company_name}</p>")
+    assert template.render({"company_name": '<b>"A&B"</b>'}) == "<p>&lt;b&gt;&quot;A&amp;B&quot;&lt;/b&gt;</p>"
+
+
+def test_slots_point_at_markers():
+    html, slots = generate()
+    assert len(slots) == 2 * len(SIGNATURE_FIELDS)
+    for index, marker in enumerate(EXPECTED_MARKERS):
+        assert html[slots[2 * index]:slots[2 * index + 1]] == marker
+
+
+def test_fill_slots_signs_contract():
+    html, slots = generate()
+    signed = fill_slots(html, slots, ["11/07/2025 à 14:32:05", "203.0.113.42"], expected=EXPECTED_MARKERS)
+
+    expected = CONTRACT_TEMPLATE.render({
+        **VALUES, "signature_datetime": "11/07/2025 à 14:32:05", "signature_ip": "203.0.113.42",
+    })
+    assert signed == expected
+    assert "PLACEHOLDER" not in signed
+
+
+def test_fill_slots_escapes_values():
+    html, slots = generate()
+    signed = fill_slots(html, slots, ["<script>", "1.2.3.4"], expected=EXPECTED_MARKERS)
+    assert "<script>" not in signed
+    assert "&lt;script&gt;" in signed
+
+
+def test_slots_follow_escaped_values():
+    # Une valeur qui s'allonge à l'échappement décale les positions suivantes
+    html, slots = generate({**VALUES, "company_name": "Dupont & Fils <SARL>"})
+    assert "Dupont &amp; Fils &lt;SARL&gt;" in html
+    signed = fill_slots(html, slots, ["11/07/2025 à 14:32:05", "203.0.113.42"], expected=EXPECTED_MARKERS)
+    assert signed is not None
+    assert "203.0.113.42" in signed
+
+
+def test_fill_slots_rejects_modified_html():
+    html, slots = generate()
+    modified = "<!-- modifié -->" + html
+    assert fill_slots(modified, slots, ["11/07/2025 à 14:32:05", "203.0.113.42"], expected=EXPECTED_MARKERS) is None
+
+
+def test_fill_slots_rejects_out_of_range_slots():
+    html, slots = generate()
+    assert fill_slots(html[:slots[-1] - 1], slots, ["a", "b"]) is None
+
+
+def test_french_date():
+    assert french_date(date(2025, 8, 1)) == "1 août 2025"
@@ -0,0 +1,60 @@
+"""
+Passe unique de LogSanitizer.sanitize_message : même sortie que l'ancien
+masquage par motif (benchmarks.log_sanitizer.legacy_sanitize_message).
+"""
+
+import pytest
+
+from app.libs.log_sanitizer import LogSanitizer
+from benchmarks.log_sanitizer import BULK_LINE, CONSTANT_LINES, SAMPLE_LINES, legacy_sanitize_message, random_lines
+
+
+@pytest.fixture(autouse=True)
+def production(monkeypatch):
+    # Le masquage n'est actif qu'en production
+    monkeypatch.setattr(LogSanitizer, "is_production", classmethod(lambda cls: True))
+
+
+@pytest.mark.parametrize("line", SAMPLE_LINES + CONSTANT_LINES + [BULK_LINE])
+def test_sample_lines_match_legacy(line):
+    assert LogSanitizer.sanitize_message(line) == legacy_sanitize_message(line)
+
+
+def test_random_lines_match_legacy():
+    lines = random_lines(3000, seed=7)
+    mismatches = [line for line in lines if LogSanitizer.sanitize_message(line) != legacy_sanitize_message(line)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("line", [
+    "token_abcdefghijklmnopqrstuvwxyz0123 refusé",
+    "clé éabcdefghijklmnopqrstuvwxyz0123 refusée",
+    "ticket_0612345678 ouvert",
+    "user@example.com-0f8fad5b-d9cb-469f-a165-70867728950e",
+])
+def test_word_boundaries_match_legacy(line):
+    # '_' et non ASCII : la variante SENSITIVE_PATTERN_FULL
+    assert LogSanitizer.sanitize_message(line) == legacy_sanitize_message(line)
+
+
+def test_values_are_masked():
+    sanitized = LogSanitizer.sanitize_message(
+        "Lead de jean.dupont@example.com (+33612345678) pour 0f8fad5b-d9cb-469f-a165-70867728950e"
+    )
+    assert "jean.dupont" not in sanitized
+    assert "+33612345678" not in sanitized
+    assert "0f8fad5b-d9cb-469f-a165-70867728950e" not in sanitized
+    assert "j***@ex***.com" in sanitized
+    assert "0f8f***-***-***-***-***950e" in sanitized
+
+
+def test_fast_path_leaves_message_unchanged():
+    before = LogSanitizer.get_stats()["fast_path"]
+    assert LogSanitizer.sanitize_message("Dashboard loaded") == "Dashboard loaded"
+    assert LogSanitizer.get_stats()["fast_path"] == before + 1
+
+
+def test_development_keeps_message(monkeypatch):
+    monkeypatch.setattr(LogSanitizer, "is_production", classmethod(lambda cls: False))
+    line = "Lead de jean.dupont@example.com"
+    assert LogSanitizer.sanitize_message(line) == line
@@ -0,0 +1,109 @@
+"""Curseurs de pagination (app.libs.pagination) : aller-retour et rejet des curseurs altérés"""
+
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.libs.pagination import Keyset, KeysetPage, decode_cursor, encode_cursor
+
+KEYSET = Keyset(table="leads l", id_column="l.id", sort_columns={"created_at": "l.created_at"})
+
+CREATED_AT = datetime(2025, 7, 11, 14, 32, 5, 123456, tzinfo=timezone.utc)
+
+
+def rows(count: int):
+    return [{"id": 100 - i, "created_at": CREATED_AT} for i in range(count)]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(CREATED_AT, 42, "abc123")
+    assert decode_cursor(cursor, KEYSET, "abc123") == (CREATED_AT, 42)
+
+
+def test_next_page_uses_cursor_of_last_row():
+    first = KeysetPage(KEYSET, limit=3, filters={"status": "new"})
+    envelope = first.envelope(rows(4), total=10)
+    assert [row["id"] for row in envelope["data"]] == [100, 99, 98]
+
+    second = KeysetPage(KEYSET, limit=3, cursor=envelope["next_cursor"], filters={"status": "new"})
+    assert second.after == (CREATED_AT, 98)
+
+    sql, params = second.query("SELECT l.* FROM leads l", ["l.status = $1"], ["new"])
+    assert "(l.created_at, l.id) < ($2, $3)" in sql
+    assert params == ["new", CREATED_AT, 98, 4]
+
+
+def test_last_page_has_no_cursor():
+    envelope = KeysetPage(KEYSET, limit=3).envelope(rows(3), total=3)
+    assert envelope["next_cursor"] is None
+
+
+def test_cursor_from_other_filters_is_rejected():
+    cursor = KeysetPage(KEYSET, limit=3, filters={"status": "new"}).envelope(rows(4), total=10)["next_cursor"]
+    with pytest.raises(HTTPException) as error:
+        KeysetPage(KEYSET, limit=3, cursor=cursor, filters={"status": "won"})
+    assert error.value.status_code == 400
+
+
+def test_cursor_from_other_order_is_rejected():
+    cursor = KeysetPage(KEYSET, limit=3).envelope(rows(4), total=10)["next_cursor"]
+    with pytest.raises(HTTPException) as error:
+        KeysetPage(KEYSET, limit=3, cursor=cursor, order="asc")
+    assert error.value.status_code == 400
+
+
+def tampered(cursor: str, index: int, value) -> str:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded))
+    payload[index] = value
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "e30",  # {}
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    tampered(encode_cursor(CREATED_AT, 42, "abc123"), 0, "hier"),
+    tampered(encode_cursor(CREATED_AT, 42, "abc123"), 1, "quarante-deux"),
+    tampered(encode_cursor(CREATED_AT, 42, "abc123"), 2, "000000"),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, KEYSET, "abc123")
+    assert error.value.status_code == 400
+
+
+def test_unknown_sort_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        KeysetPage(KEYSET, sort="email")
+    assert error.value.status_code == 400
+
+
+NULLABLE_KEYSET = Keyset(
+    table="leads l",
+    id_column="l.id",
+    sort_columns={"created_at": "l.created_at", "updated_at": "l.updated_at"},
+    sort_fallbacks={"updated_at": "created_at"},
+)
+
+
+def test_nullable_sort_uses_fallback_everywhere():
+    page = KeysetPage(NULLABLE_KEYSET, limit=1, sort="updated_at")
+    assert page.order_by == "COALESCE(l.updated_at, l.created_at) DESC, l.id DESC"
+
+    # Dernière ligne de la page sans updated_at : le curseur porte sa date de création
+    envelope = page.envelope([{"id": 7, "created_at": CREATED_AT, "updated_at": None},
+                              {"id": 6, "created_at": CREATED_AT, "updated_at": None}], total=2)
+    next_page = KeysetPage(NULLABLE_KEYSET, limit=1, sort="updated_at", cursor=envelope["next_cursor"])
+    assert next_page.after == (CREATED_AT, 7)
+
+    sql, _ = next_page.query("SELECT l.* FROM leads l")
+    assert "(COALESCE(l.updated_at, l.created_at), l.id) < ($1, $2)" in sql
+
+
+def test_null_sort_value_without_fallback_is_an_error():
+    with pytest.raises(ValueError):
+        encode_cursor(None, 1, "abc123")
@@ -0,0 +1,154 @@
+"""Seaux à jetons et réconciliation avec le stockage partagé (app.libs.rate_limiter)"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("databutton")
+
+from app.libs import rate_limiter
+from app.libs.rate_limiter import HybridRateLimiter, MemoryLimiterStore, RateLimitExceeded, parse_rate
+
+
+class Clock:
+    """Remplace time.monotonic dans le limiteur"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FailingStore:
+    async def add(self, increments):
+        raise ConnectionError("redis down")
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60)
+    assert parse_rate("5/seconds") == (5, 1)
+    with pytest.raises(ValueError):
+        parse_rate("5/fortnight")
+
+
+def test_bucket_admits_up_to_limit(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore())
+    results = [limiter.hit("k", 5, 60) for _ in range(6)]
+
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    # Un jeton revient toutes les 60 / 5 = 12 secondes
+    assert results[-1][1] == pytest.approx(12.0)
+    assert limiter.allowed == 5 and limiter.rejected == 1
+
+
+def test_bucket_refills_over_period(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore())
+    for _ in range(5):
+        limiter.hit("k", 5, 60)
+    assert limiter.hit("k", 5, 60)[0] is False
+
+    clock.now += 12
+    assert limiter.hit("k", 5, 60)[0] is True
+    assert limiter.hit("k", 5, 60)[0] is False
+
+
+def test_keys_are_independent(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore())
+    for _ in range(5):
+        limiter.hit("a", 5, 60)
+    assert limiter.hit("b", 5, 60)[0] is True
+
+
+def test_check_raises(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore())
+    limiter.check("k", "1/minute")
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.check("k", "1/minute")
+    assert error.value.detail == "1/minute"
+    assert error.value.retry_after == pytest.approx(60.0)
+
+
+def test_max_keys_evicts_oldest(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore(), max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.hit(key, 5, 60)
+    assert limiter.evictions == 1
+    assert limiter.get_stats()["keys"] == 2
+
+
+def test_sync_caps_bucket_at_global_remainder(clock):
+    store = MemoryLimiterStore()
+    other = HybridRateLimiter(store, tolerance=0.0)
+    limiter = HybridRateLimiter(store, tolerance=0.0)
+
+    async def scenario():
+        # Une autre instance a déjà consommé 8 des 10 requêtes de la fenêtre
+        for _ in range(8):
+            other.hit("k", 10, 60)
+        await other.sync()
+
+        limiter.hit("k", 10, 60)
+        await limiter.sync()
+
+    asyncio.run(scenario())
+    bucket = limiter._buckets[("k", 60)]
+    assert bucket.synced and bucket.shared
+    assert bucket.tokens == pytest.approx(1.0)
+    assert limiter.hit("k", 10, 60)[0] is True
+    assert limiter.hit("k", 10, 60)[0] is False
+
+
+def test_sync_alone_keeps_tolerance(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore(), tolerance=0.1)
+
+    async def scenario():
+        for _ in range(5):
+            limiter.hit("k", 10, 60)
+        await limiter.sync()
+
+    asyncio.run(scenario())
+    bucket = limiter._buckets[("k", 60)]
+    assert bucket.synced and not bucket.shared
+    assert bucket.pending == 0
+    # Seule instance : le seau (5 jetons) reste sous le reste global plus la tolérance (5 + 1)
+    assert bucket.tokens == pytest.approx(5.0)
+
+
+def test_tolerance_before_first_sync(clock):
+    limiter = HybridRateLimiter(MemoryLimiterStore(), tolerance=0.1)
+
+    async def scenario():
+        limiter.start()
+        try:
+            return [limiter.hit("k", 50, 60)[0] for _ in range(6)]
+        finally:
+            limiter._task.cancel()
+
+    # Synchronisation démarrée mais pas encore faite : 10 % de 50 = 5 admissions
+    assert asyncio.run(scenario()) == [True] * 5 + [False]
+
+
+def test_failed_sync_keeps_pending(clock):
+    limiter = HybridRateLimiter(FailingStore())
+
+    async def scenario():
+        for _ in range(3):
+            limiter.hit("k", 10, 60)
+        await limiter.sync()
+
+    asyncio.run(scenario())
+    bucket = limiter._buckets[("k", 60)]
+    assert bucket.pending == 3
+    assert bucket.window_sent == 0
+    assert limiter.sync_failures == 1 and limiter.syncs == 0
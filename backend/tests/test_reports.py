@@ -0,0 +1,115 @@
+"""
+Sommes des rapports admin (app.libs.reports) sur une base SQLite en mémoire.
+
+Les requêtes sont exécutées telles quelles, à deux traductions près
+(`::text` et GREATEST, absents de SQLite). Le jeu de données reproduit le
+cas de la jointure directe : plusieurs lignes dans chaque table enfant pour
+un même utilisateur, que le produit cartésien multipliait.
+"""
+
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from app.libs.reports import all_users_sql, user_activity_counts_sql, users_with_stats_sql
+
+SCHEMA = """
+CREATE TABLE user_profiles (user_id TEXT PRIMARY KEY, full_name TEXT, user_type TEXT, email TEXT,
+                            phone TEXT, city TEXT, created_at TEXT);
+CREATE TABLE leads (id INTEGER PRIMARY KEY, user_id TEXT, updated_at TEXT);
+CREATE TABLE commissions (id INTEGER PRIMARY KEY, user_id TEXT, amount NUMERIC, status TEXT, updated_at TEXT);
+CREATE TABLE payments (id INTEGER PRIMARY KEY, user_id TEXT, requested_at TEXT);
+CREATE TABLE contracts (id INTEGER PRIMARY KEY, user_id TEXT);
+"""
+
+
+def _greatest(*values):
+    # GREATEST de PostgreSQL ignore les NULL
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+
+def to_sqlite(sql: str) -> str:
+    return sql.replace("::text", "")
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.create_function("GREATEST", -1, _greatest)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO user_profiles VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("u1", "Alice", "apporteur", "a@example.com", "0600000001", "Toulon", "2025-01-02"),
+            ("u2", "Bruno", "apporteur", "b@example.com", "0600000002", "Nice", "2025-01-01"),
+        ],
+    )
+    # u1 : 5 leads, 4 commissions, 3 paiements, 2 contrats ; u2 : rien
+    conn.executemany("INSERT INTO leads (user_id, updated_at) VALUES (?, ?)",
+                     [("u1", f"2025-03-0{day}") for day in range(1, 6)])
+    conn.executemany(
+        "INSERT INTO commissions (user_id, amount, status, updated_at) VALUES (?, ?, ?, ?)",
+        [
+            ("u1", 100, "pending", "2025-02-01"),
+            ("u1", 50, "pending", "2025-02-02"),
+            ("u1", 200, "paid", "2025-02-03"),
+            ("u1", 25, "cancelled", "2025-02-04"),
+        ],
+    )
+    conn.executemany("INSERT INTO payments (user_id, requested_at) VALUES (?, ?)",
+                     [("u1", f"2025-04-0{day}") for day in range(1, 4)])
+    conn.executemany("INSERT INTO contracts (user_id) VALUES (?)", [("u1",), ("u1",)])
+    yield conn
+    conn.close()
+
+
+def fetch(conn, sql: str) -> dict:
+    return {row["user_id"]: dict(row) for row in conn.execute(to_sqlite(sql))}
+
+
+def test_users_with_stats_totals(conn):
+    rows = fetch(conn, users_with_stats_sql())
+
+    assert rows["u1"]["total_leads"] == 5
+    assert Decimal(rows["u1"]["pending_commissions"]) == 150
+    assert Decimal(rows["u1"]["paid_commissions"]) == 200
+    assert rows["u1"]["last_activity"] == "2025-04-03"
+
+    assert rows["u2"]["total_leads"] == 0
+    assert rows["u2"]["pending_commissions"] == 0
+    assert rows["u2"]["paid_commissions"] == 0
+    assert rows["u2"]["last_activity"] is None
+
+
+def test_all_users_totals(conn):
+    rows = fetch(conn, all_users_sql())
+
+    assert rows["u1"]["total_leads"] == 5
+    assert Decimal(rows["u1"]["total_commissions"]) == 150
+    assert rows["u2"]["total_leads"] == 0
+    assert rows["u2"]["total_commissions"] == 0
+
+
+def test_user_activity_counts(conn):
+    rows = fetch(conn, user_activity_counts_sql())
+
+    assert (rows["u1"]["total_leads"], rows["u1"]["total_commissions"],
+            rows["u1"]["total_payments"], rows["u1"]["total_contracts"]) == (5, 4, 3, 2)
+    assert (rows["u2"]["total_leads"], rows["u2"]["total_commissions"],
+            rows["u2"]["total_payments"], rows["u2"]["total_contracts"]) == (0, 0, 0, 0)
+
+
+def test_one_row_per_user_in_order(conn):
+    rows = conn.execute(to_sqlite(users_with_stats_sql())).fetchall()
+    assert [row["user_id"] for row in rows] == ["u1", "u2"]
+
+
+def test_aggregates_limited_to_selected_users(conn):
+    sql = users_with_stats_sql("SELECT * FROM user_profiles WHERE user_id = 'u2'")
+    rows = fetch(conn, sql)
+
+    assert list(rows) == ["u2"]
+    assert rows["u2"]["total_leads"] == 0
@@ -22,11 +22,16 @@ import {
   GetAdminReceivedMessagesData,
   GetAdminStatsData,
   GetAllContractsData,
+  GetAllContractsError,
+  GetAllContractsParams,
   GetAllLeadsAdminData,
   GetAllLeadsData,
   GetAllUsersAdminData,
   GetAnniversaryAlertsData,
   GetCommissionBalanceData,
+  GetContractBodyData,
+  GetContractBodyError,
+  GetContractBodyParams,
   GetDarkIcoData,
   GetDashboardDataData,
   GetFaviconData,
@@ -646,17 +651,33 @@ export class Brain<SecurityDataType = unknown> extends HttpClient<SecurityDataTy
     });
 
   /**
-   * @description Récupère tous les contrats (admin seulement)
+   * @description Récupère les contrats par page (admin seulement). Métadonnées uniquement : le HTML se lit avec GET /contracts/{id}/body.
    *
    * @tags dbtn/module:contracts, dbtn/hasAuth
    * @name get_all_contracts
    * @summary Get All Contracts
    * @request GET:/routes/all-contracts
    */
-  get_all_contracts = (params: RequestParams = {}) =>
-    this.request<GetAllContractsData, any>({
+  get_all_contracts = (query: GetAllContractsParams, params: RequestParams = {}) =>
+    this.request<GetAllContractsData, GetAllContractsError>({
       path: `/routes/all-contracts`,
       method: "GET",
+      query: query,
+      ...params,
+    });
+
+  /**
+   * @description HTML d'un contrat (admin ou titulaire du contrat), avec ETag. Renvoie 304 si If-None-Match correspond ; compressé selon Accept-Encoding.
+   *
+   * @tags dbtn/module:contracts, dbtn/hasAuth
+   * @name get_contract_body
+   * @summary Get Contract Body
+   * @request GET:/routes/contracts/{contract_id}/body
+   */
+  get_contract_body = ({ contractId, ...query }: GetContractBodyParams, params: RequestParams = {}) =>
+    this.request<GetContractBodyData, GetContractBodyError>({
+      path: `/routes/contracts/${contractId}/body`,
+      method: "GET",
       ...params,
     });
 
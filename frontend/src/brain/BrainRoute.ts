@@ -22,6 +22,7 @@ import {
   GetAllUsersAdminData,
   GetAnniversaryAlertsData,
   GetCommissionBalanceData,
+  GetContractBodyData,
   GetDarkIcoData,
   GetDashboardDataData,
   GetFaviconData,
@@ -623,7 +624,7 @@ export namespace Brain {
   }
 
   /**
-   * @description Récupère tous les contrats (admin seulement)
+   * @description Récupère les contrats par page (admin seulement). Métadonnées uniquement : le HTML se lit avec GET /contracts/{id}/body.
    * @tags dbtn/module:contracts, dbtn/hasAuth
    * @name get_all_contracts
    * @summary Get All Contracts
@@ -631,12 +632,69 @@ export namespace Brain {
    */
   export namespace get_all_contracts {
     export type RequestParams = {};
-    export type RequestQuery = {};
+    export type RequestQuery = {
+      /**
+       * Limit
+       * Nombre d'éléments par page
+       * @min 1
+       * @max 100
+       * @default 20
+       */
+      limit?: number;
+      /**
+       * Cursor
+       * Curseur de la page suivante (next_cursor)
+       */
+      cursor?: string | null;
+      /**
+       * Page
+       * Numéro de page (sans curseur)
+       * @min 1
+       * @default 1
+       */
+      page?: number;
+      /**
+       * Order
+       * @default "desc"
+       * @pattern ^(asc|desc)$
+       */
+      order?: string;
+      /**
+       * Signed Only
+       * Uniquement les contrats signés
+       * @default false
+       */
+      signed_only?: boolean;
+      /**
+       * Contract Type
+       * Filtrer par type de contrat
+       * @default ""
+       */
+      contract_type?: string;
+    };
     export type RequestBody = never;
     export type RequestHeaders = {};
     export type ResponseBody = GetAllContractsData;
   }
 
+  /**
+   * @description HTML d'un contrat (admin ou titulaire du contrat), avec ETag. Renvoie 304 si If-None-Match correspond ; compressé selon Accept-Encoding.
+   * @tags dbtn/module:contracts, dbtn/hasAuth
+   * @name get_contract_body
+   * @summary Get Contract Body
+   * @request GET:/routes/contracts/{contract_id}/body
+   */
+  export namespace get_contract_body {
+    export type RequestParams = {
+      /** Contract Id */
+      contractId: number;
+    };
+    export type RequestQuery = {};
+    export type RequestBody = never;
+    export type RequestHeaders = {};
+    export type ResponseBody = GetContractBodyData;
+  }
+
   /**
    * @description Creates a user profile in the database after successful registration. This endpoint is called right after Stack Auth account creation.
    * @tags dbtn/module:users, dbtn/hasAuth
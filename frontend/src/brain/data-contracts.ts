@@ -66,6 +66,8 @@ export interface ContractResponse {
   siret_number: string;
   /** Contract Html */
   contract_html: string;
+  /** Content Hash */
+  content_hash?: string | null;
   /** Is Signed */
   is_signed: boolean;
   /** Signed At */
@@ -83,6 +85,34 @@ export interface ContractSignatureRequest {
   contract_id?: number | null;
 }
 
+/**
+ * ContractSummary
+ * Ligne de la liste admin : métadonnées seulement (HTML via /contracts/{id}/body)
+ */
+export interface ContractSummary {
+  /** Id */
+  id: number;
+  /** User Id */
+  user_id?: string | null;
+  /** User Full Name */
+  user_full_name?: string | null;
+  /** Contract Type */
+  contract_type: string;
+  /** Company Name */
+  company_name: string;
+  /** Siret Number */
+  siret_number: string;
+  /** Is Signed */
+  is_signed: boolean;
+  /** Signed At */
+  signed_at?: string | null;
+  /**
+   * Created At
+   * @format date-time
+   */
+  created_at: string;
+}
+
 /** CreateLeadRequest */
 export interface CreateLeadRequest {
   /** Prospect Name */
@@ -341,6 +371,30 @@ export interface MessagesResponse {
   unread_count: number;
 }
 
+/** Page[ContractSummary] */
+export interface PageContractSummary {
+  /** Data */
+  data: ContractSummary[];
+  /** Next Cursor */
+  next_cursor?: string | null;
+  /** Total */
+  total: number;
+  /**
+   * Total Is Estimate
+   * @default true
+   */
+  total_is_estimate?: boolean;
+  /**
+   * Page
+   * @default 1
+   */
+  page?: number;
+  /** Limit */
+  limit: number;
+  /** Total Pages */
+  total_pages: number;
+}
+
 /** PaymentRequestResponse */
 export interface PaymentRequestResponse {
   /** Id */
@@ -682,7 +736,59 @@ export type SignContractError = HTTPValidationError;
 export type GetMyContractData = ContractResponse | null;
 
 /** Response Get All Contracts */
-export type GetAllContractsData = ContractResponse[];
+export interface GetAllContractsParams {
+  /**
+   * Limit
+   * Nombre d'éléments par page
+   * @min 1
+   * @max 100
+   * @default 20
+   */
+  limit?: number;
+  /**
+   * Cursor
+   * Curseur de la page suivante (next_cursor)
+   */
+  cursor?: string | null;
+  /**
+   * Page
+   * Numéro de page (sans curseur)
+   * @min 1
+   * @default 1
+   */
+  page?: number;
+  /**
+   * Order
+   * @default "desc"
+   * @pattern ^(asc|desc)$
+   */
+  order?: string;
+  /**
+   * Signed Only
+   * Uniquement les contrats signés
+   * @default false
+   */
+  signed_only?: boolean;
+  /**
+   * Contract Type
+   * Filtrer par type de contrat
+   * @default ""
+   */
+  contract_type?: string;
+}
+
+export type GetAllContractsData = PageContractSummary;
+
+export type GetAllContractsError = HTTPValidationError;
+
+export interface GetContractBodyParams {
+  /** Contract Id */
+  contractId: number;
+}
+
+export type GetContractBodyData = any;
+
+export type GetContractBodyError = HTTPValidationError;
 
 export type CreateUserProfileData = CreateUserProfileResponse;
 
@@ -1,4 +1,5 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useRef } from 'react';
+import brain from 'brain';
 import { Card } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
@@ -27,7 +28,6 @@ interface Contract {
   contract_type?: string;
   is_signed: boolean;
   signed_at?: string;
-  contract_html: string;
   created_at: string;
 }
 
@@ -41,6 +41,40 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
   const [contractSearchTerm, setContractSearchTerm] = useState('');
   const [contractStatusFilter, setContractStatusFilter] = useState<'all' | 'signed' | 'pending'>('all');
   const [selectedContractForView, setSelectedContractForView] = useState<Contract | null>(null);
+  const [viewedContractHtml, setViewedContractHtml] = useState<string | null>(null);
+  // Dernier contrat demandé : une réponse plus ancienne arrivée après est ignorée
+  const viewRequestId = useRef(0);
+
+  // Pas de cache local : le navigateur revalide le corps avec son ETag
+  // (304 si le contrat n'a pas changé, nouveau HTML après une signature)
+  const loadContractHtml = useCallback(async (contractId: number) => {
+    const response = await brain.get_contract_body({ contractId });
+    return response.text();
+  }, []);
+
+  const handleViewContract = useCallback(async (contract: Contract) => {
+    const requestId = ++viewRequestId.current;
+    setSelectedContractForView(contract);
+    setViewedContractHtml(null);
+    try {
+      const html = await loadContractHtml(contract.id);
+      if (requestId === viewRequestId.current) {
+        setViewedContractHtml(html);
+      }
+    } catch (error) {
+      if (requestId !== viewRequestId.current) return;
+      console.error('Erreur chargement contrat:', error);
+      toast.error('Erreur lors du chargement du contrat');
+      setSelectedContractForView(null);
+    }
+  }, [loadContractHtml]);
+
+  const handleCloseView = useCallback(() => {
+    // Invalide la requête en cours
+    viewRequestId.current++;
+    setSelectedContractForView(null);
+    setViewedContractHtml(null);
+  }, []);
 
   // Helper functions
   const formatDate = useCallback((dateString: string) => {
@@ -71,6 +105,8 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
         toast.error('Impossible d\'ouvrir la fenêtre de téléchargement');
         return;
       }
+
+      const contractHtml = await loadContractHtml(contract.id);
       
       // Créer le contenu HTML pour l'impression
       const htmlContent = `
@@ -95,7 +131,7 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
             <p><strong>Apporteur:</strong> ${contract.user_full_name}</p>
             ${contract.is_signed ? `<p><strong>Signé le:</strong> ${formatDate(contract.signed_at!)}</p>` : '<p><strong>Statut:</strong> En attente de signature</p>'}
           </div>
-          ${contract.contract_html}
+          ${contractHtml}
           <div class="no-print" style="margin-top: 30px; text-align: center;">
             <button onclick="window.print(); window.close();">Imprimer / Télécharger PDF</button>
             <button onclick="window.close();">Fermer</button>
@@ -119,7 +155,7 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
       console.error('Erreur téléchargement PDF:', error);
       toast.error('Erreur lors de l\'ouverture du PDF');
     }
-  }, [formatDate]);
+  }, [formatDate, loadContractHtml]);
 
   const filtered = filteredContracts();
 
@@ -242,7 +278,7 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
                       <Button
                         size="sm"
                         variant="outline"
-                        onClick={() => setSelectedContractForView(contract)}
+                        onClick={() => handleViewContract(contract)}
                         className="h-8 px-2"
                         title="Voir le contrat"
                       >
@@ -267,17 +303,21 @@ const AdminContracts: React.FC<Props> = React.memo(({ contracts, isLoading }) =>
       
       {/* Modal de visualisation du contrat */}
       {selectedContractForView && (
-        <Dialog open={!!selectedContractForView} onOpenChange={() => setSelectedContractForView(null)}>
+        <Dialog open={!!selectedContractForView} onOpenChange={handleCloseView}>
           <DialogContent className="max-w-4xl max-h-[90vh] overflow-y-auto">
             <DialogHeader>
               <DialogTitle>
                 Contrat - {selectedContractForView.company_name}
               </DialogTitle>
             </DialogHeader>
-            <div 
-              className="prose max-w-none"
-              dangerouslySetInnerHTML={{ __html: selectedContractForView.contract_html }}
-            />
+            {viewedContractHtml === null ? (
+              <div className="text-center py-8 text-gray-500">Chargement du contrat...</div>
+            ) : (
+              <div 
+                className="prose max-w-none"
+                dangerouslySetInnerHTML={{ __html: viewedContractHtml }}
+              />
+            )}
           </DialogContent>
         </Dialog>
       )}